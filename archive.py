@@ -0,0 +1,149 @@
+"""Mission Blue Module that holds the raw-page archive of a crawl.
+
+Only a few fields of every post are saved, so adding a column to the output would
+otherwise mean crawling again. With an archive open, every app.bsky.feed.searchPosts
+response is written as it is received, before its posts are projected, as one JSON
+line holding the request parameters, the time it was fetched and the raw page.
+
+Archives are compressed JSONL files. The compression is picked by extension: ".zst"
+is zstd and needs the optional zstandard package, anything else is gzip. Both
+formats allow appending, so several runs can add to the same archive. Archives are
+read back by reextract.py.
+"""
+
+import contextlib
+import gzip
+import io
+import threading
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import IO, Any
+
+import codec
+
+COMPRESSIONS = ("gzip", "zstd")
+
+
+def _require_zstandard() -> Any:
+    try:
+        import zstandard  # pylint: disable=C0415
+    except ImportError as err:
+        raise ImportError(
+            "zstd archives need zstandard: pip install zstandard"
+        ) from err
+    return zstandard
+
+
+def compression(path: str) -> str:
+    """Return the compression of the archive at path, see COMPRESSIONS."""
+    return "zstd" if path.endswith(".zst") else "gzip"
+
+
+def open_archive(path: str, mode: str) -> IO[str]:
+    """Open an archive as text.
+
+    Args:
+        path (str): Path of the archive.
+        mode (str): "r" to read, "a" to append.
+
+    Returns:
+        IO[str]: The decompressed lines of the archive.
+
+    Raises:
+        ImportError: If the archive is zstd and zstandard is not installed.
+
+    """
+    if compression(path) == "gzip":
+        return io.TextIOWrapper(gzip.GzipFile(path, mode + "b"), encoding="utf-8")
+    zstandard = _require_zstandard()
+    with contextlib.ExitStack() as stack:
+        # The file is only closed here if wrapping it fails, the stream owns it.
+        raw = stack.enter_context(open(path, mode + "b"))
+        if mode == "r":
+            # Every run that appends adds a frame, so read past the end of the first.
+            stream = zstandard.ZstdDecompressor().stream_reader(
+                raw, closefd=True, read_across_frames=True
+            )
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        stack.pop_all()
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+
+class PageArchive:
+    """Appends raw search pages to a compressed JSONL archive."""
+
+    def __init__(self, path: str) -> None:
+        """Open the archive at path for appending, creating it if needed."""
+        self.path = path
+        self.pages = 0
+        self._output = open_archive(path, "a")
+        # Searches of a batch run share the archive from several threads.
+        self._lock = threading.Lock()
+
+    def write_page(self, params: dict, page: dict) -> None:
+        """Write one raw searchPosts response and the parameters it was fetched with."""
+        line = codec.dumps(
+            {
+                "params": params,
+                "fetched_at": datetime.now(timezone.utc).isoformat(),
+                "page": page,
+            }
+        )
+        with self._lock:
+            self._output.write(line + "\n")
+            self.pages += 1
+
+    def close(self) -> None:
+        """Flush the compressed stream and close the archive."""
+        with self._lock:
+            self._output.close()
+        print(f"{self.pages} raw pages archived to {self.path}")
+
+
+def iter_lines(path: str) -> Iterator[str]:
+    """Yield the entries of an archive one at a time, as undecoded JSON lines."""
+    with open_archive(path, "r") as archive:
+        for line in archive:
+            if line.strip():
+                yield line
+
+
+def iter_pages(path: str) -> Iterator[dict]:
+    """Yield the archived entries of an archive one at a time.
+
+    Yields:
+        dict: An entry with the "params", "fetched_at" and raw "page" of one page.
+
+    """
+    for line in iter_lines(path):
+        yield codec.loads(line)
+
+
+_active: PageArchive | None = None
+
+
+def start(path: str) -> PageArchive:
+    """Archive every search page fetched from now on to path."""
+    global _active  # pylint: disable=W0603
+    _active = PageArchive(path)
+    return _active
+
+
+def is_open() -> bool:
+    """Return whether search pages are being archived."""
+    return _active is not None
+
+
+def record_page(params: dict, page: dict) -> None:
+    """Archive a raw search page if an archive is open."""
+    if _active is not None:
+        _active.write_page(params, page)
+
+
+def stop() -> None:
+    """Close the archive, if one was started."""
+    global _active  # pylint: disable=W0603
+    if _active is not None:
+        _active.close()
+        _active = None
@@ -0,0 +1,96 @@
+"""Mission Blue Module that holds the asyncio scraping engine.
+
+The engine runs the search -> extract -> validate path on an event loop so that
+validation of one page overlaps with fetching the next, and so that several
+queries can share one loop. Requests still go through the shared client and its
+connection pool; each blocking call runs in a worker thread.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import file
+import mission_blue
+from cache import TTLCache
+from records import Post
+
+
+async def iter_search_pages_async(
+    params: dict, token: str
+) -> AsyncIterator[list[Post]]:
+    """Yield the pages of mission_blue.iter_search_pages without blocking the loop.
+
+    Each page is fetched by advancing the shared page generator in a worker
+    thread, so paging, trimming to posts_limit and error handling are the same
+    as for the sync engine.
+
+    Args:
+        params (dict): The query parameters, see mission_blue.iter_search_pages.
+        token (str): The access token.
+
+    Yields:
+        list[Post]: The post records of one page.
+
+    """
+    pages = mission_blue.iter_search_pages(params, token)
+    while True:
+        page = await asyncio.to_thread(next, pages, None)
+        if page is None:
+            return
+        yield page
+
+
+async def search_posts_async(params: dict, token: str) -> list[Post]:
+    """Search for posts using the BlueSky API without blocking the event loop.
+
+    Returns the same posts as mission_blue.search_posts for the same parameters.
+    """
+    posts = []
+    async for page in iter_search_pages_async(params, token):
+        posts.extend(page)
+    return posts
+
+
+async def scrape_async(
+    params: dict,
+    token: str,
+    strategy: str = "xrpc",
+    workers: int = 4,
+    cache: TTLCache | None = None,
+) -> list[Post]:
+    """Search for posts and extract and validate each page as soon as it arrives.
+
+    Up to `workers` pages are validated at once, one request at a time each, while
+    later pages are still being fetched, so no more than `workers` validation
+    requests are ever in flight. The result is identical to running
+    mission_blue.search_posts followed by file.extract_post_data, including the
+    order of the posts.
+
+    Args:
+        params (dict): The query parameters, see mission_blue.search_posts.
+        token (str): The access token.
+        strategy (str, optional): Validation strategy, see file.extract_post_data.
+            Defaults to "xrpc".
+        workers (int, optional): Maximum number of concurrent validation requests.
+            Defaults to 4.
+        cache (TTLCache, optional): Validation cache, see file.extract_post_data.
+
+    Returns:
+        list[Post]: The extracted post records.
+
+    """
+    semaphore = asyncio.Semaphore(workers)
+
+    async def extract(page: list[Post]) -> list[Post]:
+        # Concurrency is bounded by the semaphore only, so each page is validated
+        # without fanning out again.
+        async with semaphore:
+            return await asyncio.to_thread(
+                file.extract_post_data, page, token, strategy, 1, cache
+            )
+
+    tasks = []
+    async for page in iter_search_pages_async(params, token):
+        tasks.append(asyncio.create_task(extract(page)))
+    pages = await asyncio.gather(*tasks)
+    return [post for page in pages for post in page]
@@ -1,10 +1,40 @@
-"""Authentication module for the BlueSky API."""
+"""Authentication module for the BlueSky API.
 
+Sessions are cached on disk and reused across runs. An expired access token is
+replaced through com.atproto.server.refreshSession, so the password is only sent
+when there is no usable session.
+"""
+
+import base64
+import json
 import os
 import sys
+import time
+from typing import TYPE_CHECKING, Any
+
+import client
+import metrics
+import statefile
+from lazy import lazy_import
+
+if TYPE_CHECKING:
+    import requests
+else:
+    requests = lazy_import("requests")
+
+SESSION_PATH = ".mission_blue_session.json"
+# Refresh tokens that expire within this many seconds instead of using them.
+EXPIRY_MARGIN = 60
 
-import requests
-from dotenv import load_dotenv
+
+def load_dotenv() -> bool:
+    """Load the .env file into the environment. Returns whether it was found.
+
+    python-dotenv is only imported when credentials are needed.
+    """
+    from dotenv import load_dotenv as load_dotenv_file  # pylint: disable=C0415
+
+    return load_dotenv_file()
 
 
 # Load environment variables from the .env file
@@ -27,20 +57,154 @@ def load_credentials() -> tuple[str | None, str | None]:
     sys.exit(1)
 
 
-def create_session(username: str, password: str) -> str:
-    """Authenticate and create a session to get the access token.
+def _token_expiry(token: str) -> float | None:
+    """Return the exp claim of a JWT, or None if it can not be read.
 
-    :return: Access token (accessJwt) for authentication.
+    The signature is not verified, the claim is only used to skip tokens that are
+    about to be rejected anyway.
     """
-    url = "https://bsky.social/xrpc/com.atproto.server.createSession"
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _is_fresh(token: str) -> bool:
+    expiry = _token_expiry(token)
+    return expiry is None or expiry - EXPIRY_MARGIN > time.time()
+
+
+def _start_session(username: str, password: str) -> dict[str, Any]:
+    """Log in with the password. Exits if authentication fails."""
     payload = {"identifier": username, "password": password}
 
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        response = client.xrpc_post("com.atproto.server.createSession", json=payload)
         response.raise_for_status()
-        session = response.json()
-        return session["accessJwt"]
+        return dict(response.json())
     except requests.exceptions.RequestException as err:
         print("Error during authentication:", err)
         print("Response:", response.text if "response" in locals() else "No response")
         sys.exit(1)
+
+
+def create_session(username: str, password: str) -> str:
+    """Authenticate and create a session to get the access token.
+
+    :return: Access token (accessJwt) for authentication.
+    """
+    session = _start_session(username, password)
+    client.set_access_token(session["accessJwt"])
+    return str(session["accessJwt"])
+
+
+def refresh_session(refresh_jwt: str) -> dict[str, Any]:
+    """Exchange a refresh token for a new session.
+
+    Args:
+        refresh_jwt (str): The refreshJwt of the current session. It can only be
+            used once, the returned session holds its replacement.
+
+    Returns:
+        dict: The new session, with accessJwt and refreshJwt.
+
+    Raises:
+        requests.exceptions.RequestException: If the refresh is rejected.
+
+    """
+    response = client.xrpc_post(
+        "com.atproto.server.refreshSession",
+        headers={"Authorization": f"Bearer {refresh_jwt}"},
+    )
+    response.raise_for_status()
+    return dict(response.json())
+
+
+class SessionStore:
+    """The cached session of one account, kept in a file only the user can read."""
+
+    def __init__(self, username: str, password: str, path: str = SESSION_PATH):
+        """Load the cached session of username, if there is one.
+
+        Args:
+            username (str): The Bluesky handle.
+            password (str): The app password, only used if no session is usable.
+            path (str, optional): The session file. Defaults to SESSION_PATH.
+
+        """
+        self.username = username
+        self.password = password
+        self.path = path
+        self.session = self._load()
+
+    def _load(self) -> dict[str, Any] | None:
+        try:
+            session = statefile.read_json(self.path)
+        except (OSError, ValueError):
+            return None
+        if session is None:
+            return None
+        # A session only belongs to the account and service it was created for.
+        if (session.get("identifier"), session.get("service")) != (
+            self.username,
+            client.API_BASE_URL,
+        ):
+            return None
+        return session
+
+    def _save(self, session: dict[str, Any]) -> None:
+        self.session = dict(
+            session, identifier=self.username, service=client.API_BASE_URL
+        )
+        # Only the user may read the tokens.
+        statefile.write_json(self.path, self.session, permissions=0o600)
+
+    def access_token(self) -> str:
+        """Return a usable access token, refreshing or logging in if needed."""
+        if self.session is not None and _is_fresh(self.session["accessJwt"]):
+            client.set_access_token(self.session["accessJwt"])
+            return str(self.session["accessJwt"])
+        return self.refresh()
+
+    def refresh(self) -> str:
+        """Replace the access token and return the new one.
+
+        The refresh token is used when it is still valid. The password is only
+        used if there is no session or the refresh is rejected.
+        """
+        refreshed = False
+        if self.session is not None and _is_fresh(self.session.get("refreshJwt", "")):
+            try:
+                self._save(refresh_session(self.session["refreshJwt"]))
+                refreshed = True
+            except requests.exceptions.RequestException as err:
+                print("Could not refresh the session, logging in again:", err)
+        if not refreshed:
+            self._save(_start_session(self.username, self.password))
+        assert self.session is not None
+        client.set_access_token(self.session["accessJwt"])
+        return str(self.session["accessJwt"])
+
+
+def get_access_token(username: str, password: str, path: str = SESSION_PATH) -> str:
+    """Return an access token, reusing the cached session when possible.
+
+    The token is also set on the shared client, together with a refresher so that
+    XRPC calls rejected for an expired token are retried after a refresh.
+
+    Args:
+        username (str): The Bluesky handle.
+        password (str): The app password.
+        path (str, optional): The session file. Defaults to SESSION_PATH.
+
+    Returns:
+        str: The access token (accessJwt).
+
+    """
+    store = SessionStore(username, password, path)
+    with metrics.stage("auth"):
+        token = store.access_token()
+    client.set_token_refresher(store.refresh)
+    return token
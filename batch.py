@@ -0,0 +1,346 @@
+"""Mission Blue Module that runs many searches in one process.
+
+Query specs are read from a YAML, JSON or text file and run concurrently. Every
+search shares one authenticated session, the connection pool and the rate-limit
+budget of the client, and streams its posts to its own output under
+`Scraped Posts/`.
+
+A text file holds one query per line; blank lines and lines starting with # are
+skipped. A YAML or JSON file holds a list of specs (or a mapping with a "queries"
+list), where each spec is a query string or a mapping such as:
+
+    - query: wildfire
+      since: "2025-01-01"
+      lang: en
+      posts_limit: 5000
+    - query: flood
+      author: example.bsky.social
+      output: flood-example
+      format: jsonl
+
+Run it with:
+
+    python batch.py queries.yaml --parallel 4
+"""
+
+import contextlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import click
+
+import archive
+import auth
+import cache
+import client
+import file
+import metrics
+import mission_blue
+import writers
+
+# Keys a spec may set, with their defaults. They match the options of mission_blue.
+SPEC_DEFAULTS: dict[str, Any] = {
+    "query": "",
+    "sort": "",
+    "since": "",
+    "until": "",
+    "mentions": "",
+    "author": "",
+    "lang": "",
+    "domain": "",
+    "url": "",
+    "tags": None,
+    "limit": 25,
+    "posts_limit": 1000,
+    "output": "",
+    "format": "csv",
+}
+
+
+def _parse_specs(path: str, text: str) -> list[Any]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        loaded = json.loads(text)
+    elif extension in (".yaml", ".yml"):
+        try:
+            import yaml  # pylint: disable=C0415
+        except ImportError as err:
+            raise ImportError(
+                "YAML query files need PyYAML: pip install pyyaml"
+            ) from err
+        loaded = yaml.safe_load(text)
+    else:
+        return [
+            line.strip()
+            for line in text.splitlines()
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+    if isinstance(loaded, dict):
+        loaded = loaded.get("queries")
+    if not isinstance(loaded, list):
+        raise TypeError(f"{path} must hold a list of query specs.")
+    return loaded
+
+
+def load_specs(path: str) -> list[dict[str, Any]]:
+    """Read the query specs in a YAML, JSON or text file.
+
+    Args:
+        path (str): Path to the file. The format is picked by extension: .yaml or
+            .yml, .json, anything else is read as text.
+
+    Returns:
+        list[dict]: One spec per query, with every key of SPEC_DEFAULTS set.
+
+    Raises:
+        TypeError: If the file does not hold a list of specs.
+        ValueError: If a spec is malformed, or two specs write to the same output.
+
+    """
+    with open(path, encoding="utf-8") as spec_file:
+        entries = _parse_specs(path, spec_file.read())
+
+    specs = []
+    outputs = set()
+    for position, entry in enumerate(entries, start=1):
+        if isinstance(entry, str):
+            entry = {"query": entry}
+        if not isinstance(entry, dict) or not entry.get("query"):
+            raise ValueError(f"Query spec {position} has no query.")
+        unknown = set(entry) - set(SPEC_DEFAULTS)
+        if unknown:
+            raise ValueError(
+                f"Query spec {position} has unknown keys: {', '.join(sorted(unknown))}"
+            )
+        spec = dict(SPEC_DEFAULTS, **entry)
+        if isinstance(spec["tags"], str):
+            spec["tags"] = [spec["tags"]]
+        spec["output"] = spec["output"] or spec["query"]
+        if spec["format"] not in writers.WRITERS:
+            raise ValueError(f"Query spec {position} has unknown format.")
+        if (spec["output"], spec["format"]) in outputs:
+            raise ValueError(f"More than one query spec writes to {spec['output']}.")
+        outputs.add((spec["output"], spec["format"]))
+        specs.append(spec)
+    return specs
+
+
+def spec_output_path(spec: dict[str, Any]) -> str:
+    """Return the path of the output a spec writes to."""
+    return writers.output_path(file.DIRECTORY_NAME, spec["output"], spec["format"])
+
+
+def run_batch(
+    specs: list[dict[str, Any]],
+    token: str,
+    parallel: int = 4,
+    extract_options: dict[str, Any] | None = None,
+    resume: bool = False,
+    did_cache: cache.TTLCache | None = None,
+    incremental: bool = False,
+) -> dict[str, int | None]:
+    """Stream every search to its own output, several at a time.
+
+    Args:
+        specs (list[dict]): Query specs, see load_specs.
+        token (str): The access token shared by every search.
+        parallel (int, optional): Number of searches running at once. Defaults to 4.
+        extract_options (dict, optional): Keyword arguments for
+            file.extract_post_data besides the posts and token.
+        resume (bool, optional): Continue searches from their checkpoints.
+            Defaults to False.
+        did_cache (TTLCache, optional): Persistent cache of resolved handles.
+        incremental (bool, optional): Only fetch the posts after each search's
+            high-water mark, see mission_blue.stream_search. Defaults to False.
+
+    Returns:
+        dict[str, Optional[int]]: Every output path mapped to the number of posts
+            saved, or None if its search failed.
+
+    """
+    # Resolve every handle up front, concurrently and once per distinct handle.
+    handles = [spec[key] for spec in specs for key in ("mentions", "author")]
+    mission_blue.resolve_handles(
+        [handle for handle in handles if handle], token, did_cache=did_cache
+    )
+
+    def run(spec: dict[str, Any]) -> int | None:
+        try:
+            params = mission_blue.generate_query_params(
+                token,
+                spec["query"],
+                spec["sort"],
+                spec["since"],
+                spec["until"],
+                spec["mentions"],
+                spec["author"],
+                spec["lang"],
+                spec["domain"],
+                spec["url"],
+                spec["tags"],
+                spec["limit"],
+                posts_limit=spec["posts_limit"],
+                cursor="",
+                did_cache=did_cache,
+            )
+            return mission_blue.stream_search(
+                params,
+                token,
+                spec_output_path(spec),
+                spec["format"],
+                extract_options,
+                resume,
+                incremental,
+            )
+        except (ImportError, OSError, ValueError) as err:
+            # One failing search must not stop the others. Request errors are
+            # OSErrors, and undecodable responses are ValueErrors.
+            print(f"Query {spec['query']!r} failed: {err}")
+            return None
+
+    paths = [spec_output_path(spec) for spec in specs]
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(specs)))) as pool:
+        return dict(zip(paths, pool.map(run, specs)))
+
+
+@click.command()
+@click.argument("spec_path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "-p",
+    "--parallel",
+    type=click.IntRange(1, 32),
+    default=4,
+    help="Number of queries to run at once. Defaults to 4.",
+)
+@click.option(
+    "--validation",
+    type=click.Choice(file.VALIDATION_STRATEGIES, case_sensitive=False),
+    default="xrpc",
+    help='How to check that posts still exist, see mission_blue. Defaults to "xrpc".',
+)
+@click.option(
+    "--validate-workers",
+    type=click.IntRange(1, 64),
+    default=4,
+    help="Number of concurrent validation requests per query. Defaults to 4.",
+)
+@click.option(
+    "--validation-ttl",
+    type=click.FloatRange(0, None),
+    default=24,
+    help="Hours a post validation result is cached for. Defaults to 24.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Continue interrupted queries from their checkpoints.",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Only fetch the posts newer than the last run of each query, see mission_blue --incremental.",
+)
+@click.option(
+    "--base-url",
+    type=str,
+    envvar="MISSION_BLUE_BASE_URL",
+    help="Send every request to this server instead, see mission_blue --base-url.",
+)
+@click.option(
+    "--archive",
+    "archive_path",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Append the raw search pages of every query to this archive, see mission_blue --archive.",
+)
+@click.option(
+    "--report",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write a JSON run report covering every query, see mission_blue --report.",
+)
+@click.option(
+    "--prometheus",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the same metrics as a Prometheus textfile.",
+)
+def batch(
+    spec_path: str,
+    parallel: int = 4,
+    validation: str = "xrpc",
+    validate_workers: int = 4,
+    validation_ttl: float = 24,
+    resume: bool = False,
+    incremental: bool = False,
+    base_url: str = "",
+    archive_path: str | None = None,
+    report: str | None = None,
+    prometheus: str | None = None,
+) -> None:
+    # pylint: disable=R0913
+    # pylint: disable=R0917
+    """Run every query in SPEC_PATH, a YAML, JSON or text file of query specs."""
+    try:
+        specs = load_specs(spec_path)
+    except (ImportError, TypeError, ValueError) as err:
+        raise click.UsageError(str(err)) from err
+    if resume:
+        for spec in specs:
+            if not writers.WRITERS[spec["format"]].flushes_batches:
+                raise click.UsageError(
+                    f"--resume can not be used with format {spec['format']}."
+                )
+    if incremental:
+        for spec in specs:
+            if spec["sort"] != "latest":
+                raise click.UsageError(
+                    f"--incremental requires sort: latest for query {spec['query']!r}."
+                )
+
+    if base_url:
+        client.set_base_url(base_url)
+    metrics.reset()
+    context = click.get_current_context()
+    context.call_on_close(lambda: metrics.write_outputs(report, prometheus))
+    if archive_path:
+        try:
+            archive.start(archive_path)
+        except ImportError as err:
+            raise click.UsageError(str(err)) from err
+        context.call_on_close(archive.stop)
+
+    print("Loading Credentials...")
+    bluesky_handle, bluesky_app_password = auth.load_credentials()
+    if bluesky_handle is None or bluesky_app_password is None:
+        raise ValueError("Bluesky handle and app password must not be None.")
+    print("Authenticating...")
+    access_token = auth.get_access_token(bluesky_handle, bluesky_app_password)
+    print("Authentication successful.")
+
+    print(f"Running {len(specs)} queries, {parallel} at a time...")
+    handle_cache_context = contextlib.nullcontext() if base_url else cache.did_cache()
+    with handle_cache_context as handle_cache, cache.validation_cache(
+        validation_ttl * 3600
+    ) as post_cache:
+        results = run_batch(
+            specs,
+            access_token,
+            parallel,
+            {"strategy": validation, "workers": validate_workers, "cache": post_cache},
+            resume,
+            handle_cache,
+            incremental,
+        )
+        print(post_cache.report())
+
+    failed = [path for path, written in results.items() if written is None]
+    if failed:
+        print(f"{len(failed)} of {len(results)} queries failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    batch()
@@ -0,0 +1,143 @@
+"""Import-time regression check for the mission_blue CLI.
+
+Runs two commands under `python -X importtime` and fails if importing modules
+takes longer than the budget, or if a module that should only be loaded on demand
+is imported:
+
+* `mission_blue.py --help`, which must not import requests, pandas, alive_progress,
+  python-dotenv or asyncio.
+* A scrape that finds no posts, run against the local fake server, which must not
+  import pandas, alive_progress or asyncio.
+
+Times are the import time of the command minus the modules the interpreter
+imports on its own, best of several runs. Run from the repository root:
+
+    python benchmarks/import_time.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=C0413
+from fake_server import FakeCorpus, FakeXrpcServer
+
+# Budgets in milliseconds. Measured at about 80 ms and 180 ms.
+HELP_BUDGET_MS = 150
+SCRAPE_BUDGET_MS = 300
+HELP_FORBIDDEN = ("requests", "pandas", "alive_progress", "dotenv", "asyncio")
+SCRAPE_FORBIDDEN = ("pandas", "alive_progress", "asyncio")
+RUNS = 3
+
+# Runs a search with no results against the server given as first argument.
+SCRAPE_SCRIPT = """
+import sys
+import auth, client, mission_blue
+client.API_BASE_URL = sys.argv[1]
+auth.load_credentials = lambda: ("user.test", "password")
+mission_blue.main(["-q", "nothing"], standalone_mode=False)
+"""
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, int]]:
+    """Parse -X importtime output into (module, depth, cumulative microseconds)."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented by two spaces per level.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(cumulative)))
+    return imports
+
+
+def import_time(args: list[str], cwd: str | None = None) -> tuple[float, set[str]]:
+    """Run python -X importtime with args.
+
+    Returns:
+        tuple[float, set[str]]: Milliseconds spent importing top-level modules the
+            bare interpreter does not import, and the names of every module imported.
+
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=cwd or ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    baseline = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "pass"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    startup = {
+        name for name, depth, _ in parse_importtime(baseline.stderr) if not depth
+    }
+    imports = parse_importtime(result.stderr)
+    total = sum(
+        cumulative
+        for name, depth, cumulative in imports
+        if depth == 0 and name not in startup
+    )
+    return total / 1000, {name for name, _, _ in imports}
+
+
+def forbidden_imports(modules: set[str], forbidden: tuple) -> list[str]:
+    """Return the forbidden packages that were imported, fully or in part."""
+    return [
+        package
+        for package in forbidden
+        if any(module.split(".")[0] == package for module in modules)
+    ]
+
+
+def check(
+    name: str, args: list[str], budget: float, forbidden: tuple, cwd: str | None
+) -> list[str]:
+    """Measure one command and return the budget and lazy-import violations."""
+    runs = [import_time(args, cwd) for _ in range(RUNS)]
+    best = min(milliseconds for milliseconds, _ in runs)
+    modules = runs[0][1]
+    print(f"{name}: {best:.1f} ms of imports (budget {budget} ms)")
+    problems = [
+        f"{name} imports {package}" for package in forbidden_imports(modules, forbidden)
+    ]
+    if best > budget:
+        problems.append(f"{name} imports take {best:.1f} ms, over {budget} ms")
+    return problems
+
+
+def main() -> int:
+    """Check both commands and print every violation."""
+    problems = check(
+        "--help",
+        [os.path.join(ROOT, "mission_blue.py"), "--help"],
+        HELP_BUDGET_MS,
+        HELP_FORBIDDEN,
+        None,
+    )
+    with FakeXrpcServer(FakeCorpus(0)) as server, tempfile.TemporaryDirectory() as cwd:
+        problems += check(
+            "no-result scrape",
+            ["-c", SCRAPE_SCRIPT, server.xrpc_url],
+            SCRAPE_BUDGET_MS,
+            SCRAPE_FORBIDDEN,
+            cwd,
+        )
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
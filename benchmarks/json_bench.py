@@ -0,0 +1,173 @@
+"""Benchmark of decoding searchPosts pages with every installed JSON backend.
+
+Pages are read from raw-page archives written with mission_blue --archive, so real
+recorded pages can be compared, or generated like app.bsky.feed.searchPosts results
+when no archive is given. For each backend in codec.available_backends, the
+benchmark measures:
+
+* loads: decoding whole pages.
+* read_search_page: decoding pages and projecting their posts to records, the way
+  a crawl does. With msgspec only the fields of records.Post are decoded.
+
+Each step runs the pages a few times and keeps the fastest round. Results are
+printed as JSON, tagged with the commit. Run from the repository root:
+
+    python benchmarks/json_bench.py --archive blue.jsonl.gz -o results.json
+"""
+
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=C0413
+import archive
+import codec
+from fake_server import FakeCorpus
+from records import read_search_page
+
+DEFAULT_PAGES = 200
+PAGE_SIZE = 100
+ROUNDS = 5
+
+
+def generate_pages(count: int, page_size: int = PAGE_SIZE) -> list[bytes]:
+    """Return `count` searchPosts response bodies of `page_size` posts each."""
+    return [
+        json.dumps(
+            {
+                "cursor": str((page + 1) * page_size),
+                "posts": [
+                    FakeCorpus.make_post(index)
+                    for index in range(page * page_size, (page + 1) * page_size)
+                ],
+            }
+        ).encode("utf-8")
+        for page in range(count)
+    ]
+
+
+def recorded_pages(paths: list[str]) -> list[bytes]:
+    """Return the pages of the archives at paths as response bodies."""
+    return [
+        json.dumps(entry["page"]).encode("utf-8")
+        for path in paths
+        for entry in archive.iter_pages(path)
+    ]
+
+
+def measure(
+    name: str, backend: str, pages: list[bytes], step: Callable[[bytes], Any]
+) -> dict[str, Any]:
+    """Run step on every page ROUNDS times and return the result of the fastest round."""
+    seconds = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for page in pages:
+            step(page)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    size = sum(len(page) for page in pages)
+    result = {
+        "benchmark": name,
+        "backend": backend,
+        "pages": len(pages),
+        "seconds": round(seconds, 6),
+        "pages_per_second": round(len(pages) / seconds) if seconds else None,
+        "mib_per_second": round(size / 2**20 / seconds, 1) if seconds else None,
+    }
+    print(
+        f"{name} with {backend}: {seconds:.3f} s, {result['pages_per_second']} pages/s, "
+        f"{result['mib_per_second']} MiB/s",
+        file=sys.stderr,
+    )
+    return result
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pages: list[bytes]) -> dict[str, Any]:
+    """Run the benchmark with every installed backend and return the report."""
+    params = {"q": "benchmark"}
+    results = []
+    previous = codec.get_backend()
+    try:
+        for backend in codec.available_backends():
+            codec.set_backend(backend)
+            results.append(measure("loads", backend, pages, codec.loads))
+            results.append(
+                measure(
+                    "read_search_page",
+                    backend,
+                    pages,
+                    lambda page: read_search_page(page, params),
+                )
+            )
+    finally:
+        codec.set_backend(previous)
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mib": round(sum(len(page) for page in pages) / 2**20, 2),
+        "results": results,
+    }
+
+
+@click.command()
+@click.option(
+    "--archive",
+    "archive_paths",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Raw-page archive to read the pages from. Can be given more than once.",
+)
+@click.option(
+    "--pages",
+    type=click.IntRange(1, None),
+    default=DEFAULT_PAGES,
+    help=f"Number of pages to generate when no archive is given. Defaults to {DEFAULT_PAGES}.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the JSON report to this file instead of stdout.",
+)
+def main(archive_paths: tuple[str, ...], pages: int, output: str | None) -> None:
+    """Benchmark decoding search pages with every installed JSON backend."""
+    bodies = recorded_pages(list(archive_paths)) if archive_paths else None
+    # Messages about posts with missing data go to stderr, keeping stdout for the report.
+    with contextlib.redirect_stdout(sys.stderr):
+        report = json.dumps(run(bodies or generate_pages(pages)), indent=2)
+    if output is None:
+        print(report)
+        return
+    with open(output, "w", encoding="utf-8") as report_file:
+        report_file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Offline throughput and memory benchmark for the scrape pipeline.
+
+Posts come from synthetic generators shaped like app.bsky.feed.searchPosts
+results, so no network access is needed. For each size, the benchmark measures:
+
+* extract_post_data, with validation answered from memory so only extraction is
+  timed.
+* remove_duplicates, on extracted rows of which one in ten is a duplicate.
+* save_to_csv and extract_post_data_from_csv, on the extracted rows.
+* search_posts end to end, paging through a local fake server that runs in its own
+  process.
+
+Each step is run twice: once timed, and once under tracemalloc to find the peak
+memory it allocates on top of its input. Results are printed as JSON, tagged with
+the commit, so runs can be compared across commits. Run from the repository root:
+
+    python benchmarks/pipeline_bench.py --sizes 10000,100000,1000000 -o results.json
+
+The 1M size needs a few GB of memory.
+"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=C0413
+import client
+import file
+import mission_blue
+from fake_server import ACCESS_TOKEN, FakeCorpus, FakeXrpcServer
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+PAGE_SIZE = 100
+DUPLICATE_EVERY = 10
+# Posts in the untimed first round, which imports pandas and the progress bar.
+WARMUP_SIZE = 100
+
+
+def generate_posts(count: int) -> Iterator[dict]:
+    """Yield `count` raw posts shaped like app.bsky.feed.searchPosts results."""
+    for index in range(count):
+        yield FakeCorpus.make_post(index)
+
+
+def generate_rows(count: int, duplicate_every: int = DUPLICATE_EVERY) -> list[dict]:
+    """Return `count` extracted rows, every `duplicate_every`-th repeating another."""
+    rows: list[dict] = []
+    for index, post in enumerate(generate_posts(count)):
+        if duplicate_every and index and index % duplicate_every == 0:
+            rows.append(dict(rows[index // 2]))
+            continue
+        handle = post["author"]["handle"]
+        rkey = post["uri"].rsplit("/", 1)[-1]
+        rows.append(
+            {
+                "author": handle,
+                "content": post["record"]["text"],
+                "created_at": post["indexedAt"],
+                "post_link": f"https://bsky.app/profile/{handle}/post/{rkey}",
+            }
+        )
+    return rows
+
+
+class AlwaysValid:
+    """Validation cache stand-in that reports every post as existing."""
+
+    def get(self, key: str) -> bool:  # pylint: disable=W0613
+        """Report that the post exists."""
+        return True
+
+    def set_many(self, items: dict) -> None:
+        """Nothing is ever checked, so nothing is stored."""
+
+
+def measure(
+    name: str,
+    size: int,
+    step: Callable[[], Any],
+    setup: Callable[[], Any] | None = None,
+) -> dict[str, Any]:
+    """Run step timed, then again under tracemalloc, and return its result row.
+
+    Args:
+        name (str): Name of the benchmark.
+        size (int): Number of posts the step handles.
+        step (Callable): The work to measure.
+        setup (Callable, optional): Run, unmeasured, before each run of step, so
+            both runs do the same work. Defaults to None.
+
+    Returns:
+        dict: Benchmark name, size, seconds, posts per second and the peak memory
+            in MiB allocated by the step on top of what was already allocated.
+
+    """
+    if setup is not None:
+        setup()
+    start = time.perf_counter()
+    step()
+    seconds = time.perf_counter() - start
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    step()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    result = {
+        "benchmark": name,
+        "size": size,
+        "seconds": round(seconds, 4),
+        "posts_per_second": round(size / seconds) if seconds else None,
+        "peak_mib": round(peak / 2**20, 2),
+    }
+    print(
+        f"{name} x {size}: {seconds:.3f} s, {result['posts_per_second']} posts/s, "
+        f"{result['peak_mib']} MiB peak",
+        file=sys.stderr,
+    )
+    return result
+
+
+def _serve(size: int, urls: Any, stop: Any) -> None:
+    """Serve a corpus of `size` posts until `stop` is set. Runs in a child process."""
+    with FakeXrpcServer(FakeCorpus(size)) as server:
+        urls.put(server.xrpc_url)
+        stop.wait()
+
+
+@contextlib.contextmanager
+def fake_server_process(size: int) -> Iterator[str]:
+    """Run a fake server in its own process, so it does not share the GIL or heap.
+
+    Yields:
+        str: The XRPC URL of the server.
+
+    """
+    context = multiprocessing.get_context("spawn")
+    urls = context.Queue()
+    stop = context.Event()
+    process = context.Process(target=_serve, args=(size, urls, stop), daemon=True)
+    process.start()
+    try:
+        yield urls.get(timeout=600)
+    finally:
+        stop.set()
+        process.join()
+
+
+def bench_search_posts(size: int) -> dict[str, Any]:
+    """Measure search_posts paging through `size` posts from a local server."""
+    api_base_url = client.API_BASE_URL
+    with fake_server_process(size) as xrpc_url:
+        client.API_BASE_URL = xrpc_url
+
+        def step() -> None:
+            params = {"q": "bench", "limit": PAGE_SIZE, "cursor": ""}
+            params["posts_limit"] = size
+            posts = mission_blue.search_posts(params, ACCESS_TOKEN)
+            if len(posts) != size:
+                raise RuntimeError(f"search_posts returned {len(posts)} of {size}")
+
+        try:
+            return measure("search_posts", size, step)
+        finally:
+            client.close()
+            client.API_BASE_URL = api_base_url
+
+
+def bench_extract_post_data(size: int) -> dict[str, Any]:
+    """Measure extract_post_data on `size` raw posts, every one cached as valid."""
+    posts = list(generate_posts(size))
+    return measure(
+        "extract_post_data",
+        size,
+        lambda: file.extract_post_data(posts, cache=AlwaysValid()),  # type: ignore
+    )
+
+
+def bench_csv(size: int, directory: str) -> list[dict[str, Any]]:
+    """Measure deduplicating `size` rows, saving them to CSV and reading them back."""
+    rows = generate_rows(size)
+    path = os.path.join(directory, f"posts-{size}.csv")
+
+    def remove_output() -> None:
+        # save_to_csv merges into an existing file, which is other work.
+        if os.path.exists(path):
+            os.remove(path)
+
+    results = [
+        measure("remove_duplicates", size, lambda: file.remove_duplicates(rows)),
+        measure(
+            "save_to_csv", size, lambda: file.save_to_csv(rows, path), remove_output
+        ),
+        measure(
+            "extract_post_data_from_csv",
+            size,
+            lambda: file.extract_post_data_from_csv(path),
+        ),
+    ]
+    os.remove(path)
+    return results
+
+
+def bench_size(size: int, directory: str) -> list[dict[str, Any]]:
+    """Measure every pipeline step on `size` posts.
+
+    Each step's input is built in its own function, so it is freed before the
+    next step is measured.
+    """
+    return [
+        bench_extract_post_data(size),
+        *bench_csv(size, directory),
+        bench_search_posts(size),
+    ]
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: list[int]) -> dict[str, Any]:
+    """Run the benchmark for every size and return the report."""
+    with tempfile.TemporaryDirectory() as directory:
+        bench_size(WARMUP_SIZE, directory)
+        results = [result for size in sizes for result in bench_size(size, directory)]
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+@click.command()
+@click.option(
+    "--sizes",
+    default=",".join(str(size) for size in DEFAULT_SIZES),
+    help="Comma-separated numbers of posts. Defaults to 10000,100000,1000000.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the JSON report to this file instead of stdout.",
+)
+def main(sizes: str, output: str | None) -> None:
+    """Benchmark the scrape pipeline offline and print a JSON report."""
+    try:
+        counts = [int(size) for size in sizes.split(",")]
+    except ValueError as err:
+        raise click.BadParameter(str(err), param_hint="--sizes") from err
+    # Progress bars and messages go to stderr, keeping stdout for the report.
+    with contextlib.redirect_stdout(sys.stderr):
+        report = json.dumps(run(counts), indent=2)
+    if output is None:
+        print(report)
+        return
+    with open(output, "w", encoding="utf-8") as report_file:
+        report_file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Micro-benchmark for the "no content" page check used by validate_url.
+
+Compares the character-level difflib comparison validate_url used to run against
+the fingerprint comparison it runs now. No network access is needed.
+
+Run from the repository root:
+
+    python benchmarks/validate_url_bench.py
+"""
+
+import os
+import sys
+import timeit
+from difflib import unified_diff
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=C0413
+import file
+
+POST_PAGE = file.NO_CONTENT_TEMPLATE.replace(
+    "<title>Bluesky</title>", "<title>@user.bsky.social on Bluesky</title>"
+)
+
+
+def difflib_is_empty(content: str) -> bool:
+    """Splash-page check as it was done with difflib."""
+    return "".join(unified_diff(content, file.NO_CONTENT_TEMPLATE)) == ""
+
+
+def fingerprint_is_empty(content: str) -> bool:
+    """Splash-page check as it is done now."""
+    # pylint: disable=W0212
+    return file._fingerprint(content) == file.NO_CONTENT_FINGERPRINT
+
+
+def main() -> None:
+    """Time both checks on a splash page and on a post page."""
+    for name, page in (
+        ("no content page", file.NO_CONTENT_TEMPLATE),
+        ("post page", POST_PAGE),
+    ):
+        assert difflib_is_empty(page) == fingerprint_is_empty(page)
+        difflib_time = min(
+            timeit.repeat(partial(difflib_is_empty, page), number=1, repeat=3)
+        )
+        fingerprint_time = (
+            min(
+                timeit.repeat(
+                    partial(fingerprint_is_empty, page), number=1000, repeat=3
+                )
+            )
+            / 1000
+        )
+        print(
+            f"{name} ({len(page)} chars): difflib {difflib_time * 1e3:.2f} ms, "
+            f"fingerprint {fingerprint_time * 1e6:.2f} us, "
+            f"speedup {difflib_time / fingerprint_time:,.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Mission Blue Module that holds the on-disk caches shared between runs."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from types import TracebackType
+from typing import Any, final
+
+CACHE_PATH = ".mission_blue_cache.sqlite3"
+# Seconds a resolved handle is trusted before it is resolved again.
+DID_CACHE_TTL = 24 * 3600
+
+
+@final
+class TTLCache:
+    """A key-value table in a SQLite file whose entries expire after `ttl` seconds.
+
+    Values are stored as JSON so any JSON-serializable value can be cached. Every
+    lookup is counted as a hit or a miss so callers can report cache efficiency at
+    the end of a run. A cache can be shared between threads.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        ttl: float,
+        path: str = CACHE_PATH,
+        revalidate: bool = False,
+    ) -> None:
+        """Open (and create if needed) a cache table.
+
+        Args:
+            table (str): Name of the SQLite table holding this cache.
+            ttl (float): Number of seconds an entry stays valid.
+            path (str, optional): Path to the SQLite file. Defaults to CACHE_PATH.
+            revalidate (bool, optional): Ignore stored entries while still recording
+                new ones. Defaults to False.
+
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.table = table
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        # The connection is shared by worker threads, so access is serialized.
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, checked_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for key, or None if it is missing or expired."""
+        with self._lock:
+            row = None
+            if not self.revalidate:
+                row = self._connection.execute(
+                    f"SELECT value FROM {self.table} WHERE key = ? AND checked_at >= ?",
+                    (key, time.time() - self.ttl),
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value for key, stamped with the current time."""
+        self.set_many({key: value})
+
+    def set_many(self, items: dict[str, Any]) -> None:
+        """Store several values in a single transaction."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, checked_at) "
+                "VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now) for key, value in items.items()],
+            )
+
+    def report(self) -> str:
+        """Return a one-line summary of the hits and misses seen so far."""
+        return f"{self.table} cache: {self.hits} hits, {self.misses} misses"
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "TTLCache":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def validation_cache(
+    ttl: float, path: str = CACHE_PATH, revalidate: bool = False
+) -> TTLCache:
+    """Open the cache of post existence results keyed by post link."""
+    return TTLCache("post_validation", ttl, path, revalidate)
+
+
+def did_cache(
+    ttl: float = DID_CACHE_TTL, path: str = CACHE_PATH, revalidate: bool = False
+) -> TTLCache:
+    """Open the cache of DIDs keyed by lower-cased handle."""
+    return TTLCache("handle_did", ttl, path, revalidate)
@@ -0,0 +1,62 @@
+"""Mission Blue Module that holds crawl checkpoints used to resume long searches.
+
+A checkpoint is a small JSON file next to the output it describes. It records the
+query parameters, the cursor of the next page to fetch, and how many posts have
+been fetched and saved so far. It is rewritten atomically after every page, so an
+interrupted crawl can continue from the last saved page instead of the first.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Any
+
+import statefile
+
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+# Parameters that may change between the interrupted run and the resumed one.
+_RESUMABLE_CHANGES = ("cursor", "posts_limit")
+
+
+class Checkpoint:
+    """The checkpoint of the crawl that writes to a given output."""
+
+    def __init__(self, output_path: str) -> None:
+        """Point at the checkpoint of output_path. Nothing is read or written yet."""
+        self.path = output_path + CHECKPOINT_SUFFIX
+
+    def load(self) -> dict[str, Any] | None:
+        """Return the saved state, or None if there is no checkpoint."""
+        return statefile.read_json(self.path)
+
+    def save(
+        self, params: dict, fetched: int, flushed: int, newest: str | None = None
+    ) -> None:
+        """Record the progress of the crawl.
+
+        Args:
+            params (dict): The query parameters, with "cursor" set to the cursor
+                of the next page to fetch.
+            fetched (int): Number of raw posts fetched so far.
+            flushed (int): Number of posts saved to the output so far.
+            newest (str, optional): created_at of the newest post fetched so far,
+                for the high-water mark of an incremental crawl, see watermark.
+
+        """
+        state = {
+            "params": params,
+            "fetched": fetched,
+            "flushed": flushed,
+            "newest": newest,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        statefile.write_json(self.path, state)
+
+    def clear(self) -> None:
+        """Delete the checkpoint once the crawl is complete."""
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def matches(state: dict[str, Any], params: dict) -> bool:
+        """Return whether a saved state belongs to a crawl with these parameters."""
+        return statefile.same_search(state["params"], params, _RESUMABLE_CHANGES)
@@ -0,0 +1,263 @@
+"""Mission Blue Module that holds the shared HTTP client used for every request."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import metrics
+from lazy import lazy_import
+from scheduler import RequestScheduler
+
+if TYPE_CHECKING:
+    import requests
+else:
+    requests = lazy_import("requests")
+
+API_BASE_URL = "https://bsky.social/xrpc"
+# Host of the post pages, linked to in the output and fetched by html validation.
+WEB_BASE_URL = "https://bsky.app"
+# Seconds to wait for a connection and for each read, as (connect, read).
+DEFAULT_TIMEOUT = (5, 10)
+# Number of distinct hosts to keep pools for (bsky.social and bsky.app).
+POOL_CONNECTIONS = 4
+# Number of keep-alive connections per host. Matches the largest worker count
+# the CLI accepts so concurrent workers never wait on the pool.
+POOL_MAXSIZE = 64
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_access_token: str | None = None
+# Returns a new access token after the current one was rejected as expired.
+_token_refresher: Callable[[], str] | None = None
+_refresh_lock = threading.Lock()
+# Expired access tokens mapped to the token that replaced them.
+_replaced_tokens: dict[str, str] = {}
+# Paces and retries every XRPC request, see scheduler.
+_scheduler = RequestScheduler()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use.
+
+    The session keeps connections alive between requests so each host only pays
+    for the TCP and TLS handshakes once per connection in the pool.
+    """
+    global _session  # pylint: disable=W0603
+    with _session_lock:
+        if _session is None:
+            # pylint: disable=C0415
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def close() -> None:
+    """Close the shared session and forget the access token and rate-limit state."""
+    global _session, _access_token  # pylint: disable=W0603
+    global _token_refresher, _scheduler  # pylint: disable=W0603
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _access_token = None
+        _token_refresher = None
+        _replaced_tokens.clear()
+        _scheduler = RequestScheduler()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Return the scheduler shared by every XRPC request in the process."""
+    return _scheduler
+
+
+def set_access_token(token: str | None) -> None:
+    """Set the token sent with XRPC requests that do not pass their own."""
+    global _access_token  # pylint: disable=W0603
+    _access_token = token
+
+
+def set_token_refresher(refresher: Callable[[], str] | None) -> None:
+    """Set the function called to get a new access token when one expires.
+
+    XRPC calls rejected because their token expired are retried once with the
+    token the refresher returns. Concurrent callers share a single refresh.
+    """
+    global _token_refresher  # pylint: disable=W0603
+    _token_refresher = refresher
+
+
+def _is_expired_token(response: requests.Response) -> bool:
+    # The service answers 400 ExpiredToken for an expired access token, and 401
+    # for a token it no longer accepts.
+    if response.status_code == 401:
+        return True
+    if response.status_code != 400:
+        return False
+    try:
+        return bool(response.json().get("error") == "ExpiredToken")
+    except ValueError:
+        return False
+
+
+def _refresh_token(stale: str) -> str:
+    with _refresh_lock:
+        # Another thread may have refreshed while this one waited for the lock.
+        if _access_token and _access_token != stale:
+            return _access_token
+        assert _token_refresher is not None
+        token = _token_refresher()
+        _replaced_tokens[stale] = token
+        set_access_token(token)
+        return token
+
+
+def set_base_url(base_url: str) -> None:
+    """Send every request to one server standing in for bsky.social and bsky.app.
+
+    Args:
+        base_url (str): Root URL of the server, e.g. "http://127.0.0.1:8000" for
+            fake_server.py. XRPC methods are called under base_url/xrpc.
+
+    """
+    global API_BASE_URL, WEB_BASE_URL  # pylint: disable=W0603
+    WEB_BASE_URL = base_url.rstrip("/")
+    API_BASE_URL = f"{WEB_BASE_URL}/xrpc"
+
+
+def xrpc_url(method: str) -> str:
+    """Return the URL of an XRPC method, e.g. "app.bsky.feed.searchPosts"."""
+    return f"{API_BASE_URL}/{method}"
+
+
+def _auth_headers(token: str | None, headers: dict | None) -> dict:
+    merged = dict(headers or {})
+    if token:
+        merged.setdefault("Authorization", f"Bearer {token}")
+    return merged
+
+
+def _size(body: Any) -> int:
+    # Bodies may also be None, or a file or generator for streamed uploads.
+    return len(body) if isinstance(body, (bytes, str)) else 0
+
+
+def _send_measured(
+    method: str, send: Callable[[], requests.Response], retry: bool
+) -> requests.Response:
+    """Send a request once and record it in the run metrics under method."""
+    start = time.perf_counter()
+    try:
+        response = send()
+    except requests.exceptions.RequestException:
+        metrics.record_request(
+            method, time.perf_counter() - start, retry=retry, error=True
+        )
+        raise
+    metrics.record_request(
+        method,
+        time.perf_counter() - start,
+        bytes_sent=_size(getattr(response.request, "body", None)),
+        bytes_received=_size(response.content),
+        retry=retry,
+    )
+    return response
+
+
+def _xrpc(
+    send: Callable[..., requests.Response],
+    method: str,
+    token: str | None,
+    headers: dict | None,
+    **kwargs: Any,
+) -> requests.Response:
+    token = token or _access_token
+    # Callers may hold on to a token that has since been refreshed.
+    while token in _replaced_tokens:
+        token = _replaced_tokens[token]
+    url = xrpc_url(method)
+    attempts = 0
+
+    def request() -> requests.Response:
+        nonlocal attempts
+        attempts += 1
+        return _send_measured(
+            method,
+            lambda: send(url, headers=_auth_headers(token, headers), **kwargs),
+            attempts > 1,
+        )
+
+    response = _scheduler.send(method, request)
+    if (
+        token
+        and _token_refresher is not None
+        and "Authorization" not in (headers or {})
+        and _is_expired_token(response)
+    ):
+        response.close()
+        token = _refresh_token(token)
+        response = _scheduler.send(method, request)
+    return response
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    """Send a GET request through the shared session with the default timeout."""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+
+def get_page(url: str) -> requests.Response:
+    """Fetch a bsky.app post page, recording it in the run metrics."""
+    return _send_measured("page", lambda: get(url), retry=False)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    """Send a POST request through the shared session with the default timeout."""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session().post(url, **kwargs)
+
+
+def xrpc_get(
+    method: str,
+    token: str | None = None,
+    headers: dict | None = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """Call an XRPC query with the access token in the Authorization header.
+
+    The request waits for the shared rate-limit budget and is retried on 429,
+    5xx and connection errors, see scheduler.RequestScheduler.send. A call
+    rejected for an expired token is retried once with a refreshed token when a
+    refresher is set.
+
+    Args:
+        method (str): XRPC method name, e.g. "app.bsky.feed.searchPosts".
+        token (str, optional): Access token. Defaults to the one set with
+            set_access_token.
+        headers (dict, optional): Extra request headers.
+        **kwargs: Passed on to requests, e.g. params.
+
+    Returns:
+        requests.Response: The response. Status codes are not checked.
+
+    """
+    return _xrpc(get, method, token, headers, **kwargs)
+
+
+def xrpc_post(
+    method: str,
+    token: str | None = None,
+    headers: dict | None = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """Call an XRPC procedure, see xrpc_get."""
+    return _xrpc(post, method, token, headers, **kwargs)
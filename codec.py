@@ -0,0 +1,153 @@
+"""Mission Blue Module that holds the JSON codec used for search pages and archives.
+
+Decoding searchPosts pages with the standard library builds a dictionary for every
+embed, facet and label of every post, only for most of it to be thrown away when
+the page is projected to records. The codec uses the fastest installed backend:
+
+* msgspec: search pages are decoded straight into a schema that holds only the
+  fields that are saved, so nothing else is ever built.
+* orjson: whole pages are decoded, several times faster than the standard library.
+* json: the standard library, used when neither is installed.
+
+msgspec and orjson are optional. The backend can be forced with the
+MISSION_BLUE_JSON environment variable or set_backend, e.g. to compare them.
+"""
+
+import functools
+import importlib.util
+import json
+import os
+from typing import Any
+
+BACKENDS = ("msgspec", "orjson", "json")
+
+_backend: str | None = None
+
+
+def available_backends() -> list[str]:
+    """Return the backends that can be used here, fastest first."""
+    return [
+        name
+        for name in BACKENDS
+        if name == "json" or importlib.util.find_spec(name) is not None
+    ]
+
+
+def get_backend() -> str:
+    """Return the backend in use, picking the fastest installed one on first use."""
+    global _backend  # pylint: disable=W0603
+    if _backend is None:
+        forced = os.environ.get("MISSION_BLUE_JSON")
+        if forced:
+            set_backend(forced)
+        else:
+            _backend = available_backends()[0]
+    return _backend  # type: ignore[return-value]
+
+
+def set_backend(name: str) -> None:
+    """Use the named backend from now on.
+
+    Raises:
+        ValueError: If name is not one of BACKENDS.
+        ImportError: If the backend is not installed.
+
+    """
+    global _backend  # pylint: disable=W0603
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend {name!r}, use one of {BACKENDS}.")
+    if name not in available_backends():
+        raise ImportError(f"The {name} JSON backend needs: pip install {name}")
+    _backend = name
+
+
+def loads(content: bytes | str) -> Any:
+    """Decode a JSON document.
+
+    Raises:
+        ValueError: If content is not JSON. Every backend's decode error is one.
+
+    """
+    backend = get_backend()
+    # pylint: disable=C0415
+    if backend == "msgspec":
+        import msgspec
+
+        return msgspec.json.decode(content)
+    if backend == "orjson":
+        import orjson
+
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def dumps(value: Any) -> str:
+    """Encode a value as compact JSON on a single line, without escaping non-ASCII."""
+    backend = get_backend()
+    # pylint: disable=C0415
+    if backend == "msgspec":
+        import msgspec
+
+        encoded: bytes = msgspec.json.encode(value)
+        return encoded.decode("utf-8")
+    if backend == "orjson":
+        import orjson
+
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+@functools.cache
+def _search_page_decoder() -> Any:
+    # pylint: disable=C0415
+    # pylint: disable=R0903
+    import msgspec
+
+    class Author(msgspec.Struct):
+        """The author fields that are saved."""
+
+        handle: str = ""
+
+    class Record(msgspec.Struct):
+        """The record fields that are saved."""
+
+        text: str = ""
+
+    class RawPost(msgspec.Struct):
+        """The post fields read by records.Post.from_raw. Missing ones are None."""
+
+        uri: str | None = None
+        author: Author | None = None
+        record: Record | None = None
+        # pylint: disable=C0103
+        indexedAt: str | None = None
+
+    class SearchPage(msgspec.Struct):
+        """A searchPosts response, keeping only what paging and records need."""
+
+        posts: list[RawPost] = msgspec.field(default_factory=list)
+        cursor: str | None = None
+
+    return msgspec.json.Decoder(SearchPage)
+
+
+def decode_search_page(content: bytes) -> Any:
+    """Decode a searchPosts response into the msgspec search page schema.
+
+    Returns:
+        SearchPage | None: A page whose posts have uri, author.handle, record.text
+            and indexedAt attributes, or None if msgspec is not the backend or the
+            page does not fit the schema. Decode it with loads then.
+
+    Raises:
+        ValueError: If content is not JSON.
+
+    """
+    if get_backend() != "msgspec":
+        return None
+    import msgspec  # pylint: disable=C0415
+
+    try:
+        return _search_page_decoder().decode(content)
+    except msgspec.ValidationError:
+        return None
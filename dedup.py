@@ -0,0 +1,171 @@
+"""Mission Blue Module that holds the de-duplication store used for large inputs.
+
+Posts are identified by a 64-bit hash of their post_link instead of the full
+string. Keys are kept in a Python set until `spill_threshold` keys have been seen,
+then moved to a temporary SQLite file so memory use stays flat for archives of any
+size. New keys are written to SQLite in batches. An optional Bloom filter answers
+"definitely new" for most keys without querying SQLite.
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+from collections.abc import Iterable, Iterator
+from types import TracebackType
+from typing import final
+
+# Keys kept in memory before the store spills to SQLite.
+DEFAULT_SPILL_THRESHOLD = 1_000_000
+# Number of new keys buffered before they are written to SQLite in one batch.
+_FLUSH_SIZE = 10_000
+_BLOOM_HASHES = 4
+
+
+def post_key(post_link: str) -> int:
+    """Return the 64-bit hash used to identify a post_link."""
+    digest = hashlib.blake2b(post_link.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _signed(key: int) -> int:
+    """Map an unsigned 64-bit key onto SQLite's signed INTEGER range."""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+@final
+class DedupStore:
+    """Remembers which posts have been seen, spilling to disk for large inputs."""
+
+    def __init__(
+        self,
+        spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+        directory: str | None = None,
+        bloom_bits: int = 0,
+    ) -> None:
+        """Create an empty store.
+
+        Args:
+            spill_threshold (int, optional): Number of keys kept in memory before
+                moving them to SQLite. Defaults to DEFAULT_SPILL_THRESHOLD.
+            directory (str, optional): Where to create the temporary SQLite file.
+                Defaults to the system temporary directory.
+            bloom_bits (int, optional): Size of the Bloom filter used once spilled,
+                in bits. About 10 bits per expected post gives a 1% false positive
+                rate. Defaults to 0 (no Bloom filter).
+
+        """
+        self.spill_threshold = spill_threshold
+        self.directory = directory
+        self._memory: set[int] = set()
+        self._pending: set[int] = set()
+        self._count = 0
+        self._path: str | None = None
+        self._connection: sqlite3.Connection | None = None
+        self._bloom_bits = bloom_bits
+        self._bloom = bytearray((bloom_bits + 7) // 8) if bloom_bits else None
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the keys have been moved to SQLite."""
+        return self._connection is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _bloom_positions(self, key: int) -> Iterator[int]:
+        low, high = key & 0xFFFFFFFF, key >> 32
+        for index in range(_BLOOM_HASHES):
+            yield (low + index * high) % self._bloom_bits
+
+    def _bloom_add(self, key: int) -> None:
+        if self._bloom is not None:
+            for position in self._bloom_positions(key):
+                self._bloom[position >> 3] |= 1 << (position & 7)
+
+    def _bloom_may_contain(self, key: int) -> bool:
+        if self._bloom is None:
+            return True
+        return all(
+            self._bloom[position >> 3] & (1 << (position & 7))
+            for position in self._bloom_positions(key)
+        )
+
+    def _spill(self) -> None:
+        handle, self._path = tempfile.mkstemp(suffix=".sqlite3", dir=self.directory)
+        os.close(handle)
+        self._connection = sqlite3.connect(self._path)
+        self._connection.execute("PRAGMA journal_mode = OFF")
+        self._connection.execute("PRAGMA synchronous = OFF")
+        self._connection.execute("CREATE TABLE keys (key INTEGER PRIMARY KEY)")
+        for key in self._memory:
+            self._bloom_add(key)
+        self._pending = self._memory
+        self._memory = set()
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._connection is not None and self._pending:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO keys (key) VALUES (?)",
+                    ((_signed(key),) for key in self._pending),
+                )
+            self._pending = set()
+
+    def add(self, post_link: str) -> bool:
+        """Record a post_link. Returns False if it has been seen before."""
+        key = post_key(post_link)
+
+        if self._connection is None:
+            if key in self._memory:
+                return False
+            self._memory.add(key)
+            self._count += 1
+            if len(self._memory) > self.spill_threshold:
+                self._spill()
+            return True
+
+        if key in self._pending:
+            return False
+        # Keys not written yet were checked above, so the lookup needs no flush.
+        if (
+            self._bloom_may_contain(key)
+            and self._connection.execute(
+                "SELECT 1 FROM keys WHERE key = ?", (_signed(key),)
+            ).fetchone()
+        ):
+            return False
+        self._bloom_add(key)
+        self._pending.add(key)
+        self._count += 1
+        if len(self._pending) >= _FLUSH_SIZE:
+            self._flush()
+        return True
+
+    def close(self) -> None:
+        """Release the SQLite file, if the store spilled."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        if self._path is not None:
+            os.remove(self._path)
+            self._path = None
+
+    def __enter__(self) -> "DedupStore":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def iter_unique(posts: Iterable[dict], store: DedupStore) -> Iterator[dict]:
+    """Yield the first occurrence of every post_link, in input order."""
+    for post in posts:
+        if store.add(post["post_link"]):
+            yield post
@@ -0,0 +1,522 @@
+"""Local stand-in for the Bluesky endpoints used by Mission Blue.
+
+The server generates a deterministic corpus of posts and answers the XRPC methods
+the scraper calls, plus the bsky.app post pages used by html validation. It is used
+by the tests to exercise the full pipeline without network access, and can be run
+on its own for offline runs and load tests, with added latency, random 429 and 5xx
+answers, rate-limit headers and expiring access tokens:
+
+    python fake_server.py --posts 100000 --latency 0.05 --error-rate 0.01
+    python mission_blue.py -q anything --base-url http://127.0.0.1:8000
+
+Any credentials are accepted.
+"""
+
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any, final
+from urllib.parse import parse_qs, urlparse
+
+import click
+
+from file import NO_CONTENT_TEMPLATE
+from records import parse_datetime
+
+ACCESS_TOKEN = "fake-access-token"
+REFRESH_TOKEN = "fake-refresh-token"
+CORPUS_START = datetime(2025, 1, 1)
+# Statuses sent at random when an error rate is set.
+FAULT_STATUSES = (429, 500, 502, 503)
+
+
+def _parse_time(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp into a naive UTC datetime."""
+    return parse_datetime(value).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class FakeCorpus:
+    """A deterministic list of posts, newest first."""
+
+    def __init__(self, size: int = 500, deleted_every: int = 0) -> None:
+        """Generate the corpus.
+
+        Args:
+            size (int, optional): Number of posts. Defaults to 500.
+            deleted_every (int, optional): Mark every n-th post as deleted, so it is
+                still returned by search but missing from getPosts and its page.
+                Defaults to 0 (no deleted posts).
+
+        """
+        self.posts = [self.make_post(index) for index in range(size)]
+        self.deleted = {
+            post["uri"]
+            for index, post in enumerate(self.posts)
+            if deleted_every and index % deleted_every == 0
+        }
+        self.by_uri = {post["uri"]: post for post in self.posts}
+        self.by_rkey = {post["uri"].rsplit("/", 1)[-1]: post for post in self.posts}
+
+    @staticmethod
+    def make_post(index: int) -> dict:
+        """Return a raw post shaped like an app.bsky.feed.searchPosts result."""
+        author = index % 50
+        # Newest first: one post per minute, counting back from CORPUS_START.
+        timestamp = (CORPUS_START - timedelta(minutes=index)).strftime(
+            "%Y-%m-%dT%H:%M:%S.000Z"
+        )
+        return {
+            "uri": f"at://did:plc:fake{author}/app.bsky.feed.post/{index:013d}",
+            "cid": f"bafyfake{index}",
+            "author": {
+                "did": f"did:plc:fake{author}",
+                "handle": f"user{author}.test",
+                "displayName": f"User {author}",
+            },
+            "record": {
+                "$type": "app.bsky.feed.post",
+                "text": f"Post number {index}",
+                "createdAt": timestamp,
+                "langs": ["en"],
+            },
+            "replyCount": index % 3,
+            "repostCount": index % 5,
+            "likeCount": index % 7,
+            "indexedAt": timestamp,
+            "labels": [],
+        }
+
+    def search(self, since: str = "", until: str = "") -> list[dict]:
+        """Return the posts indexed in [since, until), newest first."""
+        if not since and not until:
+            return self.posts
+        start = _parse_time(since) if since else datetime.min
+        end = _parse_time(until) if until else datetime.max
+        return [
+            post for post in self.posts if start <= _parse_time(post["indexedAt"]) < end
+        ]
+
+    def exists(self, uri: str) -> bool:
+        """Return whether a post is in the corpus and not deleted."""
+        return uri in self.by_uri and uri not in self.deleted
+
+
+class FakeXrpcHandler(BaseHTTPRequestHandler):
+    """Request handler for FakeXrpcServer."""
+
+    server: "FakeXrpcServer"
+
+    def setup(self) -> None:
+        super().setup()
+        # RateLimit-* headers sent with the answer, set by _admit.
+        self.extra_headers: dict[str, str] = {}
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # pylint: disable=W0622
+        """Keep test output quiet."""
+
+    def _send(self, status: int, body: str, content_type: str) -> None:
+        encoded = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in self.extra_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        self._send(status, json.dumps(payload), "application/json")
+
+    def _bearer(self) -> str:
+        return self.headers.get("Authorization", "").removeprefix("Bearer ")
+
+    def _admit(self) -> bool:
+        """Delay the request, then fail it at random or when over the rate limit.
+
+        Returns:
+            bool: Whether the request should be answered normally. If not, an error
+                was already sent.
+
+        """
+        server = self.server
+        server.count_request(self.path)
+        if server.latency:
+            time.sleep(server.latency)
+        if not self.path.startswith("/xrpc/"):
+            return True
+        allowed, self.extra_headers = server.take_rate_limit()
+        if not allowed:
+            self._send_json(
+                429, {"error": "RateLimitExceeded", "message": "Rate Limit Exceeded"}
+            )
+            return False
+        status = server.pick_fault()
+        if status:
+            self._send_json(status, {"error": "InternalServerError"})
+            return False
+        return True
+
+    def _authorized(self) -> bool:
+        self.server.expire_stale_token()
+        token = self._bearer()
+        if token == self.server.access_token:
+            return True
+        if token in self.server.expired_tokens:
+            # The real service answers an expired access token this way.
+            self._send_json(
+                400, {"error": "ExpiredToken", "message": "Token has expired"}
+            )
+            return False
+        self._send_json(
+            401, {"error": "AuthenticationRequired", "message": "Invalid token"}
+        )
+        return False
+
+    def _send_session(self, handle: str) -> None:
+        self._send_json(
+            200,
+            {
+                "did": "did:plc:fakeself",
+                "handle": handle,
+                "accessJwt": self.server.access_token,
+                "refreshJwt": self.server.refresh_token,
+            },
+        )
+
+    def do_POST(self) -> None:
+        # pylint: disable=C0103
+        """Answer com.atproto.server.createSession and refreshSession."""
+        if not self._admit():
+            return
+        path = urlparse(self.path).path
+        if path == "/xrpc/com.atproto.server.createSession":
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            self._send_session(body.get("identifier", ""))
+            return
+        if path == "/xrpc/com.atproto.server.refreshSession":
+            if self._bearer() != self.server.refresh_token:
+                self._send_json(
+                    400, {"error": "ExpiredToken", "message": "Token has expired"}
+                )
+                return
+            self.server.rotate_refresh_token()
+            self._send_session("fakeself.test")
+            return
+        self._send_json(404, {"error": "MethodNotImplemented"})
+
+    def do_GET(self) -> None:
+        # pylint: disable=C0103
+        """Answer the XRPC queries and bsky.app post pages."""
+        if not self._admit():
+            return
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        corpus = self.server.corpus
+
+        if parsed.path.startswith("/profile/"):
+            # /profile/<handle>/post/<rkey>
+            parts = parsed.path.split("/")
+            post = corpus.by_rkey.get(parts[-1])
+            exists = (
+                post is not None
+                and post["author"]["handle"] == parts[2]
+                and corpus.exists(post["uri"])
+            )
+            page = NO_CONTENT_TEMPLATE
+            if exists:
+                page = page.replace(
+                    "<title>Bluesky</title>", f"<title>{parts[2]}</title>"
+                )
+            self._send(200, page, "text/html; charset=utf-8")
+            return
+
+        if parsed.path == "/xrpc/com.atproto.identity.resolveHandle":
+            if not self._authorized():
+                return
+            handle = query.get("handle", [""])[0]
+            self._send_json(200, {"did": f"did:plc:{handle.split('.')[0]}"})
+            return
+
+        if parsed.path == "/xrpc/app.bsky.feed.searchPosts":
+            if not self._authorized():
+                return
+            limit = min(int(query.get("limit", ["25"])[0]), self.server.page_size)
+            start = int(query.get("cursor", ["0"])[0] or 0)
+            results = corpus.search(
+                query.get("since", [""])[0], query.get("until", [""])[0]
+            )
+            if self.server.search_depth:
+                results = results[: self.server.search_depth]
+            payload: dict = {"posts": results[start : start + limit]}
+            if start + limit < len(results):
+                payload["cursor"] = str(start + limit)
+            self._send_json(200, payload)
+            return
+
+        if parsed.path == "/xrpc/app.bsky.feed.getPosts":
+            if not self._authorized():
+                return
+            uris = query.get("uris", [])
+            posts = [corpus.by_uri[uri] for uri in uris if corpus.exists(uri)]
+            self._send_json(200, {"posts": posts})
+            return
+
+        self._send_json(404, {"error": "MethodNotImplemented"})
+
+
+@final
+class FakeXrpcServer(ThreadingHTTPServer):
+    """A threaded HTTP server that runs in the background until closed.
+
+    Example:
+        with FakeXrpcServer(FakeCorpus(1000)) as server:
+            client.API_BASE_URL = server.xrpc_url
+
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        corpus: FakeCorpus,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        search_depth: int = 0,
+        page_size: int = 100,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        token_ttl: float = 0.0,
+        rate_limit: int = 0,
+        rate_window: float = 300.0,
+        seed: int = 0,
+    ) -> None:
+        # pylint: disable=R0913
+        # pylint: disable=R0917
+        """Bind the server.
+
+        Args:
+            corpus (FakeCorpus): Posts to serve.
+            host (str, optional): Interface to bind. Defaults to 127.0.0.1.
+            port (int, optional): Port to bind, 0 picks a free one. Defaults to 0.
+            search_depth (int, optional): Stop searchPosts cursor chains after this
+                many results, like the real service does. Defaults to 0 (no limit).
+            page_size (int, optional): Most posts returned by one searchPosts
+                request, whatever limit is asked for. Defaults to 100.
+            latency (float, optional): Seconds to wait before answering each
+                request. Defaults to 0.
+            error_rate (float, optional): Fraction of XRPC requests answered with a
+                random 429, 500, 502 or 503. Defaults to 0.
+            token_ttl (float, optional): Seconds an access token is accepted for
+                before it expires, 0 for never. Defaults to 0.
+            rate_limit (int, optional): XRPC requests allowed per rate_window, sent
+                in RateLimit-* headers and enforced with 429s. Defaults to 0 (no
+                limit, no headers).
+            rate_window (float, optional): Length of a rate-limit window in
+                seconds. Defaults to 300.
+            seed (int, optional): Seed for the random errors. Defaults to 0.
+
+        """
+        super().__init__((host, port), FakeXrpcHandler)
+        self.corpus = corpus
+        self.search_depth = search_depth
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self._random = random.Random(seed)
+        self._token_issued = time.monotonic()
+        self._window_start = time.time()
+        self._window_used = 0
+        self.access_token = ACCESS_TOKEN
+        self.refresh_token = REFRESH_TOKEN
+        self.expired_tokens: set[str] = set()
+        self._generation = 0
+        self.request_counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """URL of the server root, standing in for https://bsky.app."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def xrpc_url(self) -> str:
+        """URL of the XRPC endpoint, standing in for https://bsky.social/xrpc."""
+        return f"{self.base_url}/xrpc"
+
+    def count_request(self, path: str) -> None:
+        """Count one request to the given path, ignoring the query string."""
+        name = urlparse(path).path.rsplit("/", 1)[-1]
+        if urlparse(path).path.startswith("/profile/"):
+            name = "postPage"
+        with self._lock:
+            self.request_counts[name] = self.request_counts.get(name, 0) + 1
+
+    def pick_fault(self) -> int:
+        """Return a status to fail the current request with, or 0 to answer it."""
+        if not self.error_rate:
+            return 0
+        with self._lock:
+            if self._random.random() >= self.error_rate:
+                return 0
+            return self._random.choice(FAULT_STATUSES)
+
+    def take_rate_limit(self) -> tuple[bool, dict[str, str]]:
+        """Count one request against the rate limit.
+
+        Returns:
+            tuple[bool, dict[str, str]]: Whether the request is within the limit,
+                and the RateLimit-* headers to send with its answer.
+
+        """
+        if not self.rate_limit:
+            return True, {}
+        with self._lock:
+            now = time.time()
+            if now >= self._window_start + self.rate_window:
+                self._window_start = now
+                self._window_used = 0
+            allowed = self._window_used < self.rate_limit
+            if allowed:
+                self._window_used += 1
+            headers = {
+                "RateLimit-Limit": str(self.rate_limit),
+                "RateLimit-Remaining": str(self.rate_limit - self._window_used),
+                "RateLimit-Reset": str(int(self._window_start + self.rate_window)),
+                "RateLimit-Policy": f"{self.rate_limit};w={int(self.rate_window)}",
+            }
+        return allowed, headers
+
+    def expire_stale_token(self) -> None:
+        """Expire the access token if it is older than token_ttl."""
+        if self.token_ttl and time.monotonic() - self._token_issued >= self.token_ttl:
+            self.expire_access_token()
+
+    def expire_access_token(self) -> None:
+        """Expire the current access token. Sessions created later get a new one."""
+        with self._lock:
+            self._generation += 1
+            self.expired_tokens.add(self.access_token)
+            self.access_token = f"{ACCESS_TOKEN}-{self._generation}"
+            self._token_issued = time.monotonic()
+
+    def rotate_refresh_token(self) -> None:
+        """Replace the refresh token, which can only be used once."""
+        with self._lock:
+            self._generation += 1
+            self.refresh_token = f"{REFRESH_TOKEN}-{self._generation}"
+
+    def start(self) -> "FakeXrpcServer":
+        """Serve requests from a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop serving and release the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeXrpcServer":
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", help="Interface to bind.")
+@click.option("--port", type=int, default=8000, help="Port to bind. Defaults to 8000.")
+@click.option(
+    "--posts",
+    type=click.IntRange(0, None),
+    default=10000,
+    help="Number of posts in the corpus. Defaults to 10000.",
+)
+@click.option(
+    "--deleted-every",
+    type=click.IntRange(0, None),
+    default=0,
+    help="Mark every n-th post as deleted. Defaults to 0 (none).",
+)
+@click.option(
+    "--page-size",
+    type=click.IntRange(1, None),
+    default=100,
+    help="Most posts per searchPosts page. Defaults to 100.",
+)
+@click.option(
+    "--search-depth",
+    type=click.IntRange(0, None),
+    default=0,
+    help="Stop cursor chains after this many results. Defaults to 0 (no limit).",
+)
+@click.option(
+    "--latency",
+    type=click.FloatRange(0, None),
+    default=0.0,
+    help="Seconds to wait before answering each request. Defaults to 0.",
+)
+@click.option(
+    "--error-rate",
+    type=click.FloatRange(0, 1),
+    default=0.0,
+    help="Fraction of XRPC requests answered with a random 429 or 5xx. Defaults to 0.",
+)
+@click.option(
+    "--token-ttl",
+    type=click.FloatRange(0, None),
+    default=0.0,
+    help="Seconds before an access token expires. Defaults to 0 (never).",
+)
+@click.option(
+    "--rate-limit",
+    type=click.IntRange(0, None),
+    default=0,
+    help="XRPC requests allowed per --rate-window. Defaults to 0 (no limit).",
+)
+@click.option(
+    "--rate-window",
+    type=click.FloatRange(1, None),
+    default=300.0,
+    help="Length of a rate-limit window in seconds. Defaults to 300.",
+)
+@click.option("--seed", type=int, default=0, help="Seed for the random errors.")
+def serve(
+    host: str,
+    port: int,
+    posts: int,
+    deleted_every: int,
+    **options: Any,
+) -> None:
+    """Serve a fake Bluesky until interrupted."""
+    print(f"Generating {posts} posts...")
+    server = FakeXrpcServer(FakeCorpus(posts, deleted_every), host, port, **options)
+    print(f"Serving at {server.base_url}, run with --base-url {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
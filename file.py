@@ -1,37 +1,37 @@
 """Mission Blue Module that holds file handling functions for saving and loading data."""
 
 import csv
+import hashlib
 import os
 import sys
-from difflib import unified_diff
-
-import pandas as pd
-import requests
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, TypeVar
+
+import client
+import metrics
+from cache import TTLCache
+from dedup import DedupStore, iter_unique
+from lazy import lazy_import
+from records import Post, as_row, project_page
+from writers import write_batches
+
+if TYPE_CHECKING:
+    import requests
+else:
+    requests = lazy_import("requests")
 
 DIRECTORY_NAME = "Scraped Posts"
+# app.bsky.feed.getPosts accepts at most 25 AT-URIs per request.
+GET_POSTS_BATCH_SIZE = 25
+VALIDATION_STRATEGIES = ("xrpc", "html")
 
-# Generates Directory where Scraped post will reside in
-if not os.path.isdir(DIRECTORY_NAME):
-    try:
-        os.mkdir(DIRECTORY_NAME)
-        print(f"Directory '{DIRECTORY_NAME}' created successfully.")
-    except FileExistsError:
-        print(f"Directory '{DIRECTORY_NAME}' already exists.")
-    except PermissionError:
-        print(f"Permission denied: Unable to create '{DIRECTORY_NAME}'.")
-
-
-def validate_url(url: str) -> bool:
-    """Validate URL to ensure it is a valid URL.
-
-    Args:
-        url (str): URL to validate.
+T = TypeVar("T")
+R = TypeVar("R")
 
-    Returns:
-        bool: True if URL is valid, False otherwise.
 
-    """
-    no_content_template = """<!DOCTYPE html>
+# Page bsky.app serves when a post does not exist.
+NO_CONTENT_TEMPLATE = """<!DOCTYPE html>
 <html>
 <head>
   <meta charset="UTF-8">
@@ -151,60 +151,215 @@ def validate_url(url: str) -> bool:
 </html>
 """
 
+
+def _fingerprint(text: str) -> bytes:
+    """Return a digest that identifies a page by its exact content."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+NO_CONTENT_FINGERPRINT = _fingerprint(NO_CONTENT_TEMPLATE)
+
+
+def _page_exists(url: str) -> bool:
+    """Fetch a post page and report whether it is not the no content page.
+
+    Raises:
+        requests.exceptions.RequestException: If the page could not be fetched.
+
+    """
+    page = client.get_page(url)
+    content_string = page.text
+    # # Use in the event that the test cases fail for debugging
+    # # Be sure to replace NO_CONTENT_TEMPLATE with the text generated from the
+    # # content.txt file.
+    # with open("content.txt", "w", encoding="utf-8") as content, open("no_content.txt", "w", encoding="utf-8") as no_content:
+    #     content.write(content_string)
+    #     no_content.write(NO_CONTENT_TEMPLATE)
+    return _fingerprint(content_string) != NO_CONTENT_FINGERPRINT
+
+
+def validate_url(url: str) -> bool:
+    """Validate URL to ensure it is a valid URL.
+
+    Args:
+        url (str): URL to validate.
+
+    Returns:
+        bool: True if URL is valid, False otherwise.
+
+    """
     try:
-        page = requests.get(url, timeout=10)
-        content_string = page.text
-        diff = unified_diff(content_string, no_content_template)
-        diff_string = "".join(diff)
-        if diff_string == "":
-            return False
-        # # Use in the event that the test cases fail for debugging
-        # # Be sure to replace the no_content_template variable with the text generated from the
-        # # content.txt file.
-        # with open("content.txt", "w", encoding="utf-8") as content, open("no_content.txt", "w", encoding="utf-8") as no_content:
-        #     content.write(content_string)
-        #     no_content.write(no_content_template)
-        # print(f"{diff_string}")
-        return True
+        return _page_exists(url)
     except (requests.exceptions.HTTPError, requests.exceptions.ConnectionError):
         print("Page Not Found")
         sys.exit(1)
 
 
-def extract_post_data(posts: list[dict]) -> list[dict]:
-    """Extract relevant data from posts and filter by date range.
+def _map_concurrently(
+    func: Callable[[T], R], items: list[T], workers: int = 1
+) -> list[R]:
+    """Apply func to every item with up to `workers` threads, keeping input order."""
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(func, items))
+
+
+def _check_urls(urls: list[str], workers: int = 1) -> list[bool | None]:
+    """Validate many post URLs concurrently, using None for posts that failed."""
+
+    def check(url: str) -> bool | None:
+        try:
+            return _page_exists(url)
+        except requests.exceptions.RequestException as err:
+            print(f"Error validating {url}: {err}")
+            return None
+
+    return _map_concurrently(check, urls, workers)
+
+
+def validate_urls(urls: list[str], workers: int = 1) -> list[bool]:
+    """Validate many post URLs concurrently.
+
+    Unlike validate_url, a failed request does not stop the run. The error is
+    reported for that post and the post is kept, since the search that returned
+    it moments ago is the best evidence available.
+
+    Args:
+        urls (list[str]): URLs to validate.
+        workers (int, optional): Maximum number of concurrent requests. Defaults to 1.
+
+    Returns:
+        list[bool]: Whether each URL is valid, in the same order as `urls`.
+
+    """
+    return [result is not False for result in _check_urls(urls, workers)]
+
+
+def validate_post_uris(
+    uris: list[str], token: str, workers: int = 1
+) -> dict[str, bool]:
+    """Check which posts still exist using app.bsky.feed.getPosts.
+
+    URIs are sent in groups of up to GET_POSTS_BATCH_SIZE per request, with up to
+    `workers` requests in flight at once. Posts that are missing from a response
+    have been deleted.
+
+    Args:
+        uris (list[str]): AT-URIs of the posts to check.
+        token (str): Access token used to authorize the requests.
+        workers (int, optional): Maximum number of concurrent requests. Defaults to 1.
+
+    Returns:
+        dict[str, bool]: Maps each URI to whether the post exists. URIs from a
+            batch whose request failed are left out so the caller can fall back
+            to another strategy.
 
-    :param posts: List of raw posts.
-    :param START_DATE: Start date for filtering (YYYY-MM-DD).
-    :param END_DATE: End date for filtering (YYYY-MM-DD).
-    :return: List of dictionaries containing post data.
     """
-    extracted_data = []
 
-    for post in posts:
+    def check(batch: list[str]) -> dict[str, bool]:
         try:
-            post_content = post["record"].get("text", "")  # Extract the text content
-            author_handle = post["author"].get(
-                "handle", ""
-            )  # Extract the author's handle
-            created_at = post["indexedAt"]  # Extract the indexed timestamp
-            post_id = post["uri"].split("/")[-1]
-            post_link = f"https://bsky.app/profile/{author_handle}/post/{post_id}"
-
-            if not validate_url(post_link):
-                continue
-
-            extracted_data.append(
-                {
-                    "author": author_handle,
-                    "content": post_content,
-                    "created_at": created_at,
-                    "post_link": post_link,
-                }
+            response = client.xrpc_get(
+                "app.bsky.feed.getPosts", token=token, params={"uris": batch}
+            )
+            response.raise_for_status()
+            found = {post.get("uri") for post in response.json().get("posts", [])}
+        except requests.exceptions.RequestException as err:
+            print(f"Error validating posts: {err}")
+            return {}
+        return {uri: uri in found for uri in batch}
+
+    batches = [
+        uris[start : start + GET_POSTS_BATCH_SIZE]
+        for start in range(0, len(uris), GET_POSTS_BATCH_SIZE)
+    ]
+    results: dict[str, bool] = {}
+    for batch_result in _map_concurrently(check, batches, workers):
+        results.update(batch_result)
+    return results
+
+
+def extract_post_data(
+    posts: list[Post] | list[dict],
+    token: str | None = None,
+    strategy: str = "html",
+    workers: int = 1,
+    cache: TTLCache | None = None,
+) -> list[Post]:
+    """Extract relevant data from posts and drop posts that no longer exist.
+
+    :param posts: List of post records, or of raw posts which are projected first.
+    :param token: Access token, required by the "xrpc" validation strategy.
+    :param strategy: "xrpc" checks posts in batches through app.bsky.feed.getPosts,
+        "html" fetches each post page from bsky.app. Posts whose batch check fails
+        fall back to the "html" strategy.
+    :param workers: Maximum number of concurrent validation requests.
+    :param cache: Validation cache keyed by post link. It is consulted before any
+        request is made and updated with every definite answer.
+    :return: List of post records, in the order of `posts`. They are turned into
+        dictionaries when saved, see records.Post.to_dict.
+    """
+    if strategy not in VALIDATION_STRATEGIES:
+        raise ValueError(f"Unknown validation strategy: {strategy}")
+    if strategy == "xrpc" and token is None:
+        raise ValueError("A token is required for the xrpc validation strategy.")
+
+    with metrics.stage("extraction"):
+        candidates = project_page(posts)
+    metrics.count_rows("extraction", len(posts), len(candidates))
+
+    with metrics.stage("validation"):
+        links = [post.post_link for post in candidates]
+        exists: list[bool | None] = [None] * len(candidates)
+        if cache is not None:
+            exists = [cache.get(link) for link in links]
+
+        checked: dict[str, bool] = {}
+        if strategy == "xrpc" and token is not None:
+            existing = validate_post_uris(
+                [
+                    post.uri
+                    for post, result in zip(candidates, exists)
+                    if result is None
+                ],
+                token,
+                workers,
             )
-        except KeyError as err:
-            print(f"Missing data in post: {err}")
-    return extracted_data
+            for index, post in enumerate(candidates):
+                if exists[index] is None and post.uri in existing:
+                    exists[index] = checked[links[index]] = existing[post.uri]
+
+        unchecked = [index for index, result in enumerate(exists) if result is None]
+        html_results = _check_urls([links[index] for index in unchecked], workers)
+        for index, result in zip(unchecked, html_results):
+            if result is not None:
+                exists[index] = checked[links[index]] = result
+
+        if cache is not None and checked:
+            cache.set_many(checked)
+        valid = [post for post, keep in zip(candidates, exists) if keep is not False]
+    metrics.count_rows("validation", len(candidates), len(valid))
+    return valid
+
+
+def iter_extract_post_data(
+    batches: Iterable[list[dict]],
+    token: str | None = None,
+    strategy: str = "html",
+    workers: int = 1,
+    cache: TTLCache | None = None,
+) -> Iterator[list[Post]]:
+    """Extract and validate batches of raw posts one batch at a time.
+
+    See extract_post_data for the meaning of the arguments. Only the current batch
+    is held in memory.
+
+    Yields:
+        list[Post]: The post records extracted from each batch.
+
+    """
+    for batch in batches:
+        yield extract_post_data(batch, token, strategy, workers, cache)
 
 
 def extract_post_data_from_csv(path: str) -> list[dict]:
@@ -224,36 +379,75 @@ def extract_post_data_from_csv(path: str) -> list[dict]:
     return post_from_csv
 
 
-def remove_duplicates(data: list[dict]) -> list[dict]:
+def remove_duplicates(data: list[dict], store: DedupStore | None = None) -> list[dict]:
     """This function removes duplicate entries from a list of dictionaries using the post_link key.
 
+    Posts are compared by a 64-bit hash of their post_link. The first occurrence of
+    each post is kept, in input order.
+
     Args:
         data list(dict): List of dictionaries with some duplicate entries.
+        store (DedupStore, optional): Store that remembers seen posts. Pass one
+            configured to spill to disk (and optionally use a Bloom filter) for
+            inputs with millions of rows. Defaults to an in-memory store.
 
     Returns:
         list(dict): List of dictionaries with duplicates removed.
 
     """
-    post_links = set()
-    unique_data = []
-    for post in data:
-        if post["post_link"] not in post_links:
-            post_links.add(post["post_link"])
-            unique_data.append(post)
-    return unique_data
+    if store is not None:
+        return list(iter_unique(data, store))
+    with DedupStore() as seen:
+        return list(iter_unique(data, seen))
 
 
-def save_to_csv(data: list[dict], path_to_file: str) -> None:
+def save_to_csv(data: list[Post] | list[dict], path_to_file: str) -> None:
     """Save post data to a CSV file.
-    :param data: List of post data dictionaries.
+    :param data: List of post records or post data dictionaries.
     :param filename: Output CSV filename.
     """
     if data:
+        # pandas is slow to import, so only load it when there is data to save.
+        import pandas as pd  # pylint: disable=C0415
+
+        directory = os.path.dirname(path_to_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        rows = [as_row(post) for post in data]
         if os.path.isfile(path_to_file):
-            data += extract_post_data_from_csv(path_to_file)
-            data = remove_duplicates(data)
-        data_frame = pd.DataFrame(data)
+            rows += extract_post_data_from_csv(path_to_file)
+            rows = remove_duplicates(rows)
+        data_frame = pd.DataFrame(rows)
         data_frame.to_csv(path_to_file, index=False)
         print(f"Data saved to {path_to_file}")
     else:
         print("No posts to save.")
+
+
+def stream_to_csv(batches: Iterable[list[Post] | list[dict]], path_to_file: str) -> int:
+    """Append batches of post data to a CSV file as they are produced.
+
+    Each batch is written and flushed before the next one is requested, so memory
+    use is bounded by the batch size rather than the number of posts. Posts whose
+    post_link is already in the file, or earlier in the stream, are skipped. Known
+    post links are looked up in the sidecar key index, so the existing rows are
+    never re-read. See writers.write_batches for the other output formats.
+
+    :param batches: Iterable of lists of post records or post data dictionaries.
+    :param path_to_file: Output CSV filename.
+    :return: Number of rows written.
+    """
+    return write_batches(batches, path_to_file, "csv")
+
+
+def append_to_csv(data: list[Post] | list[dict], path_to_file: str) -> int:
+    """Append the posts that are not in a CSV file yet, see stream_to_csv.
+
+    Unlike save_to_csv, the cost depends only on the number of new posts, not on
+    the size of the existing file.
+
+    :param data: List of post records or post data dictionaries.
+    :param path_to_file: Output CSV filename.
+    :return: Number of rows written.
+    """
+    return stream_to_csv([data], path_to_file)
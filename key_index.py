@@ -0,0 +1,291 @@
+"""Mission Blue Module that holds the sidecar key index kept next to each output file.
+
+The index lets new posts be appended to `Scraped Posts/<query>.csv` without reading
+the whole file. It stores a 64-bit hash of every post_link in the file, plus the
+size the file had when the index was last updated, so an index that no longer
+matches its file (for example after the CSV was rewritten) is detected and rebuilt.
+
+Most keys are kept sorted in the sidecar file, which is memory-mapped and searched
+in place, so memory use does not grow with the size of the output. Keys added
+since the last merge are appended unsorted, kept in memory, and merged into the
+sorted keys once there are MERGE_SIZE of them.
+
+Run this module to compact a CSV file:
+
+    python key_index.py "Scraped Posts/<query>.csv"
+"""
+
+import bisect
+import csv
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from typing import BinaryIO
+
+import click
+
+from dedup import DedupStore, post_key
+
+INDEX_SUFFIX = ".idx"
+_MAGIC = b"MBIDX2\0\0"
+# Magic bytes, the size of the data the index describes and the number of sorted
+# keys. The sorted keys follow, then the keys appended since the last merge.
+_HEADER = struct.Struct("<8sQQ")
+# Appended keys kept in memory before they are merged into the sorted keys.
+MERGE_SIZE = 100_000
+# Keys sorted in memory at once while an index is rebuilt.
+_RUN_SIZE = 1_000_000
+# Keys written to the sidecar file at once.
+_WRITE_SIZE = 65_536
+
+
+def _csv_links(csv_path: str) -> Iterator[str]:
+    if os.path.isfile(csv_path):
+        with open(csv_path, encoding="utf-8", newline="") as csv_file:
+            for row in csv.DictReader(csv_file):
+                yield row["post_link"]
+
+
+def _file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.isfile(path) else 0
+
+
+def _unique(keys: Iterable[int]) -> Iterator[int]:
+    """Drop repeats from sorted keys."""
+    previous = None
+    for key in keys:
+        if key != previous:
+            yield key
+            previous = key
+
+
+def _write_keys(output: BinaryIO, keys: Iterable[int]) -> int:
+    """Write keys to output in chunks and return how many were written."""
+    count = 0
+    chunk = array("Q")
+    for key in keys:
+        chunk.append(key)
+        if len(chunk) == _WRITE_SIZE:
+            output.write(chunk.tobytes())
+            count += len(chunk)
+            chunk = array("Q")
+    output.write(chunk.tobytes())
+    return count + len(chunk)
+
+
+class KeyIndex:
+    """The set of post_link keys stored in a data file, backed by a sidecar file."""
+
+    def __init__(
+        self,
+        data_path: str,
+        iter_links: Callable[[], Iterable[str]] | None = None,
+        data_size: Callable[[], int] | None = None,
+    ) -> None:
+        """Open the index of data_path, rebuilding it if it is missing or stale.
+
+        Args:
+            data_path (str): Path to the data the index describes.
+            iter_links (Callable, optional): Returns every post_link stored at
+                data_path, used to rebuild the index. Defaults to reading a CSV file.
+            data_size (Callable, optional): Returns the current size of the data,
+                used to detect a stale index. Defaults to the size of the file.
+
+        """
+        self.data_path = data_path
+        self.path = data_path + INDEX_SUFFIX
+        self._iter_links = iter_links or (lambda: _csv_links(data_path))
+        self._data_size = data_size or (lambda: _file_size(data_path))
+        self._map: mmap.mmap | None = None
+        self._sorted: memoryview | tuple[int, ...] = ()
+        # Keys appended after the sorted ones, and those not written yet.
+        self._recent: set[int] = set()
+        self._pending: list[int] = []
+        if not self._load():
+            self.rebuild()
+
+    def _load(self) -> bool:
+        if not os.path.isfile(self.path):
+            return False
+        with open(self.path, "rb") as index:
+            header = index.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return False
+            magic, data_size, sorted_count = _HEADER.unpack(header)
+            if magic != _MAGIC or data_size != self._data_size():
+                return False
+            sorted_size = sorted_count * 8
+            index.seek(_HEADER.size + sorted_size)
+            recent = array("Q")
+            body = index.read()
+            if len(body) % recent.itemsize:
+                return False
+            recent.frombytes(body)
+        if os.path.getsize(self.path) < _HEADER.size + sorted_size:
+            return False
+        self._map_sorted(sorted_count)
+        self._recent = set(recent)
+        return True
+
+    def _map_sorted(self, sorted_count: int) -> None:
+        self.close()
+        if not sorted_count:
+            return
+        with open(self.path, "rb") as index:
+            self._map = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        end = _HEADER.size + sorted_count * 8
+        self._sorted = memoryview(self._map)[_HEADER.size : end].cast("Q")
+
+    def _in_sorted(self, key: int) -> bool:
+        position = bisect.bisect_left(self._sorted, key)
+        return position < len(self._sorted) and self._sorted[position] == key
+
+    def _write(self, sorted_keys: Iterable[int]) -> None:
+        """Replace the sidecar file with sorted_keys and no appended keys."""
+        handle, temp_path = tempfile.mkstemp(
+            suffix=INDEX_SUFFIX, dir=os.path.dirname(self.path) or None
+        )
+        with os.fdopen(handle, "wb") as index:
+            index.write(_HEADER.pack(_MAGIC, 0, 0))
+            count = _write_keys(index, sorted_keys)
+            index.seek(0)
+            index.write(_HEADER.pack(_MAGIC, self._data_size(), count))
+        # The old file can only be replaced once it is no longer mapped.
+        self.close()
+        os.replace(temp_path, self.path)
+        self._recent = set()
+        self._pending = []
+        self._map_sorted(count)
+
+    def rebuild(self) -> None:
+        """Re-read every post_link from the data and rewrite the index.
+
+        Keys are sorted in runs of _RUN_SIZE that are merged on disk, so memory
+        use does not grow with the size of the data.
+        """
+        with tempfile.TemporaryDirectory(
+            dir=os.path.dirname(self.path) or None
+        ) as directory:
+            runs: list[str] = []
+            run: set[int] = set()
+
+            def save_run() -> None:
+                path = os.path.join(directory, f"{len(runs)}.run")
+                with open(path, "wb") as run_file:
+                    _write_keys(run_file, sorted(run))
+                runs.append(path)
+                run.clear()
+
+            for post_link in self._iter_links():
+                run.add(post_key(post_link))
+                if len(run) >= _RUN_SIZE:
+                    save_run()
+            if not runs:
+                self._write(sorted(run))
+                return
+            if run:
+                save_run()
+            self._write(_unique(heapq.merge(*map(_read_keys, runs))))
+
+    def __contains__(self, post_link: object) -> bool:
+        if not isinstance(post_link, str):
+            return False
+        key = post_key(post_link)
+        return key in self._recent or self._in_sorted(key)
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def add(self, post_link: str) -> bool:
+        """Record a post_link. Returns False if it was already in the index."""
+        key = post_key(post_link)
+        if key in self._recent or self._in_sorted(key):
+            return False
+        self._recent.add(key)
+        self._pending.append(key)
+        return True
+
+    def commit(self) -> None:
+        """Write the keys added since the last commit to the sidecar file.
+
+        Call this after the matching rows have been flushed to the data, so the
+        recorded data size covers them.
+        """
+        if len(self._recent) >= MERGE_SIZE:
+            self._write(heapq.merge(self._sorted, sorted(self._recent)))
+            return
+        with open(self.path, "r+b") as index:
+            index.seek(0, os.SEEK_END)
+            index.write(array("Q", self._pending).tobytes())
+            index.seek(0)
+            index.write(_HEADER.pack(_MAGIC, self._data_size(), len(self._sorted)))
+        self._pending = []
+
+    def close(self) -> None:
+        """Unmap the sorted keys. Keys that were not committed are not written."""
+        if isinstance(self._sorted, memoryview):
+            self._sorted.release()
+        self._sorted = ()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def _read_keys(path: str) -> Iterator[int]:
+    """Yield the keys of a run file written by KeyIndex.rebuild, in chunks."""
+    with open(path, "rb") as run_file:
+        while chunk := run_file.read(_WRITE_SIZE * 8):
+            yield from array("Q", chunk)
+
+
+def compact_csv(csv_path: str) -> tuple[int, int]:
+    """Drop rows with a repeated post_link from a CSV file and rebuild its index.
+
+    The first occurrence of each post is kept and row order is preserved. The file
+    is rewritten through a temporary file, one row at a time.
+
+    Args:
+        csv_path (str): Path to the CSV file.
+
+    Returns:
+        tuple[int, int]: Number of rows kept and number of rows dropped.
+
+    """
+    kept = dropped = 0
+    temp_path = csv_path + ".tmp"
+    with DedupStore(directory=os.path.dirname(csv_path) or None) as seen, open(
+        csv_path, encoding="utf-8", newline=""
+    ) as source, open(temp_path, "w", encoding="utf-8", newline="") as target:
+        reader = csv.DictReader(source)
+        writer = csv.DictWriter(
+            target, fieldnames=list(reader.fieldnames or []), lineterminator="\n"
+        )
+        writer.writeheader()
+        for row in reader:
+            if not seen.add(row["post_link"]):
+                dropped += 1
+                continue
+            writer.writerow(row)
+            kept += 1
+    os.replace(temp_path, csv_path)
+    if os.path.isfile(csv_path + INDEX_SUFFIX):
+        os.remove(csv_path + INDEX_SUFFIX)
+    KeyIndex(csv_path).close()
+    return kept, dropped
+
+
+@click.command()
+@click.argument("csv_paths", nargs=-1, required=True, type=click.Path(exists=True))
+def compact(csv_paths: tuple[str, ...]) -> None:
+    """Remove duplicate posts from CSV files and rebuild their key indexes."""
+    for csv_path in csv_paths:
+        kept, dropped = compact_csv(csv_path)
+        print(f"{csv_path}: kept {kept} posts, removed {dropped} duplicates.")
+
+
+if __name__ == "__main__":
+    compact()
@@ -0,0 +1,33 @@
+"""Mission Blue Module that holds the lazy import helper used to keep startup fast.
+
+Commands such as `--help` never send a request, so modules import requests with
+lazy_import: the module object is bound right away, but its code only runs when
+one of its attributes is first used.
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return module name, deferring its import until an attribute is accessed.
+
+    Args:
+        name (str): Absolute module name, e.g. "requests".
+
+    Returns:
+        ModuleType: The module, already imported if it was in sys.modules.
+
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
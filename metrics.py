@@ -0,0 +1,260 @@
+"""Mission Blue Module that holds the per-stage metrics of a run.
+
+A run is split into stages: auth, DID resolution, search paging, extraction,
+validation and save. Each stage records the time spent in it, the rows that went in
+and came out, and the requests it sent, with their bytes, retries and a latency
+histogram. Requests are attributed to a stage by their XRPC method, so requests
+sent from worker threads are counted too.
+
+At the end of a run the metrics can be written as a JSON report and as a
+Prometheus textfile, e.g. for the node_exporter textfile collector.
+"""
+
+import contextlib
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import statefile
+
+STAGES = ("auth", "did_resolution", "search", "extraction", "validation", "save")
+# Stage of the requests sent for each XRPC method. Plain GETs fetch post pages.
+METHOD_STAGES = {
+    "com.atproto.server.createSession": "auth",
+    "com.atproto.server.refreshSession": "auth",
+    "com.atproto.identity.resolveHandle": "did_resolution",
+    "app.bsky.feed.searchPosts": "search",
+    "app.bsky.feed.getPosts": "validation",
+    "page": "validation",
+}
+# Upper bounds in seconds of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_PREFIX = "mission_blue"
+
+
+class StageMetrics:
+    """Counters of one stage. Updated by RunMetrics under its lock."""
+
+    def __init__(self) -> None:
+        """Start every counter at zero."""
+        self.seconds = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        # Count of requests per bucket of LATENCY_BUCKETS, plus one for slower ones.
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the counters, with the histogram keyed by bucket upper bound."""
+        return {
+            "seconds": round(self.seconds, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency_seconds": {
+                "sum": round(self.latency_sum, 6),
+                "buckets": {
+                    str(bound): count
+                    for bound, count in zip(
+                        (*LATENCY_BUCKETS, "+Inf"), self.latency_counts
+                    )
+                },
+            },
+        }
+
+
+class RunMetrics:
+    """The metrics of every stage of one run. Can be shared between threads."""
+
+    def __init__(self) -> None:
+        """Start the run clock with empty stages."""
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.stages = {name: StageMetrics() for name in STAGES}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Add the time spent in the with block to a stage.
+
+        Blocks running at once in several threads all count, so a stage's time is
+        the sum over threads and can be longer than the run.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name].seconds += elapsed
+
+    def count_rows(self, name: str, rows_in: int, rows_out: int) -> None:
+        """Add rows that went into and came out of a stage."""
+        with self._lock:
+            self.stages[name].rows_in += rows_in
+            self.stages[name].rows_out += rows_out
+
+    def record_request(
+        self,
+        method: str,
+        seconds: float,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        retry: bool = False,
+        error: bool = False,
+    ) -> None:
+        """Record one request to the stage its method belongs to, see METHOD_STAGES.
+
+        Args:
+            method (str): XRPC method name, or "page" for a post page.
+            seconds (float): Time until the response was read or the request failed.
+            bytes_sent (int, optional): Size of the request body. Defaults to 0.
+            bytes_received (int, optional): Size of the response body. Defaults to 0.
+            retry (bool, optional): Whether the request repeats a failed one.
+                Defaults to False.
+            error (bool, optional): Whether no response was received. Defaults to
+                False.
+
+        """
+        name = METHOD_STAGES.get(method)
+        if name is None:
+            return
+        bucket = next(
+            (index for index, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound),
+            len(LATENCY_BUCKETS),
+        )
+        with self._lock:
+            stage = self.stages[name]
+            stage.requests += 1
+            stage.retries += retry
+            stage.errors += error
+            stage.bytes_sent += bytes_sent
+            stage.bytes_received += bytes_received
+            stage.latency_counts[bucket] += 1
+            stage.latency_sum += seconds
+
+    def report(self) -> dict[str, Any]:
+        """Return the run report: the run's wall time and every stage's metrics."""
+        with self._lock:
+            return {
+                "started_at": self.started,
+                "wall_seconds": round(time.perf_counter() - self._start, 6),
+                "stages": {
+                    name: stage.to_dict() for name, stage in self.stages.items()
+                },
+            }
+
+    def prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        report = self.report()
+        counters = (
+            ("stage_seconds_total", "seconds", "Seconds spent in the stage."),
+            ("stage_rows_in_total", "rows_in", "Rows that went into the stage."),
+            ("stage_rows_out_total", "rows_out", "Rows that came out of the stage."),
+            ("stage_requests_total", "requests", "Requests sent by the stage."),
+            ("stage_retries_total", "retries", "Requests that were retries."),
+            ("stage_errors_total", "errors", "Requests that got no response."),
+            ("stage_bytes_sent_total", "bytes_sent", "Request body bytes sent."),
+            (
+                "stage_bytes_received_total",
+                "bytes_received",
+                "Response body bytes received.",
+            ),
+        )
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_run_seconds Wall time of the run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_seconds {report['wall_seconds']}",
+        ]
+        for metric, key, description in counters:
+            name = f"{PROMETHEUS_PREFIX}_{metric}"
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+            lines += [
+                f'{name}{{stage="{stage}"}} {values[key]}'
+                for stage, values in report["stages"].items()
+            ]
+
+        name = f"{PROMETHEUS_PREFIX}_request_duration_seconds"
+        lines += [
+            f"# HELP {name} Latency of the requests sent by the stage.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, values in report["stages"].items():
+            cumulative = 0
+            for bound, count in values["latency_seconds"]["buckets"].items():
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'{name}_sum{{stage="{stage}"}} {values["latency_seconds"]["sum"]}'
+            )
+            lines.append(f'{name}_count{{stage="{stage}"}} {values["requests"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: str) -> None:
+        """Write the JSON run report to path."""
+        statefile.write_json(path, self.report())
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the Prometheus textfile to path.
+
+        The file is replaced atomically, so a collector never reads half of it.
+        """
+        statefile.write_atomically(path, self.prometheus())
+
+
+def write_outputs(report_path: str | None, prometheus_path: str | None) -> None:
+    """Write the current run's JSON report and Prometheus textfile, if asked for.
+
+    Args:
+        report_path (str, optional): Path of the JSON run report.
+        prometheus_path (str, optional): Path of the Prometheus textfile.
+
+    """
+    if report_path:
+        _run.write_report(report_path)
+        print(f"Run report saved to {report_path}")
+    if prometheus_path:
+        _run.write_prometheus(prometheus_path)
+        print(f"Prometheus metrics saved to {prometheus_path}")
+
+
+_run = RunMetrics()
+
+
+def get_run() -> RunMetrics:
+    """Return the metrics of the current run."""
+    return _run
+
+
+def reset() -> RunMetrics:
+    """Start a new run, discarding the metrics of the previous one."""
+    global _run  # pylint: disable=W0603
+    _run = RunMetrics()
+    return _run
+
+
+def stage(name: str) -> contextlib.AbstractContextManager[None]:
+    """Add the time spent in the with block to a stage of the current run."""
+    return _run.stage(name)
+
+
+def count_rows(name: str, rows_in: int, rows_out: int) -> None:
+    """Add rows that went into and came out of a stage of the current run."""
+    _run.count_rows(name, rows_in, rows_out)
+
+
+def record_request(method: str, seconds: float, **kwargs: Any) -> None:
+    """Record one request in the current run, see RunMetrics.record_request."""
+    _run.record_request(method, seconds, **kwargs)
@@ -1,15 +1,44 @@
 """This module conatins the BlueSky Web Scrapper."""
 
+import contextlib
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
 import click
-import requests
-from alive_progress import alive_bar
-from alive_progress.animations.bars import bar_factory
-from typing import Optional, List, Dict, Any
+
+import archive
 import auth
+import cache
+import checkpoint
+import client
 import file
+import metrics
+import profiling
+import watermark
+import writers
+from lazy import lazy_import
+from records import Post, parse_datetime, read_search_page
+
+if TYPE_CHECKING:
+    import requests
+else:
+    requests = lazy_import("requests")
 
 # pylint: disable=C0301
 
+# Pages a time window may use before the sharded search bisects it.
+DEFAULT_WINDOW_PAGES = 10
+# Smallest time window the sharded search will bisect.
+MIN_WINDOW = timedelta(seconds=1)
+# Number of resolved handles remembered in process.
+DID_LRU_SIZE = 1024
+_did_lru: "OrderedDict[str, str]" = OrderedDict()
+_did_lru_lock = threading.Lock()
+
 lang_dict = {
     "Afar": "aa",
     "Abkhazian": "ab",
@@ -125,20 +154,102 @@ lang_dict = {
 }
 
 
-def resolve_handle_to_did(handle: str, token: str) -> str:
-    """Resolve a Bluesky handle to DID."""
-    url = "https://bsky.social/xrpc/com.atproto.identity.resolveHandle"
-    headers = {"Authorization": f"Bearer {token}"}
+def _lookup_did(handle: str, did_cache: cache.TTLCache | None) -> str | None:
+    with _did_lru_lock:
+        did = _did_lru.get(handle)
+        if did is not None:
+            _did_lru.move_to_end(handle)
+            return did
+    did = did_cache.get(handle) if did_cache is not None else None
+    if did is not None:
+        _remember_did(handle, did)
+    return did
+
+
+def _remember_did(handle: str, did: str) -> None:
+    with _did_lru_lock:
+        _did_lru[handle] = did
+        _did_lru.move_to_end(handle)
+        if len(_did_lru) > DID_LRU_SIZE:
+            _did_lru.popitem(last=False)
+
+
+def resolve_handle_to_did(
+    handle: str, token: str, did_cache: cache.TTLCache | None = None
+) -> str:
+    """Resolve a Bluesky handle to DID.
+
+    Resolved handles are remembered in process and, if did_cache is given, on disk.
+    Handles that fail to resolve are returned unchanged and not remembered.
+
+    Args:
+        handle (str): The handle, e.g. "user.bsky.social". A DID is returned as is.
+        token (str): The access token.
+        did_cache (TTLCache, optional): Persistent cache, see cache.did_cache.
+
+    Returns:
+        str: The DID, or the handle if it could not be resolved.
 
+    """
+    if handle.startswith("did:"):
+        return handle
+    # Handles are case-insensitive.
+    key = handle.lower()
+    did = _lookup_did(key, did_cache)
+    if did is not None:
+        return did
     try:
-        response = requests.get(
-            url, headers=headers, params={"handle": handle}, timeout=10
+        response = client.xrpc_get(
+            "com.atproto.identity.resolveHandle", token=token, params={"handle": handle}
         )
         response.raise_for_status()
-        return str(response.json().get("did", handle))
+        did = response.json().get("did")
     except requests.exceptions.RequestException as err:
         print(f"Error resolving handle: {err}")
         return handle
+    if not did:
+        return handle
+    _remember_did(key, did)
+    if did_cache is not None:
+        did_cache.set(key, did)
+    return str(did)
+
+
+def resolve_handles(
+    handles: list[str],
+    token: str,
+    workers: int = 8,
+    did_cache: cache.TTLCache | None = None,
+) -> dict[str, str]:
+    """Resolve many handles to DIDs concurrently.
+
+    Args:
+        handles (list[str]): The handles. Repeated handles are resolved once.
+        token (str): The access token.
+        workers (int, optional): Number of concurrent requests. Defaults to 8.
+        did_cache (TTLCache, optional): Persistent cache, see cache.did_cache.
+
+    Returns:
+        dict[str, str]: Every handle mapped to its DID, or to itself if it could
+            not be resolved.
+
+    """
+    unique = list(dict.fromkeys(handles))
+    with metrics.stage("did_resolution"):
+        if workers <= 1 or len(unique) <= 1:
+            dids = [
+                resolve_handle_to_did(handle, token, did_cache) for handle in unique
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(unique))) as pool:
+                dids = list(
+                    pool.map(
+                        lambda handle: resolve_handle_to_did(handle, token, did_cache),
+                        unique,
+                    )
+                )
+    metrics.count_rows("did_resolution", len(unique), len(dids))
+    return dict(zip(unique, dids))
 
 
 def generate_query_params(
@@ -156,6 +267,7 @@ def generate_query_params(
     limit: int = 25,
     cursor: str = "",
     posts_limit: int = 500,
+    did_cache: cache.TTLCache | None = None,
 ) -> Dict[str, Any]:
     # pylint: disable=R0917
     # pylint: disable=R0913
@@ -185,15 +297,18 @@ def generate_query_params(
             - Cursors are opaque strings generated by the API and should not be modified manually.
         posts_limit (int, optional): The maximum number of posts to retrieve across all responses.
             - Defaults to 500.
+        did_cache (TTLCache, optional): Persistent cache of resolved handles, see cache.did_cache.
 
     Returns:
         dict: A dictionary containing the query parameters for the API request.
 
     """
-    if mentions:
-        mentions = resolve_handle_to_did(mentions, token)
-    if author:
-        author = resolve_handle_to_did(author, token)
+    # Resolve both handles at once, so startup waits for one round trip at most.
+    dids = resolve_handles(
+        [handle for handle in (mentions, author) if handle], token, did_cache=did_cache
+    )
+    mentions = dids.get(mentions, mentions)
+    author = dids.get(author, author)
 
     # print(f"Generated query parameters: {locals()}")
     return {
@@ -213,7 +328,208 @@ def generate_query_params(
     }
 
 
-def search_posts(params: dict, token: str) -> list[dict]:
+def fetch_search_page(params: dict, token: str) -> dict:
+    """Fetch one page of app.bsky.feed.searchPosts results.
+
+    The raw posts are projected to Post records as soon as the page is received, so
+    only the fields that are saved stay in memory, see records.read_search_page.
+
+    Returns:
+        dict: The response, with "posts" holding Post records.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails, or its body is
+            not JSON.
+
+    """
+    with metrics.stage("search"):
+        response = client.xrpc_get(
+            "app.bsky.feed.searchPosts", token=token, params=params
+        )
+        response.raise_for_status()
+    # Decoding is counted as extraction, so search time is time on the network.
+    with metrics.stage("extraction"):
+        try:
+            data = read_search_page(response.content, params)
+        except ValueError as err:
+            # Raised as response.json() does, so callers keep what they fetched.
+            raise requests.exceptions.InvalidJSONError(
+                f"Invalid JSON in the search response: {err}", response=response
+            ) from err
+    metrics.count_rows("search", 0, len(data["posts"]))
+    return data
+
+
+def iter_search_pages(
+    params: dict, token: str, fetched: int = 0, mark: str | None = None
+) -> Iterator[list[Post]]:
+    """Yield pages of posts from the BlueSky search API one at a time.
+
+    Only the current page is held in memory. Pages are trimmed so no more than
+    params["posts_limit"] posts are yielded in total, and paging stops, keeping
+    what was already yielded, if a request fails.
+
+    Args:
+        params (dict): The query parameters, see search_posts. Before each page is
+            yielded, "cursor" is set to the cursor of the next page, or to "" when
+            there are no more pages, so the consumer can checkpoint the crawl.
+        token (str): The access token.
+        fetched (int, optional): Posts already fetched by an earlier, interrupted
+            run of the same crawl. They count towards posts_limit. Defaults to 0.
+        mark (str, optional): The high-water mark of a search sorted by latest,
+            see watermark. Posts older than the mark are dropped, and paging stops
+            after the first page that has any.
+
+    Yields:
+        list[Post]: The post records of one page.
+
+    """
+    total_fetched = fetched
+    posts_limit = params.get("posts_limit")
+
+    while True:
+        try:
+            data = fetch_search_page(params, token)
+        except requests.exceptions.RequestException as err:
+            print(f"Error fetching posts: {err}")
+            print(
+                "Response:",
+                err.response.text if err.response is not None else "No response",
+            )
+            return
+
+        new_posts = data.get("posts", [])
+        reached_mark = False
+        if mark:
+            newer = [
+                post
+                for post in new_posts
+                if not watermark.is_before(post.created_at, mark)
+            ]
+            reached_mark = len(newer) < len(new_posts)
+            new_posts = newer
+
+        # Check if we have reached our overall posts limit
+        if posts_limit:
+            new_posts = new_posts[: posts_limit - total_fetched]
+        total_fetched += len(new_posts)
+
+        # Move to the next page if available
+        next_cursor = None if reached_mark else data.get("cursor")
+        params["cursor"] = next_cursor or ""
+        yield new_posts
+
+        if posts_limit and total_fetched >= posts_limit:
+            print(
+                f"Fetched {total_fetched} posts, total: {total_fetched}/{posts_limit}"
+            )
+            return
+
+        if reached_mark:
+            print(f"Reached the posts of the last run. Total: {total_fetched}")
+            return
+
+        if not next_cursor:
+            print(f"All posts fetched. Total: {total_fetched}")
+            return
+
+
+def stream_search(
+    params: dict,
+    token: str,
+    output_path: str,
+    output_format: str = "csv",
+    extract_options: dict[str, Any] | None = None,
+    resume: bool = False,
+    incremental: bool = False,
+) -> int:
+    """Fetch, validate and save one page at a time, checkpointing after each page.
+
+    Each page is written to the output before the next one is fetched. For outputs
+    that are flushed after every batch (CSV and JSONL) the cursor of the next page
+    and the post counts are checkpointed next to the output, and the checkpoint is
+    deleted once the crawl completes.
+
+    Args:
+        params (dict): The query parameters, see search_posts.
+        token (str): The access token.
+        output_path (str): Path of the output, see writers.output_path.
+        output_format (str, optional): One of writers.WRITERS. Defaults to "csv".
+        extract_options (dict, optional): Keyword arguments for
+            file.extract_post_data besides the posts and token.
+        resume (bool, optional): Continue from the checkpoint of an interrupted
+            crawl with the same parameters. Defaults to False.
+        incremental (bool, optional): Only fetch the posts after the high-water
+            mark of the last run, and move the mark once done, see
+            apply_watermark. Defaults to False.
+
+    Returns:
+        int: Number of posts saved by this run.
+
+    """
+    mark = apply_watermark(params, output_path) if incremental else None
+    newest = mark
+    crawl = checkpoint.Checkpoint(output_path)
+    fetched = flushed = 0
+    state = crawl.load() if resume else None
+    if state is not None:
+        if not checkpoint.Checkpoint.matches(state, params):
+            raise ValueError(
+                f"{crawl.path} belongs to a search with different parameters."
+            )
+        params["cursor"] = state["params"]["cursor"]
+        fetched, flushed = state["fetched"], state["flushed"]
+        # Posts saved before the interruption count towards the next mark too.
+        newest = state.get("newest") or newest
+        print(f"Resuming after {fetched} fetched posts ({flushed} saved).")
+    elif resume:
+        print("No checkpoint found, starting from the first page.")
+
+    with writers.WRITERS[output_format](output_path) as writer:
+        for page in iter_search_pages(params, token, fetched, mark):
+            fetched += len(page)
+            newest = watermark.newest(page, newest)
+            post_data = file.extract_post_data(page, token, **(extract_options or {}))
+            with metrics.stage("save"):
+                written = writer.write_batch(post_data)
+            metrics.count_rows("save", len(post_data), written)
+            flushed += written
+            if writer.flushes_batches:
+                crawl.save(params, fetched, flushed, newest)
+
+    posts_limit = params.get("posts_limit")
+    if not params["cursor"] or (posts_limit and fetched >= posts_limit):
+        crawl.clear()
+    else:
+        print(f"Search interrupted, run again with --resume to continue: {crawl.path}")
+    if incremental:
+        watermark.Watermark(output_path).advance(params, mark, newest, fetched)
+    print(f"{writer.written} new posts saved to {output_path}")
+    return writer.written
+
+
+def apply_watermark(params: dict, output_path: str) -> str | None:
+    """Load the high-water mark of a search and fetch only the posts after it.
+
+    Args:
+        params (dict): The query parameters, see search_posts. If the search has a
+            mark and no since, since is set to the mark.
+        output_path (str): Path of the output the search writes to.
+
+    Returns:
+        str | None: The created_at of the newest post fetched by the last run, or
+            None on the first run.
+
+    """
+    mark = watermark.Watermark(output_path).load(params)
+    if mark and not params.get("since"):
+        params["since"] = mark
+    if mark:
+        print(f"Fetching the posts after {mark}, the newest post of the last run.")
+    return mark
+
+
+def search_posts(params: dict, token: str, mark: str | None = None) -> list[Post]:
     # pylint: disable=E1102
     # pylint: disable=C0301
     """Search for posts using the BlueSky API.
@@ -237,9 +553,11 @@ def search_posts(params: dict, token: str) -> list[dict]:
             - cursor (str, optional): Pagination token for continuing from a previous request.
             - posts_limit (int, optional): The maximum number of posts to retrieve across all responses.
                 Defaults to 500.
+        token (str): The access token.
+        mark (str, optional): Stop at the posts older than this high-water mark, see iter_search_pages.
 
     Returns:
-        list: A list of posts matching the search criteria.
+        list: A list of post records matching the search criteria.
 
     Notes:
         - Progress is displayed using a progress bar indicating the number of posts fetched.
@@ -247,53 +565,198 @@ def search_posts(params: dict, token: str) -> list[dict]:
         - Logs and returns partial results if an error occurs during fetching.
 
     """
-    posts = []
-    url = "https://bsky.social/xrpc/app.bsky.feed.searchPosts"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-    }
+    posts: list[Post] = []
+    pages = iter_search_pages(params, token, mark=mark)
+    for page in pages:
+        posts.extend(page)
+        if posts:
+            break
+    if not posts:
+        return posts
+
+    # alive_progress is slow to import, so only load it once there is progress to show.
+    # pylint: disable=C0415
+    from alive_progress import alive_bar
+    from alive_progress.animations.bars import bar_factory
 
-    total_fetched = 0
-    posts_limit = params.get("posts_limit")
     butterfly_bar = bar_factory("✨", tip="🦋", errors="🔥🧯👩‍🚒")
 
-    with alive_bar(posts_limit, bar=butterfly_bar, spinner="waves") as progress:
-        while True:
-            try:
-                response = requests.get(url, headers=headers, params=params, timeout=10)
-                # print(response)
-                response.raise_for_status()
-                data = response.json()
-
-                # Check if we have reached our overall posts limit
-                new_posts = data.get("posts", [])
-                posts.extend(new_posts)
-                total_fetched += len(new_posts)
-
-                # Update progress bar
-                progress(len(new_posts))
-
-                if posts_limit and total_fetched >= posts_limit:
-                    print(
-                        f"Fetched {total_fetched} posts, total: {total_fetched}/{posts_limit}"
-                    )
-                    return posts[:posts_limit]
-
-                # Move to the enxt page if available
-                next_cursor = data.get("cursor")
-                if not next_cursor:
-                    print(f"All posts fetched. Total: {total_fetched}")
-                    return posts
-
-                params["cursor"] = next_cursor
-            except requests.exceptions.RequestException as err:
-                print(f"Error fetching posts: {err}")
-                print(
-                    "Response:",
-                    response.text if "response" in locals() else "No response",
+    with alive_bar(
+        params.get("posts_limit"), bar=butterfly_bar, spinner="waves"
+    ) as progress:
+        progress(len(posts))
+        for page in pages:
+            posts.extend(page)
+            # Update progress bar
+            progress(len(page))
+    return posts
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def split_time_range(
+    since: str, until: str, shards: int
+) -> list[tuple[datetime, datetime]]:
+    """Split [since, until) into equal windows, newest first.
+
+    Args:
+        since (str): Start of the range (ISO 8601, inclusive).
+        until (str): End of the range (ISO 8601, not inclusive).
+        shards (int): Number of windows.
+
+    Returns:
+        list[tuple[datetime, datetime]]: (since, until) pairs of each window.
+
+    """
+    start, end = parse_datetime(since), parse_datetime(until)
+    if start >= end:
+        raise ValueError("since must be earlier than until.")
+    step = (end - start) / shards
+    bounds = [start + step * index for index in range(shards)] + [end]
+    return [(bounds[index], bounds[index + 1]) for index in reversed(range(shards))]
+
+
+def _search_window(
+    params: dict, token: str, window: tuple[datetime, datetime], max_pages: int
+) -> tuple[list[Post], bool]:
+    """Follow one cursor chain restricted to a time window.
+
+    Returns:
+        tuple[list[Post], bool]: The posts found and whether the chain was cut
+            short by `max_pages`, meaning the window holds more posts.
+
+    """
+    window_params = {
+        **params,
+        "since": _format_datetime(window[0]),
+        "until": _format_datetime(window[1]),
+        "cursor": "",
+    }
+    posts_limit = params.get("posts_limit")
+    posts: list[Post] = []
+
+    for _ in range(max_pages):
+        try:
+            data = fetch_search_page(window_params, token)
+        except requests.exceptions.RequestException as err:
+            print(f"Error fetching posts: {err}")
+            return posts, False
+        posts.extend(data.get("posts", []))
+        next_cursor = data.get("cursor")
+        if not next_cursor or (posts_limit and len(posts) >= posts_limit):
+            return posts, False
+        window_params["cursor"] = next_cursor
+    return posts, True
+
+
+def _remaining_windows(
+    window: tuple[datetime, datetime], posts: list[Post]
+) -> list[tuple[datetime, datetime]]:
+    """Return the windows left to fetch after a capped chain, newest first.
+
+    The chain fetched the window newest first, so only the range below its oldest
+    post is left. It is bisected so both halves are fetched concurrently.
+    """
+    start, end = window
+    if posts:
+        oldest = min(parse_datetime(post.created_at) for post in posts)
+        # until is exclusive and sent in whole seconds, so keep the oldest second.
+        end = min(end, oldest.replace(microsecond=0) + timedelta(seconds=1))
+    if end - start <= MIN_WINDOW:
+        return [(start, end)] if start < end < window[1] else []
+    middle = start + (end - start) / 2
+    return [(middle, end), (start, middle)]
+
+
+def search_posts_sharded(
+    params: dict,
+    token: str,
+    shards: int = 4,
+    workers: int = 4,
+    max_pages: int = DEFAULT_WINDOW_PAGES,
+) -> list[Post]:
+    """Search for posts by fetching time windows of the since/until range in parallel.
+
+    The range is split into `shards` windows that are fetched concurrently. A window
+    whose cursor chain is still going after `max_pages` pages is resumed below its
+    oldest fetched post, bisected so both halves are fetched at once, so deep result
+    sets are reached through many short chains instead of one long one. A window is
+    skipped once params["posts_limit"] posts newer than it have been found, since
+    none of its posts could make the cut.
+
+    Args:
+        params (dict): The query parameters, see search_posts. "since" and "until"
+            are required.
+        token (str): The access token.
+        shards (int, optional): Number of initial windows. Defaults to 4.
+        workers (int, optional): Number of windows fetched at once. Defaults to 4.
+        max_pages (int, optional): Page cap per window before it is bisected.
+            Defaults to DEFAULT_WINDOW_PAGES.
+
+    Returns:
+        list: Posts with duplicates removed, newest window first, truncated to
+            params["posts_limit"].
+
+    """
+    if not params.get("since") or not params.get("until"):
+        raise ValueError("Sharded search needs both since and until.")
+
+    windows = split_time_range(params["since"], params["until"], shards)
+    results: dict[tuple[datetime, datetime], list[Post]] = {}
+    posts_limit: int | None = params.get("posts_limit")
+    # Creation time of every post found so far, by URI.
+    found: dict[str, datetime] = {}
+
+    def outranked(window: tuple[datetime, datetime]) -> bool:
+        """Return whether posts_limit posts newer than the window were found."""
+        if not posts_limit:
+            return False
+        newer = sum(1 for created in found.values() if created >= window[1])
+        return newer >= posts_limit
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {
+            pool.submit(_search_window, params, token, window, max_pages): window
+            for window in windows
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                window = pending.pop(future)
+                if future.cancelled():
+                    continue
+                posts, capped = future.result()
+                results[window] = posts
+                found.update(
+                    (post.uri, parse_datetime(post.created_at)) for post in posts
                 )
-                return posts
+                if capped:
+                    for rest in _remaining_windows(window, posts):
+                        if not outranked(rest):
+                            pending[
+                                pool.submit(
+                                    _search_window, params, token, rest, max_pages
+                                )
+                            ] = rest
+            for waiting, waiting_window in pending.items():
+                if outranked(waiting_window):
+                    waiting.cancel()
+
+    seen = set()
+    posts = []
+    # Newest windows first; a bisected window's posts come before its halves'.
+    for window in sorted(
+        results, key=lambda window: (-window[1].timestamp(), window[0])
+    ):
+        for post in results[window]:
+            if post.uri not in seen:
+                seen.add(post.uri)
+                posts.append(post)
+
+    print(f"Fetched {len(posts)} posts from {len(results)} time windows.")
+    return posts[:posts_limit] if posts_limit else posts
 
 
 # Begin Click CLI
@@ -394,6 +857,160 @@ def search_posts(params: dict, token: str) -> list[dict]:
         "even if multiple API calls are required. If not specified, 1000 posts will be recieved."
     ),
 )
+@click.option(
+    "--validation",
+    type=click.Choice(list(file.VALIDATION_STRATEGIES), case_sensitive=False),
+    required=False,
+    default="xrpc",
+    help=(
+        'Strategy used to drop deleted posts. "xrpc" checks up to 25 posts per request through '
+        'app.bsky.feed.getPosts, "html" fetches every post page from bsky.app. Defaults to "xrpc".'
+    ),
+)
+@click.option(
+    "--validate-workers",
+    type=click.IntRange(1, 64),
+    required=False,
+    default=4,
+    help="Number of post validation requests to run concurrently. Defaults to 4.",
+)
+@click.option(
+    "--validation-ttl",
+    type=click.FloatRange(0, None),
+    required=False,
+    default=24,
+    help="Number of hours a cached post validation result is reused for. Defaults to 24.",
+)
+@click.option(
+    "--revalidate",
+    is_flag=True,
+    default=False,
+    help="Ignore cached post validation results and check every post again.",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["sync", "async"], case_sensitive=False),
+    required=False,
+    default="sync",
+    help=(
+        'Scraping engine. "async" validates each page while the next one is fetched. '
+        'Defaults to "sync".'
+    ),
+)
+@click.option(
+    "--shards",
+    type=click.IntRange(1, 64),
+    required=False,
+    default=1,
+    help=(
+        "Split the --since/--until range into this many time windows and fetch them in parallel. "
+        "Windows that reach --window-pages are bisected automatically. Requires --since and --until. "
+        "Defaults to 1 (a single cursor chain)."
+    ),
+)
+@click.option(
+    "--window-pages",
+    type=click.IntRange(1, None),
+    required=False,
+    default=DEFAULT_WINDOW_PAGES,
+    help=f"Number of pages a time window may use before it is bisected. Defaults to {DEFAULT_WINDOW_PAGES}.",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help=(
+        "Fetch, validate and save one page at a time, appending rows to the CSV as they are produced "
+        "so memory use does not grow with --posts_limit."
+    ),
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help=(
+        "Continue an interrupted --stream search from its checkpoint, which is saved next to "
+        "the output after every page. Implies --stream. Only for the csv and jsonl formats."
+    ),
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help=(
+        "Only fetch the posts newer than the newest post of the last run of the same query, whose "
+        "created_at is kept next to the output. Sets --since to it and stops paging at the first page "
+        "that reaches older posts. Needs --sort latest."
+    ),
+)
+@click.option(
+    "--append",
+    is_flag=True,
+    default=False,
+    help=(
+        "Append only posts that are not in the CSV yet, using a key index kept next to the file, "
+        "instead of re-reading and rewriting the whole file."
+    ),
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    type=click.Choice(list(writers.WRITERS), case_sensitive=False),
+    required=False,
+    default="csv",
+    help=(
+        'Output format. "parquet" and "arrow" write a dataset directory with one part file per run '
+        'and need pyarrow. Every format except "csv" without --append only adds posts that are not '
+        'saved yet. Defaults to "csv".'
+    ),
+)
+@click.option(
+    "--base-url",
+    type=str,
+    envvar="MISSION_BLUE_BASE_URL",
+    required=False,
+    help=(
+        "Send every request to this server instead of bsky.social and bsky.app, e.g. "
+        "http://127.0.0.1:8000 for a local fake_server.py. Resolved handles are then not "
+        "cached on disk. Can also be set with MISSION_BLUE_BASE_URL."
+    ),
+)
+@click.option(
+    "--archive",
+    "archive_path",
+    type=click.Path(dir_okay=False, writable=True),
+    required=False,
+    help=(
+        "Append every raw search page to this compressed JSONL archive as it is fetched, so "
+        "the output can be rebuilt later with reextract.py. A path ending in .zst is written "
+        "with zstd (needs zstandard), anything else with gzip, e.g. blue.jsonl.gz."
+    ),
+)
+@click.option(
+    "--report",
+    type=click.Path(dir_okay=False, writable=True),
+    required=False,
+    help=(
+        "Write a JSON run report with the time, rows, requests, bytes, retries and request "
+        "latencies of every stage (auth, DID resolution, search, extraction, validation, save)."
+    ),
+)
+@click.option(
+    "--prometheus",
+    type=click.Path(dir_okay=False, writable=True),
+    required=False,
+    help="Write the same metrics as a Prometheus textfile, e.g. for the node_exporter textfile collector.",
+)
+@click.option(
+    "--profile",
+    type=click.Path(file_okay=False, writable=True),
+    required=False,
+    help=(
+        "Run under cProfile and tracemalloc and write cpu.pstats, allocations.txt (top allocations "
+        "after searching, extracting and saving) and stacks.collapsed (for flame graphs) to this directory."
+    ),
+)
 def main(
     query: str = "",
     sort: str = "",
@@ -407,11 +1024,64 @@ def main(
     tags: tuple = (),
     limit: int = 25,
     posts_limit: int = 1000,
+    validation: str = "xrpc",
+    validate_workers: int = 4,
+    validation_ttl: float = 24,
+    revalidate: bool = False,
+    engine: str = "sync",
+    shards: int = 1,
+    window_pages: int = DEFAULT_WINDOW_PAGES,
+    stream: bool = False,
+    resume: bool = False,
+    incremental: bool = False,
+    append: bool = False,
+    output_format: str = "csv",
+    base_url: str = "",
+    archive_path: str | None = None,
+    report: str | None = None,
+    prometheus: str | None = None,
+    profile: str | None = None,
 ) -> None:
     """Method that tests if each click param flag is being passed in correctly."""
     # pylint: disable=R0913
     # pylint: disable=R0914
     # pylint: disable=R0917
+    if shards > 1 and not (since and until):
+        raise click.UsageError("--shards requires both --since and --until.")
+    if shards > 1 and engine == "async":
+        raise click.UsageError("--shards can not be combined with --engine async.")
+    stream = stream or resume
+    if resume and not writers.WRITERS[output_format].flushes_batches:
+        raise click.UsageError(
+            f"--resume can not be used with --format {output_format}."
+        )
+    if stream and (shards > 1 or engine == "async"):
+        raise click.UsageError(
+            "--stream can not be combined with --shards or --engine async."
+        )
+    if incremental and sort != "latest":
+        raise click.UsageError("--incremental requires --sort latest.")
+    if incremental and (shards > 1 or engine == "async"):
+        raise click.UsageError(
+            "--incremental can not be combined with --shards or --engine async."
+        )
+
+    if base_url:
+        client.set_base_url(base_url)
+    # Written when the command exits, also after a failure.
+    metrics.reset()
+    context = click.get_current_context()
+    context.call_on_close(lambda: metrics.write_outputs(report, prometheus))
+    if profile:
+        profiling.start(profile)
+        context.call_on_close(profiling.stop)
+    if archive_path:
+        try:
+            archive.start(archive_path)
+        except ImportError as err:
+            raise click.UsageError(str(err)) from err
+        context.call_on_close(archive.stop)
+
     print("Loading Credentials...")
     bluesky_handle, bluesky_app_password = auth.load_credentials()
 
@@ -420,37 +1090,112 @@ def main(
 
     # Authenticate and create a session
     print("Authenticating...")
-    access_token = auth.create_session(bluesky_handle, bluesky_app_password)
+    access_token = auth.get_access_token(bluesky_handle, bluesky_app_password)
     print("Authentication successful.")
 
-    query_param = generate_query_params(
-        access_token,
-        query,
-        sort,
-        since,
-        until,
-        mentions,
-        author,
-        lang,
-        domain,
-        url,
-        list(tags) if tags else None,
-        limit,
-        posts_limit=posts_limit,
-        cursor="",
+    # Handles resolved by another server must not end up in the shared cache.
+    with contextlib.nullcontext() if base_url else cache.did_cache() as handle_cache:
+        query_param = generate_query_params(
+            access_token,
+            query,
+            sort,
+            since,
+            until,
+            mentions,
+            author,
+            lang,
+            domain,
+            url,
+            list(tags) if tags else None,
+            limit,
+            posts_limit=posts_limit,
+            cursor="",
+            did_cache=handle_cache,
+        )
+
+    output_path = writers.output_path(file.DIRECTORY_NAME, query, output_format)
+    # A streamed search loads and moves its mark itself, see stream_search.
+    mark = (
+        apply_watermark(query_param, output_path)
+        if incremental and not stream
+        else None
     )
+    with cache.validation_cache(
+        validation_ttl * 3600, revalidate=revalidate
+    ) as post_cache:
+        if stream:
+            # Fetch, extract and save one page at a time
+            print("Fetching, extracting and saving posts...")
+            extract_options = {
+                "strategy": validation,
+                "workers": validate_workers,
+                "cache": post_cache,
+            }
+            try:
+                stream_search(
+                    query_param,
+                    access_token,
+                    output_path,
+                    output_format,
+                    extract_options,
+                    resume,
+                    incremental,
+                )
+            except ValueError as err:
+                raise click.UsageError(f"Can not resume: {err}") from err
+            profiling.snapshot("stream")
+            print(post_cache.report())
+            return
+
+        if engine == "async":
+            # pylint: disable=C0415
+            import asyncio
+
+            import async_engine
 
-    # Fetch posts
-    print("Fetching posts...")
-    raw_posts = search_posts(query_param, access_token)
+            # Fetch, extract and validate pages concurrently
+            print("Fetching and extracting posts...")
+            post_data = asyncio.run(
+                async_engine.scrape_async(
+                    query_param, access_token, validation, validate_workers, post_cache
+                )
+            )
+            profiling.snapshot("async scrape")
+        else:
+            # Fetch posts
+            print("Fetching posts...")
+            if shards > 1:
+                raw_posts = search_posts_sharded(
+                    query_param, access_token, shards, shards, window_pages
+                )
+            else:
+                raw_posts = search_posts(query_param, access_token, mark)
+            profiling.snapshot("search_posts")
 
-    # Extract post data
-    print("Extracting post data...")
-    post_data = file.extract_post_data(raw_posts)
+            # Extract post data
+            print("Extracting post data...")
+            post_data = file.extract_post_data(
+                raw_posts, access_token, validation, validate_workers, post_cache
+            )
+            profiling.snapshot("extract_post_data")
+        print(post_cache.report())
 
-    # Save posts to CSV
-    print("Saving posts to CSV...")
-    file.save_to_csv(post_data, f"Scraped Posts/{query}.csv")
+    # Save posts
+    print(f"Saving posts to {output_format.upper()}...")
+    with metrics.stage("save"):
+        if output_format != "csv":
+            written = writers.write_batches([post_data], output_path, output_format)
+        elif append:
+            written = file.append_to_csv(post_data, output_path)
+        else:
+            file.save_to_csv(post_data, output_path)
+            written = len(post_data)
+    metrics.count_rows("save", len(post_data), written)
+    profiling.snapshot("save")
+    if incremental:
+        watermark.Watermark(output_path).advance(
+            query_param, mark, watermark.newest(raw_posts, mark), len(raw_posts)
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+"""Mission Blue Module that holds the profiling mode of the CLI.
+
+A Profiler runs the pipeline under cProfile and tracemalloc, and samples the stacks
+of every thread at a fixed interval. Allocation snapshots are taken at stage
+boundaries. When it stops, it writes to its directory:
+
+* cpu.pstats: the cProfile statistics of the main thread, for pstats or snakeviz.
+* allocations.txt: for every snapshot, the lines holding the most memory and the
+  lines that allocated the most since the previous snapshot.
+* stacks.collapsed: the sampled stacks of all threads in the collapsed format read
+  by flamegraph.pl, speedscope and inferno.
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import FrameType
+
+# Lines listed per snapshot in the allocation report.
+TOP_ALLOCATIONS = 25
+# Frames kept per allocation traceback.
+TRACEBACK_FRAMES = 10
+# Seconds between two stack samples.
+SAMPLE_INTERVAL = 0.005
+
+
+def _collapse(frame: FrameType | None) -> str:
+    """Return a stack as root-first "file:function" entries joined by semicolons."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    """Profiles CPU time and allocations between start and stop."""
+
+    def __init__(self, directory: str, top: int = TOP_ALLOCATIONS) -> None:
+        """Prepare a profiler. Nothing is measured until start is called.
+
+        Args:
+            directory (str): Directory the profile files are written to.
+            top (int, optional): Lines listed per snapshot in the allocation
+                report. Defaults to TOP_ALLOCATIONS.
+
+        """
+        self.directory = directory
+        self.top = top
+        self.snapshots: list[tuple[str, tracemalloc.Snapshot]] = []
+        self.stacks: Counter[str] = Counter()
+        self._cpu = cProfile.Profile()
+        self._stop_sampling = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop_sampling.wait(SAMPLE_INTERVAL):
+            for ident, frame in sys._current_frames().items():  # pylint: disable=W0212
+                if ident != own:
+                    self.stacks[_collapse(frame)] += 1
+
+    def start(self) -> None:
+        """Start tracing allocations, profiling and sampling stacks."""
+        tracemalloc.start(TRACEBACK_FRAMES)
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._cpu.enable()
+
+    def snapshot(self, label: str) -> None:
+        """Take an allocation snapshot at the end of a stage."""
+        if tracemalloc.is_tracing():
+            self.snapshots.append((label, tracemalloc.take_snapshot()))
+
+    def stop(self) -> None:
+        """Stop measuring and write the profile files."""
+        self._cpu.disable()
+        self._stop_sampling.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.snapshot("end")
+        tracemalloc.stop()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._cpu.dump_stats(os.path.join(self.directory, "cpu.pstats"))
+        with open(
+            os.path.join(self.directory, "allocations.txt"), "w", encoding="utf-8"
+        ) as report:
+            report.write(self.allocation_report())
+        with open(
+            os.path.join(self.directory, "stacks.collapsed"), "w", encoding="utf-8"
+        ) as collapsed:
+            collapsed.writelines(
+                f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+            )
+        print(f"Profile saved to {self.directory}")
+
+    def allocation_report(self) -> str:
+        """Return the top allocations of every snapshot and the growth since the last."""
+        sections = []
+        previous: tracemalloc.Snapshot | None = None
+        for label, snapshot in self.snapshots:
+            stats = snapshot.statistics("lineno")
+            total = sum(stat.size for stat in stats)
+            lines = [f"== {label}: {total / 2**20:.1f} MiB allocated =="]
+            lines += [f"{stat}" for stat in stats[: self.top]]
+            if previous is not None:
+                lines.append("-- growth since the previous snapshot --")
+                lines += [
+                    f"{stat}"
+                    for stat in snapshot.compare_to(previous, "lineno")[: self.top]
+                ]
+            sections.append("\n".join(lines))
+            previous = snapshot
+        return "\n\n".join(sections) + "\n"
+
+
+_active: Profiler | None = None
+
+
+def start(directory: str) -> Profiler:
+    """Start profiling the process, see Profiler."""
+    global _active  # pylint: disable=W0603
+    _active = Profiler(directory)
+    _active.start()
+    return _active
+
+
+def snapshot(label: str) -> None:
+    """Take an allocation snapshot if the process is being profiled."""
+    if _active is not None:
+        _active.snapshot(label)
+
+
+def stop() -> None:
+    """Stop profiling and write the profile files, if profiling was started."""
+    global _active  # pylint: disable=W0603
+    if _active is not None:
+        _active.stop()
+        _active = None
@@ -0,0 +1,144 @@
+"""Mission Blue Module that holds the compact record kept for every scraped post.
+
+A raw app.bsky.feed.searchPosts result carries embeds, facets, labels, counts and
+viewer state, but only four of its fields are saved. Pages are projected to Post
+records as soon as they are received, so the raw JSON can be freed right away, and
+records are only turned into dictionaries by the writers.
+"""
+
+import sys
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from typing import Any, NamedTuple
+
+import archive
+import client
+import codec
+
+
+class Post(NamedTuple):
+    """The fields of a post that are validated and saved."""
+
+    uri: str
+    author: str
+    content: str
+    created_at: str
+
+    @classmethod
+    def from_raw(cls, raw: dict) -> "Post":
+        """Project a raw searchPosts result.
+
+        Raises:
+            KeyError: If the post has no record, author, indexedAt or uri.
+
+        """
+        return cls(
+            raw["uri"],
+            # Handles repeat across posts, so keep one copy of each.
+            sys.intern(raw["author"].get("handle", "")),
+            raw["record"].get("text", ""),
+            raw["indexedAt"],
+        )
+
+    @property
+    def post_link(self) -> str:
+        """URL of the post page on bsky.app."""
+        post_id = self.uri.split("/")[-1]
+        return f"{client.WEB_BASE_URL}/profile/{self.author}/post/{post_id}"
+
+    def to_dict(self) -> dict:
+        """Return the row saved for this post, see writers.POST_FIELDS."""
+        return {
+            "author": self.author,
+            "content": self.content,
+            "created_at": self.created_at,
+            "post_link": self.post_link,
+        }
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse an ISO 8601 date or datetime, such as created_at, as an aware datetime.
+
+    UTC is assumed when no offset is given.
+    """
+    # Before Python 3.11, fromisoformat does not accept the "Z" used by Bluesky.
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def project_page(posts: Iterable[Post | dict]) -> list[Post]:
+    """Project raw posts to records, skipping posts with missing data.
+
+    Args:
+        posts (Iterable[Post | dict]): Raw searchPosts results. Records are passed
+            through unchanged.
+
+    Returns:
+        list[Post]: One record per complete post, in input order.
+
+    """
+    projected = []
+    for post in posts:
+        if isinstance(post, Post):
+            projected.append(post)
+            continue
+        try:
+            projected.append(Post.from_raw(post))
+        except KeyError as err:
+            print(f"Missing data in post: {err}")
+    return projected
+
+
+def _project_typed(posts: list[Any]) -> list[Post]:
+    """Project the posts of a page decoded by codec.decode_search_page."""
+    projected = []
+    for post in posts:
+        # The same fields, in the same order, as Post.from_raw reads.
+        for name in ("uri", "author", "record", "indexedAt"):
+            if getattr(post, name) is None:
+                print(f"Missing data in post: {name!r}")
+                break
+        else:
+            projected.append(
+                Post(
+                    post.uri,
+                    sys.intern(post.author.handle),
+                    post.record.text,
+                    post.indexedAt,
+                )
+            )
+    return projected
+
+
+def read_search_page(content: bytes, params: dict) -> dict:
+    """Decode a searchPosts response body, with its posts projected to records.
+
+    With the msgspec backend only the fields of Post are decoded. If an archive is
+    open, or the page does not fit the msgspec schema, the whole page is decoded,
+    archived and then projected.
+
+    Args:
+        content (bytes): The response body.
+        params (dict): The parameters the page was fetched with, for the archive.
+
+    Returns:
+        dict: The response, with "posts" holding Post records.
+
+    """
+    if not archive.is_open():
+        page = codec.decode_search_page(content)
+        if page is not None:
+            return {"cursor": page.cursor, "posts": _project_typed(page.posts)}
+    data = dict(codec.loads(content))
+    archive.record_page(params, data)
+    data["posts"] = project_page(data.get("posts", []))
+    return data
+
+
+def as_row(post: Post | dict) -> dict:
+    """Return the row to save for a record, or a row read back from an output."""
+    return post.to_dict() if isinstance(post, Post) else post
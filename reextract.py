@@ -0,0 +1,186 @@
+"""Mission Blue Module that rebuilds outputs from raw-page archives.
+
+Archives written with mission_blue --archive (see archive) hold every raw
+searchPosts page of a crawl, so an output can be rebuilt, for example after a
+column was added to records.Post, without any network access. Posts are projected
+the same way as during a crawl but are not validated, since that needs the network.
+
+Archives are streamed in chunks of CHUNK_PAGES pages. Chunks are decoded in worker
+processes, a few at a time, and every chunk is written as one batch as soon as it
+is decoded, so memory use does not grow with the size of the archives. Rows are
+written in the order of the files given, and posts that are already in the output
+are skipped.
+
+Run it with:
+
+    python reextract.py "Scraped Posts/blue.jsonl.gz" --output blue --workers 4
+"""
+
+import collections
+import contextlib
+import multiprocessing
+import os
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import click
+
+import archive
+import codec
+import file
+import writers
+from records import Post, project_page
+
+# Archived pages decoded and written together.
+CHUNK_PAGES = 100
+
+
+def iter_chunks(path: str, size: int = CHUNK_PAGES) -> Iterator[list[str]]:
+    """Yield the entries of an archive in chunks of up to size undecoded lines."""
+    chunk: list[str] = []
+    for line in archive.iter_lines(path):
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract_pages(lines: list[str]) -> list[Post]:
+    """Return the post records of archived pages, given as undecoded lines."""
+    posts: list[Post] = []
+    for line in lines:
+        posts.extend(project_page(codec.loads(line)["page"].get("posts", [])))
+    return posts
+
+
+def extract_chunks(
+    paths: list[str], pool: ProcessPoolExecutor | None = None, ahead: int = 1
+) -> Iterator[tuple[str, list[Post]]]:
+    """Yield the post records of every chunk of the archives, in archive order.
+
+    Args:
+        paths (list[str]): Paths of the archives.
+        pool (ProcessPoolExecutor, optional): Pool that decodes the chunks. Defaults
+            to None, which decodes them in this process.
+        ahead (int, optional): Number of chunks submitted to the pool at once.
+            Defaults to 1.
+
+    Yields:
+        tuple[str, list[Post]]: The path of an archive and the records of a chunk.
+
+    """
+    chunks = ((path, lines) for path in paths for lines in iter_chunks(path))
+    if pool is None:
+        for path, lines in chunks:
+            yield path, extract_pages(lines)
+        return
+
+    pending: collections.deque[tuple[str, Future[list[Post]]]] = collections.deque()
+    for path, lines in chunks:
+        pending.append((path, pool.submit(extract_pages, lines)))
+        if len(pending) >= ahead:
+            path, future = pending.popleft()
+            yield path, future.result()
+    while pending:
+        path, future = pending.popleft()
+        yield path, future.result()
+
+
+def reextract(
+    paths: list[str], output_path: str, output_format: str = "csv", workers: int = 1
+) -> int:
+    """Write the posts of every archive to an output.
+
+    Args:
+        paths (list[str]): Paths of the archives.
+        output_path (str): Path of the output, see writers.output_path.
+        output_format (str, optional): One of writers.WRITERS. Defaults to "csv".
+        workers (int, optional): Number of processes decoding chunks at once.
+            Defaults to 1, which decodes them in this process.
+
+    Returns:
+        int: Number of posts written.
+
+    """
+    with contextlib.ExitStack() as stack:
+        pool = None
+        if workers > 1:
+            # Spawned, not forked, so no lock held by another thread is inherited.
+            pool = stack.enter_context(
+                ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            )
+        writer = stack.enter_context(writers.WRITERS[output_format](output_path))
+        # Posts read and written for the archive being read.
+        current, found, written = None, 0, 0
+        for path, posts in extract_chunks(paths, pool, ahead=2 * workers):
+            if path != current:
+                if current is not None:
+                    print(f"{current}: {found} posts, {written} new")
+                current, found, written = path, 0, 0
+            found += len(posts)
+            written += writer.write_batch(posts)
+        if current is not None:
+            print(f"{current}: {found} posts, {written} new")
+    print(f"{writer.written} new posts saved to {output_path}")
+    return writer.written
+
+
+def _archive_name(path: str) -> str:
+    name = os.path.basename(path)
+    for extension in (".gz", ".zst", ".jsonl"):
+        name = name.removesuffix(extension)
+    return name
+
+
+@click.command()
+@click.argument(
+    "archive_paths",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "-o",
+    "--output",
+    type=str,
+    required=False,
+    help="Name of the output under Scraped Posts/. Defaults to the name of the first archive.",
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    type=click.Choice(list(writers.WRITERS), case_sensitive=False),
+    default="csv",
+    help='Output format, see mission_blue --format. Defaults to "csv".',
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(1, None),
+    default=os.cpu_count() or 1,
+    help="Number of processes decoding archive pages at once. Defaults to the CPU count.",
+)
+def main(
+    archive_paths: tuple[str, ...],
+    output: str | None = None,
+    output_format: str = "csv",
+    workers: int = 1,
+) -> None:
+    """Rebuild an output from the raw-page archives in ARCHIVE_PATHS, offline."""
+    output_path = writers.output_path(
+        file.DIRECTORY_NAME, output or _archive_name(archive_paths[0]), output_format
+    )
+    try:
+        reextract(list(archive_paths), output_path, output_format, workers)
+    except ImportError as err:
+        raise click.UsageError(str(err)) from err
+
+
+if __name__ == "__main__":
+    main()
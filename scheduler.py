@@ -0,0 +1,248 @@
+"""Mission Blue Module that holds the scheduler every XRPC request goes through.
+
+The scheduler keeps the request rate under the limit the server announces in its
+ratelimit-* response headers, using a token bucket shared by every thread, and
+retries throttled (429), failed (5xx) and dropped requests with jittered
+exponential backoff. Until a response carries rate-limit headers requests are not
+paced.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections.abc import Callable, Mapping
+from typing import TYPE_CHECKING
+
+from lazy import lazy_import
+
+if TYPE_CHECKING:
+    import requests
+else:
+    requests = lazy_import("requests")
+
+# Status codes that are retried: throttled, and server-side failures.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 5
+# Backoff before retry n is a random share of min(BACKOFF_MAX, BACKOFF_BASE * 2**n).
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+# Requests kept in hand from the announced budget, for requests already in flight.
+RESERVE = 2
+# Methods the server limits separately, so they must not size the global bucket.
+SEPARATE_LIMITS = ("com.atproto.server.createSession",)
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> float | None:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _policy_window(policy: str) -> float | None:
+    """Return the window of a policy such as "3000;w=300", in seconds."""
+    for part in policy.split(";")[1:]:
+        name, _, value = part.strip().partition("=")
+        if name == "w":
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+class TokenBucket:
+    """A token bucket sized from the ratelimit-* headers of the responses.
+
+    The server grants ratelimit-limit requests per window of ratelimit-policy
+    seconds ("3000;w=300") and reports what is left with ratelimit-remaining and
+    when the window ends with ratelimit-reset (a Unix timestamp). The bucket holds
+    at most the announced remaining budget and refills at limit / window.
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Create an unsized bucket that lets every request through."""
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._lock = threading.Lock()
+        self.capacity: float | None = None
+        self.rate: float | None = None
+        self.tokens = 0.0
+        self._updated = clock()
+        self._reset: float | None = None
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.rate is not None and self.capacity is not None:
+            elapsed = now - self._updated
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token. Returns 0, or the seconds to wait before trying again."""
+        with self._lock:
+            now = self._clock()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.rate is None:
+                return 0.0
+            self._refill(now)
+            # Allow for rounding, so waiting the returned time is always enough.
+            if self.tokens >= 1 - 1e-9:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Resize the bucket from the rate-limit headers of a response."""
+        limit = _header_float(headers, "ratelimit-limit")
+        remaining = _header_float(headers, "ratelimit-remaining")
+        if limit is None or remaining is None:
+            return
+        reset = _header_float(headers, "ratelimit-reset")
+        window = _policy_window(headers.get("ratelimit-policy", ""))
+        if window is None and reset is not None:
+            window = reset - self._wall_clock()
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.capacity = max(limit - RESERVE, 1.0)
+            self.rate = self.capacity / max(window or 1.0, 1.0)
+            budget = max(remaining - RESERVE, 0.0)
+            # Responses can arrive out of order, so an older, larger remaining
+            # count only counts once the server has started a new window.
+            if reset != self._reset or budget < self.tokens:
+                self.tokens = budget
+            self._reset = reset
+
+    def pause(self, seconds: float) -> None:
+        """Hold every request for the given number of seconds."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+    def seconds_until_reset(self) -> float | None:
+        """Return the seconds until the current window ends, if known."""
+        if self._reset is None:
+            return None
+        return max(self._reset - self._wall_clock(), 0.0)
+
+
+class RequestScheduler:
+    """Paces and retries requests against one shared rate-limit budget."""
+
+    def __init__(
+        self,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Create a scheduler.
+
+        Args:
+            max_retries (int, optional): Retries per request before the last
+                response or error is returned. Defaults to MAX_RETRIES.
+            backoff_base (float, optional): Seconds before the first retry, at most.
+                Defaults to BACKOFF_BASE.
+            backoff_max (float, optional): Longest backoff, in seconds. Defaults to
+                BACKOFF_MAX.
+            clock (Callable, optional): Monotonic clock. Defaults to time.monotonic.
+            wall_clock (Callable, optional): Clock matching ratelimit-reset.
+                Defaults to time.time.
+            sleep (Callable, optional): Sleep function. Defaults to time.sleep.
+
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._sleep = sleep
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+
+    def bucket(self, method: str) -> TokenBucket:
+        """Return the bucket that method draws from."""
+        key = method if method in SEPARATE_LIMITS else "global"
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self._clock, self._wall_clock)
+            return self._buckets[key]
+
+    def backoff(self, attempt: int) -> float:
+        """Return a jittered delay before retry number attempt (0-based)."""
+        ceiling = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return random.uniform(ceiling / 2, ceiling)
+
+    def _retry_delay(
+        self, attempt: int, bucket: TokenBucket, response: requests.Response
+    ) -> float:
+        delay = self.backoff(attempt)
+        if response.status_code == 429:
+            retry_after = _header_float(response.headers, "retry-after")
+            until_reset = bucket.seconds_until_reset()
+            delay = max(delay, retry_after or 0.0, until_reset or 0.0)
+            # Every worker waits, not only the one that was throttled.
+            bucket.pause(delay)
+        return delay
+
+    def send(
+        self, method: str, request: Callable[[], requests.Response]
+    ) -> requests.Response:
+        """Send a request when the budget allows it, retrying transient failures.
+
+        Args:
+            method (str): XRPC method name, used to pick the rate-limit bucket.
+            request (Callable): Sends the request once and returns the response.
+
+        Returns:
+            requests.Response: The first response that is not retried, or the last
+                one once max_retries is reached.
+
+        Raises:
+            requests.exceptions.RequestException: If the connection still fails
+                after max_retries retries.
+
+        """
+        bucket = self.bucket(method)
+        attempt = 0
+        while True:
+            wait = bucket.reserve()
+            while wait > 0:
+                self._sleep(wait)
+                wait = bucket.reserve()
+            with self._lock:
+                self.requests += 1
+            try:
+                response = request()
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                bucket.update(response.headers)
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt >= self.max_retries
+                ):
+                    return response
+                delay = self._retry_delay(attempt, bucket, response)
+                response.close()
+            with self._lock:
+                self.retries += 1
+            self._sleep(delay)
+            attempt += 1
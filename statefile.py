@@ -0,0 +1,63 @@
+"""Mission Blue Module that holds the helpers for small state files.
+
+Checkpoints, high-water marks, cached sessions and run reports are small files
+that are rewritten while a run goes on. They are written to a temporary file which
+then replaces the old one, so an interrupted run never leaves half a file behind.
+"""
+
+import json
+import os
+from collections.abc import Iterable
+from typing import Any
+
+
+def write_atomically(path: str, text: str, permissions: int = 0o666) -> None:
+    """Replace the file at path with text, creating missing parent directories.
+
+    Args:
+        path (str): Path of the file.
+        text (str): The new content.
+        permissions (int, optional): Permissions of a new file, before the umask
+            is applied. Defaults to 0o666, as for open.
+
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, permissions)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as output:
+        output.write(text)
+    os.replace(temp_path, path)
+
+
+def write_json(path: str, value: Any, permissions: int = 0o666) -> None:
+    """Replace the file at path with value as indented JSON, see write_atomically."""
+    write_atomically(path, json.dumps(value, indent=2) + "\n", permissions)
+
+
+def read_json(path: str) -> dict[str, Any] | None:
+    """Return the JSON object saved at path, or None if there is no file."""
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as state_file:
+        return dict(json.load(state_file))
+
+
+def same_search(
+    saved: dict[str, Any], params: dict[str, Any], changes: Iterable[str]
+) -> bool:
+    """Return whether saved parameters describe the same search as params.
+
+    Args:
+        saved (dict): The parameters saved in a state file.
+        params (dict): The parameters of the current search.
+        changes (Iterable[str]): Parameters that may differ between the two.
+
+    """
+    ignored = set(changes)
+
+    def comparable(values: dict[str, Any]) -> dict[str, Any]:
+        return {key: value for key, value in values.items() if key not in ignored}
+
+    return comparable(saved) == comparable(params)
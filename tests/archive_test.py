@@ -0,0 +1,79 @@
+"""Testing suite for the archive module."""
+
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import archive
+from archive import PageArchive, iter_pages
+
+
+class TestPageArchive(unittest.TestCase):
+    """Testing the PageArchive class and iter_pages."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "blue.jsonl.gz")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_round_trip_and_append(self) -> None:
+        """Test that pages of several runs are read back in order from one gzip file."""
+        for run in range(2):
+            page_archive = PageArchive(self.path)
+            page_archive.write_page(
+                {"q": "blue", "cursor": str(run)}, {"posts": [{"uri": f"at://{run}"}]}
+            )
+            page_archive.close()
+
+        entries = list(iter_pages(self.path))
+
+        with open(self.path, "rb") as raw:
+            self.assertEqual(raw.read(2), b"\x1f\x8b")
+        self.assertEqual([entry["params"]["cursor"] for entry in entries], ["0", "1"])
+        self.assertEqual(entries[1]["page"], {"posts": [{"uri": "at://1"}]})
+        self.assertIn("fetched_at", entries[0])
+
+    @unittest.skipUnless(importlib.util.find_spec("zstandard"), "needs zstandard")
+    def test_zstd_round_trip_and_append(self) -> None:
+        """Test that pages of several runs are read back in order from one zstd file."""
+        path = os.path.join(self.directory.name, "blue.jsonl.zst")
+        for run in range(3):
+            page_archive = PageArchive(path)
+            page_archive.write_page(
+                {"q": "blue", "cursor": str(run)}, {"posts": [{"uri": f"at://{run}"}]}
+            )
+            page_archive.close()
+
+        entries = list(iter_pages(path))
+
+        with open(path, "rb") as raw:
+            self.assertEqual(raw.read(4), b"\x28\xb5\x2f\xfd")
+        self.assertEqual(
+            [entry["params"]["cursor"] for entry in entries], ["0", "1", "2"]
+        )
+        self.assertEqual(entries[2]["page"], {"posts": [{"uri": "at://2"}]})
+
+    @unittest.skipIf(
+        importlib.util.find_spec("zstandard") is not None, "zstandard is installed"
+    )
+    def test_zstd_needs_zstandard(self) -> None:
+        """Test that a .zst archive asks for the optional zstandard package."""
+        with self.assertRaises(ImportError):
+            PageArchive(os.path.join(self.directory.name, "blue.jsonl.zst"))
+
+    def test_record_page_without_archive(self) -> None:
+        """Test that pages are only recorded while an archive is open."""
+        archive.record_page({"q": "blue"}, {"posts": []})
+        archive.start(self.path)
+        archive.record_page({"q": "blue"}, {"posts": []})
+        archive.stop()
+        archive.record_page({"q": "blue"}, {"posts": []})
+
+        self.assertEqual(len(list(iter_pages(self.path))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
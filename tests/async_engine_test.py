@@ -0,0 +1,115 @@
+"""Testing suite for the async_engine module."""
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from typing import Any
+from unittest.mock import patch
+
+import requests
+from fake_server_case import FakeServerTestCase
+
+import client
+import file
+from async_engine import scrape_async, search_posts_async
+from fake_server import ACCESS_TOKEN, FakeCorpus, FakeXrpcServer
+from mission_blue import search_posts
+
+
+class TestAsyncEngine(FakeServerTestCase):
+    """Testing the async engine against a local fake XRPC server."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.start_class_server(FakeXrpcServer(FakeCorpus(230, deleted_every=7)))
+
+    @staticmethod
+    def _params(posts_limit: int) -> dict:
+        return {"q": "blue", "limit": 25, "cursor": "", "posts_limit": posts_limit}
+
+    def test_search_matches_sync(self) -> None:
+        """Test that the async search returns the same posts as the sync one."""
+        for posts_limit in (10, 60, 1000):
+            with self.subTest(posts_limit=posts_limit):
+                expected = search_posts(self._params(posts_limit), ACCESS_TOKEN)
+                result = asyncio.run(
+                    search_posts_async(self._params(posts_limit), ACCESS_TOKEN)
+                )
+                self.assertEqual(result, expected)
+                self.assertEqual(len(result), min(posts_limit, 230))
+
+    def test_scrape_produces_same_csv(self) -> None:
+        """Test that both engines write byte-identical CSV files."""
+        raw_posts = search_posts(self._params(1000), ACCESS_TOKEN)
+        expected = file.extract_post_data(raw_posts, ACCESS_TOKEN, "xrpc", 4)
+        result = asyncio.run(
+            scrape_async(self._params(1000), ACCESS_TOKEN, "xrpc", workers=4)
+        )
+
+        self.assertEqual(result, expected)
+        self.assertEqual(len(result), 230 - len(self.server.corpus.deleted))
+
+        with tempfile.TemporaryDirectory() as directory:
+            sync_path = os.path.join(directory, "sync.csv")
+            async_path = os.path.join(directory, "async.csv")
+            file.save_to_csv(expected, sync_path)
+            file.save_to_csv(result, async_path)
+            with open(sync_path, encoding="utf-8") as sync_csv, open(
+                async_path, encoding="utf-8"
+            ) as async_csv:
+                self.assertEqual(async_csv.read(), sync_csv.read())
+
+    def test_failed_page_prints_its_own_response(self) -> None:
+        """Test that a failed request reports its response, not the previous page."""
+        xrpc_get = client.xrpc_get
+        calls = []
+
+        def get(*args: Any, **kwargs: Any) -> requests.Response:
+            response = xrpc_get(*args, **kwargs)
+            calls.append(response)
+            if len(calls) == 2:
+                response.status_code = 502
+                response._content = b"Bad Gateway"  # pylint: disable=W0212
+            return response
+
+        with patch("client.xrpc_get", side_effect=get), patch(
+            "builtins.print"
+        ) as mock_print:
+            posts = asyncio.run(search_posts_async(self._params(1000), ACCESS_TOKEN))
+
+        self.assertEqual(len(posts), 25)
+        mock_print.assert_any_call("Response:", "Bad Gateway")
+
+    def test_scrape_bounds_validation_requests(self) -> None:
+        """Test that no more than `workers` validation requests run at once."""
+        extract_post_data = file.extract_post_data
+        lock = threading.Lock()
+        in_flight = []
+        peak = 0
+
+        def extract(
+            posts: list, token: str, strategy: str, workers: int, cache: Any
+        ) -> Any:
+            nonlocal peak
+            with lock:
+                in_flight.append(workers)
+                peak = max(peak, sum(in_flight))
+            try:
+                return extract_post_data(posts, token, strategy, workers, cache)
+            finally:
+                with lock:
+                    in_flight.remove(workers)
+
+        with patch("file.extract_post_data", side_effect=extract):
+            result = asyncio.run(
+                scrape_async(self._params(1000), ACCESS_TOKEN, "xrpc", workers=2)
+            )
+
+        self.assertEqual(len(result), 230 - len(self.server.corpus.deleted))
+        self.assertLessEqual(peak, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
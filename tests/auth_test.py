@@ -4,20 +4,37 @@
 # pylint: disable=C0301
 # pylint: disable=E0401
 
+import base64
+import json
+import os
+import stat
+import tempfile
+import time
 import unittest
 from unittest import mock
 from unittest.mock import Mock, patch
 
 import requests
+from fake_server_case import FakeServerTestCase
 
-from auth import create_session, load_credentials
+import client
+from auth import SessionStore, create_session, get_access_token, load_credentials
+from fake_server import ACCESS_TOKEN, FakeCorpus, FakeXrpcServer
+from mission_blue import search_posts
+from records import project_page
+
+
+def make_jwt(exp: float) -> str:
+    """Return an unsigned JWT whose payload only holds an exp claim."""
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode())
+    return f"header.{payload.decode().rstrip('=')}.signature"
 
 
 class TestLoadCredentials(unittest.TestCase):
     """Testing the load_credentials method."""
 
     @patch("auth.load_dotenv", return_value=False)
-    def test_no_env(self, mock_load_dotenv) -> None:
+    def test_no_env(self, mock_load_dotenv: mock.MagicMock) -> None:
         """Test if .env file does not exist."""
         with self.assertRaises(SystemExit) as cm:
             load_credentials()
@@ -60,7 +77,7 @@ class TestCreateBlueSkySession(unittest.TestCase):
         self.username: str = "ValidUsername"
         self.password: str = "ValidPassword"
 
-    @patch("auth.requests.post")
+    @patch("auth.client.post")
     def test_successful_authentication(self, mock_post: mock.MagicMock) -> None:
         """ "
         Test if authentication was successful.
@@ -73,7 +90,7 @@ class TestCreateBlueSkySession(unittest.TestCase):
         result = create_session(username=self.username, password=self.password)
         self.assertEqual(result, "mocked_jwt_token")
 
-    @patch("auth.requests.post")
+    @patch("auth.client.post")
     def test_unsuccessful_authentication(self, mock_post: mock.MagicMock) -> None:
         """Test if authentication was not successful.
 
@@ -89,7 +106,7 @@ class TestCreateBlueSkySession(unittest.TestCase):
         with self.assertRaises(SystemExit):
             create_session(username=self.username, password=self.password)
 
-    @patch("auth.requests.post")
+    @patch("auth.client.post")
     def test_invalid_request_error(self, mock_post: mock.MagicMock) -> None:
         """Test if authentication was not successful.
 
@@ -106,5 +123,88 @@ class TestCreateBlueSkySession(unittest.TestCase):
             create_session(self.username, self.password)
 
 
+class TestSessionStore(FakeServerTestCase):
+    """Testing cached sessions against a local fake XRPC server."""
+
+    def setUp(self) -> None:
+        self.start_server(FakeXrpcServer(FakeCorpus(100)))
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "session.json")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _count(self, method: str) -> int:
+        return self.server.request_counts.get(f"com.atproto.server.{method}", 0)
+
+    def test_session_is_reused(self) -> None:
+        """Test that only the first run logs in with the password."""
+        for _ in range(3):
+            token = get_access_token("user.test", "password", self.path)
+
+        self.assertEqual(token, ACCESS_TOKEN)
+        self.assertEqual(self._count("createSession"), 1)
+        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        self.assertEqual(mode, 0o600)
+
+    def test_other_account_logs_in(self) -> None:
+        """Test that a cached session is not used for another account."""
+        get_access_token("user.test", "password", self.path)
+        get_access_token("other.test", "password", self.path)
+
+        self.assertEqual(self._count("createSession"), 2)
+
+    def test_expired_access_token_is_refreshed(self) -> None:
+        """Test that an expired cached access token is refreshed, not re-created."""
+        get_access_token("user.test", "password", self.path)
+        store = SessionStore("user.test", "password", self.path)
+        assert store.session is not None
+        session = dict(store.session, accessJwt=make_jwt(time.time() - 10))
+        with open(self.path, "w", encoding="utf-8") as session_file:
+            json.dump(session, session_file)
+
+        token = get_access_token("user.test", "password", self.path)
+
+        self.assertEqual(token, ACCESS_TOKEN)
+        self.assertEqual(self._count("createSession"), 1)
+        self.assertEqual(self._count("refreshSession"), 1)
+
+    def test_rejected_refresh_logs_in(self) -> None:
+        """Test that the password is used when the refresh token is rejected."""
+        get_access_token("user.test", "password", self.path)
+        self.server.rotate_refresh_token()
+        self.server.expire_access_token()
+
+        token = SessionStore("user.test", "password", self.path).refresh()
+
+        self.assertEqual(token, self.server.access_token)
+        self.assertEqual(self._count("createSession"), 2)
+
+    def test_search_refreshes_expired_token(self) -> None:
+        """Test that a crawl continues after its token expires mid-way."""
+        token = get_access_token("user.test", "password", self.path)
+        params = {"q": "blue", "limit": 25, "cursor": "", "posts_limit": 100}
+        pages = []
+        original = client.get
+
+        def get_and_expire(url: str, **kwargs: object) -> requests.Response:
+            response = original(url, **kwargs)
+            pages.append(url)
+            if len(pages) == 2:
+                self.server.expire_access_token()
+            return response
+
+        with patch("client.get", side_effect=get_and_expire):
+            posts = search_posts(params, token)
+
+        self.assertEqual(posts, project_page(self.server.corpus.posts))
+        self.assertEqual(self._count("createSession"), 1)
+        self.assertEqual(self._count("refreshSession"), 1)
+        with open(self.path, encoding="utf-8") as session_file:
+            self.assertEqual(
+                json.load(session_file)["accessJwt"], self.server.access_token
+            )
+
+
 if __name__ == "__main__":
     unittest.main()
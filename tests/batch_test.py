@@ -0,0 +1,164 @@
+"""Testing suite for the batch module."""
+
+import json
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+from typing import Any
+from unittest.mock import patch
+
+import requests
+from fake_server_case import FakeServerTestCase
+
+import mission_blue
+from batch import SPEC_DEFAULTS, load_specs, run_batch
+from fake_server import ACCESS_TOKEN, FakeCorpus, FakeXrpcServer
+from file import extract_post_data_from_csv
+
+try:
+    import yaml  # noqa: F401
+
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+
+class TestLoadSpecs(unittest.TestCase):
+    """Testing the load_specs function."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _write(self, name: str, text: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as spec_file:
+            spec_file.write(text)
+        return path
+
+    def test_json_and_text(self) -> None:
+        """Test that JSON and text files are read, with defaults filled in."""
+        json_path = self._write(
+            "queries.json",
+            json.dumps(
+                {
+                    "queries": [
+                        {"query": "wildfire", "posts_limit": 50, "tags": "smoke"},
+                        "flood",
+                    ]
+                }
+            ),
+        )
+        text_path = self._write("queries.txt", "# tracked\nwildfire\n\nflood\n")
+
+        specs = load_specs(json_path)
+
+        self.assertEqual(
+            [(spec["query"], spec["output"]) for spec in specs],
+            [("wildfire", "wildfire"), ("flood", "flood")],
+        )
+        self.assertEqual(specs[0]["tags"], ["smoke"])
+        self.assertEqual(specs[0]["posts_limit"], 50)
+        self.assertEqual(specs[1]["posts_limit"], 1000)
+        self.assertEqual(
+            [spec["query"] for spec in load_specs(text_path)], ["wildfire", "flood"]
+        )
+
+    @unittest.skipUnless(HAS_YAML, "PyYAML is not installed")
+    def test_yaml(self) -> None:
+        """Test that a YAML file gives the same specs as the equivalent JSON."""
+        yaml_path = self._write(
+            "queries.yaml", "- query: wildfire\n  format: jsonl\n- flood\n"
+        )
+        json_path = self._write(
+            "queries.json", '[{"query": "wildfire", "format": "jsonl"}, "flood"]'
+        )
+
+        self.assertEqual(load_specs(yaml_path), load_specs(json_path))
+
+    def test_invalid_specs(self) -> None:
+        """Test that malformed specs and clashing outputs are rejected."""
+        for text in (
+            '[{"query": "a", "colour": "blue"}]',
+            '[{"sort": "top"}]',
+            '["a", {"query": "b", "output": "a"}]',
+        ):
+            with self.subTest(text), self.assertRaises(ValueError):
+                load_specs(self._write("queries.json", text))
+        with self.assertRaises(TypeError):
+            load_specs(self._write("queries.json", '{"query": "a"}'))
+
+
+class TestRunBatch(FakeServerTestCase):
+    """Testing run_batch against a local fake XRPC server."""
+
+    def setUp(self) -> None:
+        self.start_server(FakeXrpcServer(FakeCorpus(100)))
+        self.directory = tempfile.TemporaryDirectory()
+        self.directory_patch = patch("file.DIRECTORY_NAME", self.directory.name)
+        self.directory_patch.start()
+        self.lru_patch = patch.object(mission_blue, "_did_lru", OrderedDict[str, str]())
+        self.lru_patch.start()
+
+    def tearDown(self) -> None:
+        self.lru_patch.stop()
+        self.directory_patch.stop()
+        self.directory.cleanup()
+
+    def test_queries_write_their_own_outputs(self) -> None:
+        """Test that each query streams to its own file and handles resolve once."""
+        specs = [
+            dict(SPEC_DEFAULTS, query=name, output=name, posts_limit=count, limit=10)
+            for name, count in (("a", 30), ("b", 45), ("c", 20))
+        ]
+        # Every query mentions the same account.
+        for spec in specs:
+            spec["mentions"] = "alice.test"
+
+        results = run_batch(
+            specs, ACCESS_TOKEN, parallel=2, extract_options={"strategy": "xrpc"}
+        )
+
+        expected = {
+            os.path.join(self.directory.name, f"{name}.csv"): count
+            for name, count in (("a", 30), ("b", 45), ("c", 20))
+        }
+        self.assertEqual(results, expected)
+        for path, count in expected.items():
+            self.assertEqual(len(extract_post_data_from_csv(path)), count)
+        self.assertEqual(
+            self.server.request_counts["com.atproto.identity.resolveHandle"], 1
+        )
+
+    def test_failed_query_does_not_stop_the_others(self) -> None:
+        """Test that a query whose requests fail is reported and skipped."""
+        specs = [
+            dict(SPEC_DEFAULTS, query=name, output=name, posts_limit=20, limit=10)
+            for name in ("a", "b")
+        ]
+        stream_search = mission_blue.stream_search
+
+        def fail_on_a(params: dict, *args: Any) -> int:
+            if params["q"] == "a":
+                raise requests.exceptions.ConnectionError("connection reset")
+            return stream_search(params, *args)
+
+        with patch("mission_blue.stream_search", fail_on_a):
+            results = run_batch(
+                specs, ACCESS_TOKEN, parallel=2, extract_options={"strategy": "xrpc"}
+            )
+
+        self.assertEqual(
+            results,
+            {
+                os.path.join(self.directory.name, "a.csv"): None,
+                os.path.join(self.directory.name, "b.csv"): 20,
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
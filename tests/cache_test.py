@@ -0,0 +1,64 @@
+"""Testing suite for the cache module."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    """Testing the TTLCache class."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.db")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_persists_between_instances(self) -> None:
+        """Test that values written by one run are read back by the next."""
+        with TTLCache("items", 60, self.path) as cache:
+            cache.set("a", True)
+            cache.set_many({"b": False, "c": {"nested": [1, 2]}})
+
+        with TTLCache("items", 60, self.path) as cache:
+            self.assertTrue(cache.get("a"))
+            self.assertFalse(cache.get("b"))
+            self.assertEqual(cache.get("c"), {"nested": [1, 2]})
+            self.assertIsNone(cache.get("missing"))
+            self.assertEqual((cache.hits, cache.misses), (3, 1))
+            self.assertEqual(cache.report(), "items cache: 3 hits, 1 misses")
+
+    def test_expired_entries_are_misses(self) -> None:
+        """Test that entries older than the TTL are ignored."""
+        with TTLCache("items", 60, self.path) as cache:
+            with patch("cache.time.time", return_value=1000.0):
+                cache.set("a", True)
+            with patch("cache.time.time", return_value=1059.0):
+                self.assertTrue(cache.get("a"))
+            with patch("cache.time.time", return_value=1061.0):
+                self.assertIsNone(cache.get("a"))
+
+    def test_revalidate_ignores_entries(self) -> None:
+        """Test that revalidate skips stored entries but still records new ones."""
+        with TTLCache("items", 60, self.path) as cache:
+            cache.set("a", True)
+
+        with TTLCache("items", 60, self.path, revalidate=True) as cache:
+            self.assertIsNone(cache.get("a"))
+            cache.set("a", False)
+
+        with TTLCache("items", 60, self.path) as cache:
+            self.assertFalse(cache.get("a"))
+
+    def test_invalid_table_name(self) -> None:
+        """Test that table names are restricted to identifiers."""
+        with self.assertRaises(ValueError):
+            TTLCache("items; DROP TABLE x", 60, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
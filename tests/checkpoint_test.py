@@ -0,0 +1,130 @@
+"""Testing suite for the checkpoint module and resumable streaming searches."""
+
+import os
+import tempfile
+import unittest
+from collections.abc import Callable
+from unittest.mock import patch
+
+from fake_server_case import FakeServerTestCase
+
+from checkpoint import Checkpoint
+from fake_server import ACCESS_TOKEN, FakeCorpus, FakeXrpcServer
+from file import extract_post_data_from_csv
+from mission_blue import stream_search
+from records import Post
+
+
+class Interrupted(Exception):
+    """Raised by the fake extraction step to simulate a killed crawl."""
+
+
+def fake_extract(fail_on_call: int | None = None) -> Callable[..., list[dict]]:
+    """Return an extract_post_data stand-in that fails on the given call."""
+    calls: list[list[Post]] = []
+
+    def extract(posts: list[Post], token: str, **_: object) -> list[dict]:
+        calls.append(posts)
+        if len(calls) == fail_on_call:
+            raise Interrupted()
+        return [
+            {
+                "author": post.author,
+                "content": post.content,
+                "created_at": post.created_at,
+                "post_link": post.uri,
+            }
+            for post in posts
+        ]
+
+    return extract
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Testing the Checkpoint class."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint = Checkpoint(os.path.join(self.directory.name, "blue.csv"))
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_save_load_clear(self) -> None:
+        """Test that a saved state round-trips and is removed by clear."""
+        self.assertIsNone(self.checkpoint.load())
+        params = {"q": "blue", "cursor": "50", "posts_limit": 100}
+
+        self.checkpoint.save(params, fetched=50, flushed=48)
+        state = self.checkpoint.load()
+
+        assert state is not None
+        self.assertEqual(state["params"], params)
+        self.assertEqual((state["fetched"], state["flushed"]), (50, 48))
+        self.checkpoint.clear()
+        self.assertFalse(os.path.exists(self.checkpoint.path))
+
+    def test_matches(self) -> None:
+        """Test that only the cursor and posts_limit may differ on resume."""
+        state = {"params": {"q": "blue", "cursor": "50", "posts_limit": 100}}
+
+        self.assertTrue(
+            Checkpoint.matches(state, {"q": "blue", "cursor": "", "posts_limit": 500})
+        )
+        self.assertFalse(
+            Checkpoint.matches(state, {"q": "red", "cursor": "", "posts_limit": 100})
+        )
+
+
+class TestStreamSearchResume(FakeServerTestCase):
+    """Testing that an interrupted streaming search resumes where it stopped."""
+
+    def setUp(self) -> None:
+        self.start_server(FakeXrpcServer(FakeCorpus(120)))
+        self.directory = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.directory.name, "blue.csv")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _params(self) -> dict:
+        return {"q": "blue", "limit": 25, "cursor": "", "posts_limit": 110}
+
+    def _run(self, fail_on_call: int | None = None, resume: bool = False) -> int:
+        with patch("mission_blue.file.extract_post_data", fake_extract(fail_on_call)):
+            return stream_search(
+                self._params(), ACCESS_TOKEN, self.output_path, resume=resume
+            )
+
+    def test_resume_after_interruption(self) -> None:
+        """Test that resuming fetches only the missing pages and saves no duplicates."""
+        with self.assertRaises(Interrupted):
+            self._run(fail_on_call=3)
+        state = Checkpoint(self.output_path).load()
+        assert state is not None
+        self.assertEqual((state["fetched"], state["flushed"]), (50, 50))
+        self.assertEqual(self.server.request_counts["app.bsky.feed.searchPosts"], 3)
+
+        written = self._run(resume=True)
+
+        self.assertEqual(written, 60)
+        # Pages 3 to 5, with the last page trimmed to the posts limit.
+        self.assertEqual(self.server.request_counts["app.bsky.feed.searchPosts"], 6)
+        self.assertEqual(
+            [row["post_link"] for row in extract_post_data_from_csv(self.output_path)],
+            [post["uri"] for post in self.server.corpus.posts[:110]],
+        )
+        self.assertIsNone(Checkpoint(self.output_path).load())
+
+    def test_resume_rejects_other_search(self) -> None:
+        """Test that a checkpoint is not applied to a search with other parameters."""
+        Checkpoint(self.output_path).save(
+            dict(self._params(), q="red", cursor="50"), fetched=50, flushed=50
+        )
+
+        with self.assertRaises(ValueError):
+            self._run(resume=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Testing suite for the client module."""
+
+import unittest
+from typing import cast
+from unittest import mock
+from unittest.mock import patch
+
+from requests.adapters import HTTPAdapter
+
+import client
+
+
+class TestClient(unittest.TestCase):
+    """Testing the shared HTTP client."""
+
+    def setUp(self) -> None:
+        client.close()
+
+    def tearDown(self) -> None:
+        client.close()
+
+    def test_session_is_shared(self) -> None:
+        """Test that every call reuses one pooled session."""
+        session = client.get_session()
+        self.assertIs(client.get_session(), session)
+        adapter = cast(HTTPAdapter, session.get_adapter("https://bsky.social"))
+        # pylint: disable=W0212
+        self.assertEqual(adapter._pool_maxsize, client.POOL_MAXSIZE)
+
+    @patch("requests.Session.get")
+    def test_xrpc_get_adds_auth_header(self, mock_get: mock.MagicMock) -> None:
+        """Test that XRPC calls carry the token and the default timeout."""
+        client.set_access_token("session_token")
+
+        client.xrpc_get("app.bsky.feed.searchPosts", params={"q": "blue"})
+        client.xrpc_get("app.bsky.feed.getPosts", token="explicit_token")
+
+        first, second = mock_get.call_args_list
+        self.assertEqual(
+            first.args, ("https://bsky.social/xrpc/app.bsky.feed.searchPosts",)
+        )
+        self.assertEqual(
+            first.kwargs["headers"], {"Authorization": "Bearer session_token"}
+        )
+        self.assertEqual(first.kwargs["params"], {"q": "blue"})
+        self.assertEqual(first.kwargs["timeout"], client.DEFAULT_TIMEOUT)
+        self.assertEqual(
+            second.kwargs["headers"], {"Authorization": "Bearer explicit_token"}
+        )
+
+    @patch("requests.Session.get")
+    def test_plain_get_has_no_auth_header(self, mock_get: mock.MagicMock) -> None:
+        """Test that the token is never sent to non-XRPC hosts."""
+        client.set_access_token("session_token")
+
+        client.get("https://bsky.app/profile/user/post/1")
+
+        self.assertNotIn("headers", mock_get.call_args.kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
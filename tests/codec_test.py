@@ -0,0 +1,86 @@
+"""Testing suite for the codec module."""
+
+import importlib.util
+import json
+import unittest
+from typing import Any
+from unittest.mock import patch
+
+import codec
+from fake_server import FakeCorpus
+from records import project_page, read_search_page
+
+
+class TestCodec(unittest.TestCase):
+    """Testing every installed backend against the standard library."""
+
+    def setUp(self) -> None:
+        self.page: dict[str, Any] = {"posts": FakeCorpus(5).posts, "cursor": "5"}
+        self.page["posts"][2]["record"]["text"] = "blå 🦋"
+        del self.page["posts"][3]["indexedAt"]
+        self.content = json.dumps(self.page).encode("utf-8")
+        self.backend_patch = patch("codec._backend", None)
+        self.backend_patch.start()
+
+    def tearDown(self) -> None:
+        self.backend_patch.stop()
+
+    def test_backends(self) -> None:
+        """Test that every backend round-trips and projects pages alike."""
+        for backend in codec.available_backends():
+            with self.subTest(backend), patch("builtins.print") as mock_print:
+                codec.set_backend(backend)
+
+                self.assertEqual(codec.loads(self.content), self.page)
+                self.assertEqual(json.loads(codec.dumps(self.page)), self.page)
+                self.assertNotIn("\n", codec.dumps(self.page))
+                data = read_search_page(self.content, {"q": "blue"})
+
+                self.assertEqual(data["cursor"], "5")
+                self.assertEqual(data["posts"], project_page(self.page["posts"]))
+                mock_print.assert_called_with("Missing data in post: 'indexedAt'")
+
+    def test_typed_decoding_needs_msgspec(self) -> None:
+        """Test that only msgspec decodes into the search page schema."""
+        codec.set_backend("json")
+
+        self.assertIsNone(codec.decode_search_page(self.content))
+
+    @unittest.skipUnless(importlib.util.find_spec("msgspec"), "needs msgspec")
+    def test_typed_decoding(self) -> None:
+        """Test that msgspec decodes pages into the schema, or None if they do not fit."""
+        codec.set_backend("msgspec")
+
+        page = codec.decode_search_page(self.content)
+
+        self.assertEqual(page.cursor, "5")
+        self.assertEqual(
+            [(post.uri, post.author.handle, post.record.text) for post in page.posts],
+            [
+                (post["uri"], post["author"]["handle"], post["record"]["text"])
+                for post in self.page["posts"]
+            ],
+        )
+        self.assertIsNone(page.posts[3].indexedAt)
+        self.assertIsNone(codec.decode_search_page(b'{"posts": "none"}'))
+
+    def test_invalid_json(self) -> None:
+        """Test that every backend raises ValueError on a body that is not JSON."""
+        for backend in codec.available_backends():
+            with self.subTest(backend):
+                codec.set_backend(backend)
+
+                with self.assertRaises(ValueError):
+                    codec.loads(b"<html>Bad Gateway</html>")
+                with self.assertRaises(ValueError):
+                    read_search_page(b"<html>Bad Gateway</html>", {"q": "blue"})
+
+    def test_set_backend(self) -> None:
+        """Test that unknown backends are rejected."""
+        with self.assertRaises(ValueError):
+            codec.set_backend("yaml")
+        self.assertEqual(codec.available_backends()[-1], "json")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Testing suite for the dedup module."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from dedup import DedupStore, iter_unique
+from file import remove_duplicates
+
+
+class TestDedupStore(unittest.TestCase):
+    """Testing the DedupStore class."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        # 300 distinct links, each repeated, with repeats far from the first copy.
+        self.links = [f"https://bsky.app/profile/u/post/{i % 300}" for i in range(900)]
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _check(self, store: DedupStore) -> None:
+        result = [link for link in self.links if store.add(link)]
+        self.assertEqual(result, self.links[:300])
+        self.assertEqual(len(store), 300)
+
+    def test_in_memory(self) -> None:
+        """Test that a store below its threshold never touches disk."""
+        with DedupStore(directory=self.directory.name) as store:
+            self._check(store)
+            self.assertFalse(store.spilled)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_spills_to_sqlite(self) -> None:
+        """Test that a spilled store gives the same answers and cleans up."""
+        with DedupStore(spill_threshold=50, directory=self.directory.name) as store:
+            self._check(store)
+            self.assertTrue(store.spilled)
+            self.assertEqual(len(os.listdir(self.directory.name)), 1)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_spilled_inserts_are_batched(self) -> None:
+        """Test that new keys are written in one batch without a Bloom filter."""
+        with DedupStore(spill_threshold=50, directory=self.directory.name) as store:
+            # pylint: disable=W0212
+            with patch.object(store, "_flush", wraps=store._flush) as mock_flush:
+                self._check(store)
+            mock_flush.assert_called_once()
+
+    def test_spills_with_bloom_filter(self) -> None:
+        """Test that the Bloom filter pre-check does not change the answers."""
+        for bloom_bits in (64, 10_000):
+            with self.subTest(bloom_bits=bloom_bits), DedupStore(
+                spill_threshold=50,
+                directory=self.directory.name,
+                bloom_bits=bloom_bits,
+            ) as store:
+                self._check(store)
+
+    def test_remove_duplicates_with_store(self) -> None:
+        """Test that remove_duplicates keeps first-seen order with a spilling store."""
+        data = [
+            {"post_link": link, "content": str(i)} for i, link in enumerate(self.links)
+        ]
+
+        with DedupStore(spill_threshold=10, directory=self.directory.name) as store:
+            result = remove_duplicates(data, store)
+
+        self.assertEqual(result, data[:300])
+        self.assertEqual(result, list(iter_unique(data, DedupStore())))
+
+
+if __name__ == "__main__":
+    unittest.main()
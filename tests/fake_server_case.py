@@ -0,0 +1,43 @@
+"""Test case that runs tests against a local fake XRPC server."""
+
+import unittest
+from collections.abc import Callable
+from unittest.mock import patch
+
+import client
+from fake_server import FakeXrpcServer
+
+
+def _serve(
+    server: FakeXrpcServer, add_cleanup: Callable[[Callable[[], None]], None]
+) -> FakeXrpcServer:
+    server.start()
+    base_url_patch = patch("client.API_BASE_URL", server.xrpc_url)
+    base_url_patch.start()
+    # Cleanups run last in, first out.
+    add_cleanup(client.close)
+    add_cleanup(server.close)
+    add_cleanup(base_url_patch.stop)
+    return server
+
+
+class FakeServerTestCase(unittest.TestCase):
+    """Sends the requests of the shared client to a FakeXrpcServer.
+
+    Start the server with start_server in setUp, or with start_class_server in
+    setUpClass. It is closed, and the client pointed back at the API, once the test
+    or the class is done.
+    """
+
+    server: FakeXrpcServer
+
+    def start_server(self, server: FakeXrpcServer) -> FakeXrpcServer:
+        """Start server for the current test."""
+        self.server = _serve(server, self.addCleanup)
+        return self.server
+
+    @classmethod
+    def start_class_server(cls, server: FakeXrpcServer) -> FakeXrpcServer:
+        """Start server for every test of the class."""
+        cls.server = _serve(server, cls.addClassCleanup)
+        return cls.server
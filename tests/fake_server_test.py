@@ -0,0 +1,63 @@
+"""Testing suite for the fake_server module."""
+
+import time
+import unittest
+
+import requests
+
+from fake_server import ACCESS_TOKEN, FakeCorpus, FakeXrpcServer
+
+
+class TestFakeXrpcServer(unittest.TestCase):
+    """Testing the load-testing options of FakeXrpcServer."""
+
+    def _search(self, server: FakeXrpcServer, **params: str) -> requests.Response:
+        return requests.get(
+            f"{server.xrpc_url}/app.bsky.feed.searchPosts",
+            params=dict({"q": "anything"}, **params),
+            headers={"Authorization": f"Bearer {ACCESS_TOKEN}"},
+            timeout=5,
+        )
+
+    def test_page_size(self) -> None:
+        """Test that pages are capped at page_size whatever limit is asked for."""
+        with FakeXrpcServer(FakeCorpus(50), page_size=10) as server:
+            response = self._search(server, limit="100")
+
+        self.assertEqual(len(response.json()["posts"]), 10)
+        self.assertEqual(response.json()["cursor"], "10")
+
+    def test_rate_limit(self) -> None:
+        """Test that RateLimit headers count down and 429 is sent once spent."""
+        with FakeXrpcServer(FakeCorpus(10), rate_limit=2, rate_window=60) as server:
+            responses = [self._search(server) for _ in range(3)]
+
+        self.assertEqual(
+            [response.status_code for response in responses], [200, 200, 429]
+        )
+        self.assertEqual(
+            [response.headers["RateLimit-Remaining"] for response in responses],
+            ["1", "0", "0"],
+        )
+        self.assertEqual(responses[0].headers["RateLimit-Policy"], "2;w=60")
+
+    def test_error_rate(self) -> None:
+        """Test that every XRPC request fails with an error rate of 1."""
+        with FakeXrpcServer(FakeCorpus(10), error_rate=1) as server:
+            statuses = {self._search(server).status_code for _ in range(20)}
+
+        self.assertTrue(statuses <= {429, 500, 502, 503})
+
+    def test_token_ttl(self) -> None:
+        """Test that the access token expires after token_ttl seconds."""
+        with FakeXrpcServer(FakeCorpus(10), token_ttl=0.2) as server:
+            self.assertEqual(self._search(server).status_code, 200)
+            time.sleep(0.3)
+            response = self._search(server)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "ExpiredToken")
+
+
+if __name__ == "__main__":
+    unittest.main()
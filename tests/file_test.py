@@ -1,15 +1,25 @@
 """Testing suite for the mission_blue module."""
 
+import os
 import tempfile
-import unittest
 import typing
+import unittest
+from unittest import mock
+from unittest.mock import Mock, patch
+
+import requests
 
+from cache import validation_cache
 from file import (
+    NO_CONTENT_TEMPLATE,
     extract_post_data,
     extract_post_data_from_csv,
     remove_duplicates,
     save_to_csv,
+    stream_to_csv,
+    validate_post_uris,
     validate_url,
+    validate_urls,
 )
 
 
@@ -67,6 +77,166 @@ class TestValidateUrl(unittest.TestCase):
                 self.assertEqual(result, case.get_expected_result())
 
 
+class TestValidateUrlFingerprint(unittest.TestCase):
+    """Testing the no content page check in validate_url without network access."""
+
+    @patch("file.client.get")
+    def test_no_content_page(self, mock_get: mock.MagicMock) -> None:
+        """Test that only the exact no content page is reported as missing."""
+        cases = {
+            "No Content Page": TestCase(
+                data=NO_CONTENT_TEMPLATE, expected_result=False
+            ),
+            "Post Page": TestCase(
+                data=NO_CONTENT_TEMPLATE.replace("<title>Bluesky</title>", ""),
+                expected_result=True,
+            ),
+            "Trailing Whitespace": TestCase(
+                data=NO_CONTENT_TEMPLATE + " ", expected_result=True
+            ),
+        }
+
+        for case_name, case in cases.items():
+            with self.subTest(case_name):
+                mock_get.return_value = Mock(text=case.get_data())
+                result = validate_url("https://bsky.app/profile/user/post/1")
+                self.assertEqual(result, case.get_expected_result())
+
+
+class TestValidateUrls(unittest.TestCase):
+    """Testing the concurrent validate_urls function."""
+
+    @patch("file.client.get")
+    def test_keeps_order_and_reports_errors(self, mock_get: mock.MagicMock) -> None:
+        """Test that results follow input order and a failed post does not stop the run."""
+
+        def fake_get(url: str) -> Mock:
+            if url.endswith("/error"):
+                raise requests.exceptions.ConnectionError("boom")
+            if url.endswith("/deleted"):
+                return Mock(text=NO_CONTENT_TEMPLATE)
+            return Mock(text="<html>post</html>")
+
+        mock_get.side_effect = fake_get
+        urls = [
+            f"https://bsky.app/profile/user/post/{name}"
+            for name in ["a", "deleted", "error", "b", "deleted", "c"] * 5
+        ]
+
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                result = validate_urls(urls, workers)
+                self.assertEqual(result, [True, False, True, True, False, True] * 5)
+
+
+class TestValidatePostUris(unittest.TestCase):
+    """Testing the validate_post_uris function."""
+
+    @staticmethod
+    def _response(posts: list[dict]) -> Mock:
+        response = Mock()
+        response.json.return_value = {"posts": posts}
+        return response
+
+    @patch("file.client.xrpc_get")
+    def test_batches_of_25(self, mock_get: mock.MagicMock) -> None:
+        """Test that URIs are checked 25 at a time and missing posts count as deleted."""
+        uris = [f"at://did:plc:abc/app.bsky.feed.post/{i}" for i in range(60)]
+        deleted = {uris[3], uris[40]}
+        mock_get.side_effect = lambda method, token, params: self._response(
+            [{"uri": uri} for uri in params["uris"] if uri not in deleted]
+        )
+
+        result = validate_post_uris(uris, "token")
+
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(
+            [len(call.kwargs["params"]["uris"]) for call in mock_get.call_args_list],
+            [25, 25, 10],
+        )
+        self.assertEqual(set(result), set(uris))
+        self.assertEqual({uri for uri, exists in result.items() if not exists}, deleted)
+
+    @patch("file.client.xrpc_get")
+    def test_failed_batch_is_left_out(self, mock_get: mock.MagicMock) -> None:
+        """Test that URIs from a failed request are not reported as deleted."""
+        uris = [f"at://did:plc:abc/app.bsky.feed.post/{i}" for i in range(30)]
+        mock_get.side_effect = [
+            requests.exceptions.ConnectionError("boom"),
+            self._response([{"uri": uri} for uri in uris[25:]]),
+        ]
+
+        result = validate_post_uris(uris, "token")
+
+        self.assertEqual(result, {uri: True for uri in uris[25:]})
+
+
+class TestExtractPostDataXrpc(unittest.TestCase):
+    """Testing extract_post_data with the xrpc validation strategy."""
+
+    def setUp(self) -> None:
+        self.posts = [
+            {
+                "record": {"text": f"content{i}"},
+                "author": {"handle": "user.bsky.social"},
+                "indexedAt": "2023-01-01",
+                "uri": f"at://did:plc:abc/app.bsky.feed.post/{i}",
+            }
+            for i in range(3)
+        ]
+
+    @patch("file._check_urls")
+    @patch("file.validate_post_uris")
+    def test_drops_deleted_posts(
+        self, mock_validate_uris: mock.MagicMock, mock_validate_urls: mock.MagicMock
+    ) -> None:
+        """Test that deleted posts are dropped and unchecked posts fall back to html."""
+        mock_validate_uris.return_value = {
+            self.posts[0]["uri"]: True,
+            self.posts[1]["uri"]: False,
+        }
+        mock_validate_urls.return_value = [True]
+
+        result = extract_post_data(self.posts, "token", "xrpc")
+
+        self.assertEqual([post.content for post in result], ["content0", "content2"])
+        mock_validate_urls.assert_called_once_with(
+            ["https://bsky.app/profile/user.bsky.social/post/2"], 1
+        )
+
+    @patch("file._check_urls")
+    @patch("file.validate_post_uris")
+    def test_uses_cache(
+        self, mock_validate_uris: mock.MagicMock, mock_validate_urls: mock.MagicMock
+    ) -> None:
+        """Test that cached posts are not checked again and new answers are stored."""
+        link = "https://bsky.app/profile/user.bsky.social/post/{}".format
+        mock_validate_uris.return_value = {self.posts[1]["uri"]: False}
+        mock_validate_urls.return_value = [None]
+
+        with tempfile.TemporaryDirectory() as directory, validation_cache(
+            3600, os.path.join(directory, "cache.db")
+        ) as cache:
+            cache.set(link(0), True)
+            result = extract_post_data(self.posts, "token", "xrpc", cache=cache)
+
+            mock_validate_uris.assert_called_once_with(
+                [self.posts[1]["uri"], self.posts[2]["uri"]], "token", 1
+            )
+            self.assertEqual(
+                [post.content for post in result], ["content0", "content2"]
+            )
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+            self.assertFalse(cache.get(link(1)))
+            # Posts whose check failed are kept but not cached.
+            self.assertIsNone(cache.get(link(2)))
+
+    def test_requires_token(self) -> None:
+        """Test that the xrpc strategy can not be used without a token."""
+        with self.assertRaises(ValueError):
+            extract_post_data(self.posts, strategy="xrpc")
+
+
 class TestExtractPostData(unittest.TestCase):
     """_summary_.
 
@@ -126,7 +296,9 @@ class TestExtractPostData(unittest.TestCase):
         for case_name, case in cases.items():
             with self.subTest(case_name):
                 result = extract_post_data(case.get_data())
-                self.assertEqual(result, case.get_expected_result())
+                self.assertEqual(
+                    [post.to_dict() for post in result], case.get_expected_result()
+                )
 
 
 class TestExtractPostDataFromCsv(unittest.TestCase):
@@ -372,5 +544,67 @@ class TestSaveToCsv(unittest.TestCase):
                         self.assertEqual(file_lines, expected_lines)
 
 
+class TestStreamToCsv(unittest.TestCase):
+    """Testing the stream_to_csv function."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "posts.csv")
+        self.posts = [
+            {
+                "author": f"user{i}",
+                "content": f"post, {i}",
+                "created_at": f"2023-01-0{i}",
+                "post_link": f"link{i}",
+            }
+            for i in range(1, 6)
+        ]
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _read(self) -> str:
+        with open(self.path, encoding="utf-8") as output:
+            return output.read()
+
+    def test_matches_save_to_csv(self) -> None:
+        """Test that a new file has the same content save_to_csv would write."""
+        expected_path = os.path.join(self.directory.name, "expected.csv")
+        save_to_csv(list(self.posts), expected_path)
+
+        written = stream_to_csv([self.posts[:2], self.posts[2:]], self.path)
+
+        self.assertEqual(written, 5)
+        with open(expected_path, encoding="utf-8") as expected:
+            self.assertEqual(self._read(), expected.read())
+
+    def test_flushes_each_batch(self) -> None:
+        """Test that a batch is on disk before the next one is produced."""
+        lines_before_batch = []
+
+        def batches() -> typing.Iterator[list[dict]]:
+            for post in self.posts:
+                lines_before_batch.append(self._read().count("\n"))
+                yield [post]
+
+        stream_to_csv(batches(), self.path)
+
+        self.assertEqual(lines_before_batch, [1, 2, 3, 4, 5])
+
+    def test_appends_only_new_posts(self) -> None:
+        """Test that posts already in the file or the stream are skipped."""
+        stream_to_csv([self.posts[:3]], self.path)
+
+        written = stream_to_csv([self.posts[2:], self.posts[4:]], self.path)
+
+        self.assertEqual(written, 2)
+        lines = self._read().strip().split("\n")
+        self.assertEqual(lines[0], "author,content,created_at,post_link")
+        self.assertEqual(
+            [line.rsplit(",", 1)[-1] for line in lines[1:]],
+            ["link1", "link2", "link3", "link4", "link5"],
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,47 @@
+"""Testing that the CLI only imports heavy dependencies on the paths that use them."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+from fake_server import FakeCorpus, FakeXrpcServer
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks")
+)
+
+# pylint: disable=C0413
+from import_time import (
+    HELP_FORBIDDEN,
+    ROOT,
+    SCRAPE_FORBIDDEN,
+    SCRAPE_SCRIPT,
+    forbidden_imports,
+    import_time,
+)
+
+
+class TestLazyImports(unittest.TestCase):
+    """Testing the modules imported by the CLI, see benchmarks/import_time.py."""
+
+    def test_help(self) -> None:
+        """Test that --help imports none of the heavy dependencies."""
+        _, modules = import_time([os.path.join(ROOT, "mission_blue.py"), "--help"])
+
+        self.assertEqual(forbidden_imports(modules, HELP_FORBIDDEN), [])
+
+    def test_no_result_scrape(self) -> None:
+        """Test that a scrape without results does not import pandas or the progress bar."""
+        with FakeXrpcServer(
+            FakeCorpus(0)
+        ) as server, tempfile.TemporaryDirectory() as cwd:
+            _, modules = import_time(["-c", SCRAPE_SCRIPT, server.xrpc_url], cwd)
+            self.assertFalse(os.path.exists(os.path.join(cwd, "Scraped Posts")))
+
+        self.assertIn("requests.sessions", modules)
+        self.assertEqual(forbidden_imports(modules, SCRAPE_FORBIDDEN), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
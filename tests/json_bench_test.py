@@ -0,0 +1,62 @@
+"""Testing the JSON decoding benchmark, see benchmarks/json_bench.py."""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+import archive
+import codec
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks")
+)
+
+# pylint: disable=C0413
+from json_bench import generate_pages, recorded_pages, run
+
+
+class TestJsonBench(unittest.TestCase):
+    """Testing the benchmark reads recorded pages and reports every backend."""
+
+    def test_recorded_pages(self) -> None:
+        """Test that archived pages are read back as response bodies."""
+        pages = generate_pages(3, page_size=10)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pages.jsonl.gz")
+            archive.start(path)
+            for page in pages:
+                archive.record_page({"q": "blue"}, codec.loads(page))
+            archive.stop()
+
+            recorded = recorded_pages([path])
+
+        self.assertEqual(
+            [codec.loads(page) for page in recorded],
+            [codec.loads(page) for page in pages],
+        )
+
+    def test_report(self) -> None:
+        """Test that both steps are measured with every installed backend."""
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            report = run(generate_pages(2, page_size=10))
+
+        self.assertEqual(
+            [(result["benchmark"], result["backend"]) for result in report["results"]],
+            [
+                (name, backend)
+                for backend in codec.available_backends()
+                for name in ("loads", "read_search_page")
+            ],
+        )
+        for result in report["results"]:
+            self.assertEqual(result["pages"], 2)
+            self.assertGreater(result["seconds"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
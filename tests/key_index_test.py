@@ -0,0 +1,133 @@
+"""Testing suite for the key_index module."""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from file import append_to_csv, extract_post_data_from_csv, save_to_csv
+from key_index import INDEX_SUFFIX, KeyIndex, compact
+
+
+def make_posts(start: int, stop: int) -> list[dict]:
+    """Return post data rows with post links link<start> to link<stop - 1>."""
+    return [
+        {
+            "author": f"user{i}",
+            "content": f"post {i}",
+            "created_at": "2023-01-01",
+            "post_link": f"link{i}",
+        }
+        for i in range(start, stop)
+    ]
+
+
+class TestKeyIndex(unittest.TestCase):
+    """Testing the KeyIndex class and append_to_csv."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "posts.csv")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_append_uses_index(self) -> None:
+        """Test that appending to an indexed file does not re-read the CSV."""
+        self.assertEqual(append_to_csv(make_posts(0, 5), self.path), 5)
+        self.assertTrue(os.path.isfile(self.path + INDEX_SUFFIX))
+
+        with patch.object(KeyIndex, "rebuild") as mock_rebuild:
+            written = append_to_csv(make_posts(3, 8), self.path)
+            mock_rebuild.assert_not_called()
+
+        self.assertEqual(written, 3)
+        self.assertEqual(
+            [row["post_link"] for row in extract_post_data_from_csv(self.path)],
+            [f"link{i}" for i in range(8)],
+        )
+        self.assertEqual(len(KeyIndex(self.path)), 8)
+
+    def test_stale_index_is_rebuilt(self) -> None:
+        """Test that an index is rebuilt after its CSV is rewritten."""
+        append_to_csv(make_posts(0, 3), self.path)
+        save_to_csv(make_posts(3, 6), self.path)
+
+        with patch.object(
+            KeyIndex, "rebuild", autospec=True, side_effect=KeyIndex.rebuild
+        ) as mock_rebuild:
+            index = KeyIndex(self.path)
+            mock_rebuild.assert_called_once()
+
+        self.assertEqual(len(index), 6)
+        self.assertIn("link4", index)
+        self.assertNotIn("link6", index)
+
+    # pylint: disable=W0212
+    @patch("key_index.MERGE_SIZE", 10)
+    def test_appended_keys_are_merged(self) -> None:
+        """Test that appended keys are merged into the sorted keys on disk."""
+        for start in range(0, 25, 5):
+            append_to_csv(make_posts(start, start + 5), self.path)
+
+        with patch.object(KeyIndex, "rebuild") as mock_rebuild:
+            index = KeyIndex(self.path)
+            mock_rebuild.assert_not_called()
+
+        # 25 keys: 20 merged after the 4th batch, the last 5 still appended.
+        self.assertEqual((len(index), len(index._recent)), (25, 5))
+        self.assertEqual(
+            [f"link{i}" in index for i in range(26)], [True] * 25 + [False]
+        )
+        self.assertFalse(index.add("link7"))
+        self.assertTrue(index.add("link25"))
+        index.close()
+
+    @patch("key_index._RUN_SIZE", 4)
+    def test_rebuild_merges_sorted_runs(self) -> None:
+        """Test that a rebuild sorted in several runs keeps every key once."""
+        save_to_csv(make_posts(0, 10) + make_posts(5, 15), self.path)
+
+        index = KeyIndex(self.path)
+
+        self.assertEqual((len(index), len(index._recent)), (15, 0))
+        self.assertEqual(list(index._sorted), sorted(index._sorted))
+        self.assertIn("link14", index)
+        index.close()
+
+    @patch("key_index.KeyIndex._load", return_value=False)
+    def test_missing_index_is_rebuilt(self, mock_load: mock.MagicMock) -> None:
+        """Test that a CSV without an index gets one."""
+        save_to_csv(make_posts(0, 4), self.path)
+
+        index = KeyIndex(self.path)
+
+        self.assertEqual(len(index), 4)
+        self.assertTrue(os.path.isfile(self.path + INDEX_SUFFIX))
+
+    def test_compact(self) -> None:
+        """Test that compact drops repeated posts, keeps order and fixes the index."""
+        save_to_csv(make_posts(0, 3), self.path)
+        with open(self.path, "a", encoding="utf-8") as csv_file:
+            csv_file.write(
+                "user1,post 1,2023-01-01,link1\nuser9,post 9,2023-01-01,link9\n"
+            )
+
+        result = CliRunner().invoke(compact, [self.path])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("kept 4 posts, removed 1 duplicates", result.output)
+        self.assertEqual(
+            [row["post_link"] for row in extract_post_data_from_csv(self.path)],
+            ["link0", "link1", "link2", "link9"],
+        )
+        with patch.object(KeyIndex, "rebuild") as mock_rebuild:
+            self.assertEqual(len(KeyIndex(self.path)), 4)
+            mock_rebuild.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Testing suite for the metrics module."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from metrics import RunMetrics
+
+
+class TestRunMetrics(unittest.TestCase):
+    """Testing the RunMetrics class."""
+
+    def setUp(self) -> None:
+        self.metrics = RunMetrics()
+
+    def test_requests_are_attributed_by_method(self) -> None:
+        """Test that requests land in their method's stage and latency bucket."""
+        self.metrics.record_request(
+            "app.bsky.feed.searchPosts", 0.03, bytes_received=1000, retry=True
+        )
+        self.metrics.record_request("app.bsky.feed.getPosts", 20.0, error=True)
+        self.metrics.record_request("page", 0.001, bytes_received=50)
+
+        stages = self.metrics.report()["stages"]
+        self.assertEqual(stages["search"]["requests"], 1)
+        self.assertEqual(stages["search"]["retries"], 1)
+        self.assertEqual(stages["search"]["bytes_received"], 1000)
+        self.assertEqual(stages["search"]["latency_seconds"]["buckets"]["0.05"], 1)
+        self.assertEqual(stages["validation"]["requests"], 2)
+        self.assertEqual(stages["validation"]["errors"], 1)
+        self.assertEqual(stages["validation"]["latency_seconds"]["buckets"]["+Inf"], 1)
+        self.assertEqual(stages["validation"]["latency_seconds"]["buckets"]["0.005"], 1)
+
+    def test_stage_time_and_rows(self) -> None:
+        """Test that time in a stage accumulates and rows are added up."""
+        for _ in range(2):
+            with self.metrics.stage("extraction"):
+                pass
+            self.metrics.count_rows("extraction", 10, 8)
+
+        extraction = self.metrics.report()["stages"]["extraction"]
+        self.assertGreater(extraction["seconds"], 0)
+        self.assertEqual((extraction["rows_in"], extraction["rows_out"]), (20, 16))
+
+    def test_outputs(self) -> None:
+        """Test the JSON report and the cumulative Prometheus histogram."""
+        self.metrics.record_request("app.bsky.feed.searchPosts", 0.03)
+        self.metrics.record_request("app.bsky.feed.searchPosts", 0.3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = os.path.join(directory, "report.json")
+            prometheus_path = os.path.join(directory, "metrics", "run.prom")
+            self.metrics.write_report(report_path)
+            self.metrics.write_prometheus(prometheus_path)
+            with open(report_path, encoding="utf-8") as report_file:
+                report = json.load(report_file)
+            with open(prometheus_path, encoding="utf-8") as prometheus_file:
+                lines = prometheus_file.read().splitlines()
+
+        self.assertEqual(report["stages"]["search"]["requests"], 2)
+        name = "mission_blue_request_duration_seconds"
+        self.assertIn(f'{name}_bucket{{stage="search",le="0.05"}} 1', lines)
+        self.assertIn(f'{name}_bucket{{stage="search",le="+Inf"}} 2', lines)
+        self.assertIn(f'{name}_count{{stage="search"}} 2', lines)
+        self.assertIn('mission_blue_stage_requests_total{stage="auth"} 0', lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,318 @@
+"""Testing suite for the mission_blue module."""
+
+import json
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import patch
+
+import requests
+from fake_server_case import FakeServerTestCase
+
+import client
+import mission_blue
+from cache import did_cache
+from fake_server import ACCESS_TOKEN, FakeCorpus, FakeXrpcServer
+from file import extract_post_data_from_csv
+from mission_blue import (
+    iter_search_pages,
+    resolve_handle_to_did,
+    resolve_handles,
+    search_posts,
+    search_posts_sharded,
+    split_time_range,
+)
+from records import project_page
+from scheduler import RequestScheduler
+
+
+def corrupt_page(call: int) -> Callable[..., requests.Response]:
+    """Return a client.xrpc_get stand-in whose response on the given call is not JSON."""
+    calls = []
+    xrpc_get = client.xrpc_get
+
+    def get(*args: Any, **kwargs: Any) -> requests.Response:
+        response = xrpc_get(*args, **kwargs)
+        calls.append(response)
+        if len(calls) == call:
+            response._content = b"<html>Bad Gateway</html>"  # pylint: disable=W0212
+        return response
+
+    return get
+
+
+class TestSplitTimeRange(unittest.TestCase):
+    """Testing the split_time_range function."""
+
+    def test_split_time_range(self) -> None:
+        """Test that windows cover the range without gaps, newest first."""
+        windows = split_time_range("2024-01-01", "2024-01-05T00:00:00Z", 4)
+
+        self.assertEqual(
+            [(since.day, until.day) for since, until in windows],
+            [(4, 5), (3, 4), (2, 3), (1, 2)],
+        )
+        self.assertEqual(windows[-1][0], datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+    def test_bluesky_timestamps(self) -> None:
+        """Test that timestamps in the format of indexedAt are accepted."""
+        windows = split_time_range(
+            "2024-12-31T00:00:00.000Z", "2025-01-01T00:00:00.000Z", 2
+        )
+
+        self.assertEqual(
+            windows[0],
+            (
+                datetime(2024, 12, 31, 12, tzinfo=timezone.utc),
+                datetime(2025, 1, 1, tzinfo=timezone.utc),
+            ),
+        )
+
+    def test_invalid_range(self) -> None:
+        """Test that an empty range is rejected."""
+        with self.assertRaises(ValueError):
+            split_time_range("2024-01-05", "2024-01-01", 2)
+
+
+class TestSearchPostsSharded(FakeServerTestCase):
+    """Testing search_posts_sharded against a local fake XRPC server."""
+
+    def setUp(self) -> None:
+        # 600 posts, one per minute, but each cursor chain stops after 100 results.
+        self.start_server(FakeXrpcServer(FakeCorpus(600), search_depth=100))
+        self.params = {
+            "q": "blue",
+            "since": "2024-12-31T14:00:00Z",
+            "until": "2025-01-01T00:00:01Z",
+            "limit": 25,
+            "cursor": "",
+            "posts_limit": 1000,
+        }
+
+    def test_bisection_gets_past_search_depth(self) -> None:
+        """Test that bisected windows reach every post, deduplicated and in order."""
+        single_chain = search_posts(dict(self.params), ACCESS_TOKEN)
+        sharded = search_posts_sharded(
+            dict(self.params), ACCESS_TOKEN, shards=2, workers=4, max_pages=3
+        )
+
+        self.assertEqual(len(single_chain), 100)
+        self.assertEqual(sharded, project_page(self.server.corpus.posts))
+
+    def test_posts_limit(self) -> None:
+        """Test that the merged result is truncated to posts_limit newest posts."""
+        self.params["posts_limit"] = 30
+        sharded = search_posts_sharded(
+            self.params, ACCESS_TOKEN, shards=3, workers=3, max_pages=3
+        )
+
+        self.assertEqual(sharded, project_page(self.server.corpus.posts[:30]))
+
+    def test_posts_limit_stops_the_crawl(self) -> None:
+        """Test that a limit far below the corpus size takes only a few requests."""
+        self.start_server(FakeXrpcServer(FakeCorpus(2000)))
+        params = dict(self.params, since="2024-12-30T00:00:00Z", posts_limit=50)
+
+        sharded = search_posts_sharded(
+            params, ACCESS_TOKEN, shards=4, workers=4, max_pages=1
+        )
+
+        self.assertEqual(sharded, project_page(self.server.corpus.posts[:50]))
+        self.assertLess(self.server.request_counts["app.bsky.feed.searchPosts"], 20)
+
+    def test_capped_windows_are_not_fetched_again(self) -> None:
+        """Test that a capped window resumes below its oldest post."""
+        sharded = search_posts_sharded(
+            dict(self.params), ACCESS_TOKEN, shards=1, workers=4, max_pages=1
+        )
+
+        self.assertEqual(sharded, project_page(self.server.corpus.posts))
+        # 24 pages hold the corpus, bisecting adds a short page per split. Fetching
+        # both halves of every capped window from scratch took 63 requests.
+        self.assertLess(self.server.request_counts["app.bsky.feed.searchPosts"], 35)
+
+    def test_requires_time_range(self) -> None:
+        """Test that since and until are required."""
+        del self.params["since"]
+        with self.assertRaises(ValueError):
+            search_posts_sharded(self.params, ACCESS_TOKEN)
+
+
+class TestIterSearchPages(FakeServerTestCase):
+    """Testing iter_search_pages against a local fake XRPC server."""
+
+    def setUp(self) -> None:
+        self.start_server(FakeXrpcServer(FakeCorpus(120)))
+
+    def test_pages_are_lazy_and_trimmed(self) -> None:
+        """Test that pages are fetched on demand and trimmed to posts_limit."""
+        params = {"q": "blue", "limit": 25, "cursor": "", "posts_limit": 60}
+        pages = iter_search_pages(params, ACCESS_TOKEN)
+
+        self.assertEqual(self.server.request_counts, {})
+        first = next(pages)
+        self.assertEqual(self.server.request_counts, {"app.bsky.feed.searchPosts": 1})
+        rest = list(pages)
+
+        self.assertEqual([len(page) for page in [first] + rest], [25, 25, 10])
+        self.assertEqual(
+            first + rest[0] + rest[1],
+            search_posts(dict(params, cursor=""), ACCESS_TOKEN),
+        )
+
+    def test_invalid_json_keeps_fetched_pages(self) -> None:
+        """Test that a page whose body is not JSON ends paging like a failed request."""
+        params = {"q": "blue", "limit": 25, "cursor": "", "posts_limit": 100}
+
+        with patch("client.xrpc_get", side_effect=corrupt_page(2)), patch(
+            "builtins.print"
+        ) as mock_print:
+            posts = search_posts(params, ACCESS_TOKEN)
+
+        self.assertEqual(posts, project_page(self.server.corpus.posts[:25]))
+        mock_print.assert_any_call("Response:", "<html>Bad Gateway</html>")
+
+
+class TestResolveHandles(FakeServerTestCase):
+    """Testing cached handle resolution against a local fake XRPC server."""
+
+    def setUp(self) -> None:
+        self.start_server(FakeXrpcServer(FakeCorpus(10)))
+        self.lru_patch = patch.object(mission_blue, "_did_lru", OrderedDict[str, str]())
+        self.lru_patch.start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, "cache.sqlite3")
+
+    def tearDown(self) -> None:
+        self.lru_patch.stop()
+        self.directory.cleanup()
+
+    def _requests(self) -> int:
+        return self.server.request_counts.get("com.atproto.identity.resolveHandle", 0)
+
+    def test_in_process_cache(self) -> None:
+        """Test that a handle is resolved over the network once per process."""
+        first = resolve_handle_to_did("alice.test", ACCESS_TOKEN)
+        second = resolve_handle_to_did("Alice.test", ACCESS_TOKEN)
+
+        self.assertEqual((first, second), ("did:plc:alice", "did:plc:alice"))
+        self.assertEqual(self._requests(), 1)
+        self.assertEqual(
+            resolve_handle_to_did("did:plc:bob", ACCESS_TOKEN), "did:plc:bob"
+        )
+        self.assertEqual(self._requests(), 1)
+
+    def test_persistent_cache(self) -> None:
+        """Test that a new process reuses handles resolved by an earlier one."""
+        with did_cache(path=self.cache_path) as handle_cache:
+            resolve_handle_to_did("alice.test", ACCESS_TOKEN, handle_cache)
+        mission_blue._did_lru.clear()
+
+        with did_cache(path=self.cache_path) as handle_cache:
+            did = resolve_handle_to_did("alice.test", ACCESS_TOKEN, handle_cache)
+            self.assertEqual(handle_cache.hits, 1)
+
+        self.assertEqual(did, "did:plc:alice")
+        self.assertEqual(self._requests(), 1)
+
+    def test_failures_are_not_cached(self) -> None:
+        """Test that a handle that failed to resolve is retried next time."""
+        with patch("client.API_BASE_URL", f"{self.server.base_url}/missing"):
+            self.assertEqual(
+                resolve_handle_to_did("alice.test", ACCESS_TOKEN), "alice.test"
+            )
+
+        self.assertEqual(
+            resolve_handle_to_did("alice.test", ACCESS_TOKEN), "did:plc:alice"
+        )
+
+    def test_resolve_handles(self) -> None:
+        """Test that repeated handles in a bulk request are resolved once."""
+        handles = [f"user{i % 5}.test" for i in range(20)]
+
+        dids = resolve_handles(handles, ACCESS_TOKEN, workers=4)
+
+        self.assertEqual(dids, {f"user{i}.test": f"did:plc:user{i}" for i in range(5)})
+        self.assertEqual(self._requests(), 5)
+
+
+class TestMainBaseUrl(unittest.TestCase):
+    """Testing a full run of the CLI against a local fake server."""
+
+    def setUp(self) -> None:
+        self.server = FakeXrpcServer(
+            FakeCorpus(100, deleted_every=10), error_rate=0.5
+        ).start()
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        self.patches: list[Any] = [
+            patch("client.API_BASE_URL", client.API_BASE_URL),
+            patch("client.WEB_BASE_URL", client.WEB_BASE_URL),
+            patch("auth.load_credentials", return_value=("user.test", "password")),
+            patch.object(mission_blue, "_did_lru", OrderedDict[str, str]()),
+            # Retry quickly after the injected errors.
+            patch("client._scheduler", RequestScheduler(backoff_base=0.001)),
+        ]
+        for started in self.patches:
+            started.start()
+
+    def tearDown(self) -> None:
+        for started in reversed(self.patches):
+            started.stop()
+        self.server.close()
+        client.close()
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_html_validation_against_fake_server(self) -> None:
+        """Test that searches and post pages both go to the base URL."""
+        mission_blue.main(
+            [
+                "-q",
+                "anything",
+                "--posts_limit",
+                "30",
+                "--limit",
+                "10",
+                "--validation",
+                "html",
+                "--base-url",
+                self.server.base_url,
+                "--report",
+                "report.json",
+            ],
+            standalone_mode=False,
+        )
+
+        rows = extract_post_data_from_csv(os.path.join("Scraped Posts", "anything.csv"))
+        # Posts 0, 10 and 20 are deleted.
+        self.assertEqual(len(rows), 27)
+        self.assertTrue(
+            all(row["post_link"].startswith(self.server.base_url) for row in rows)
+        )
+        self.assertEqual(self.server.request_counts["postPage"], 30)
+        self.assertGreater(client.get_scheduler().retries, 0)
+
+        with open("report.json", encoding="utf-8") as report_file:
+            stages = json.load(report_file)["stages"]
+        self.assertEqual(stages["validation"]["requests"], 30)
+        self.assertEqual(
+            (stages["validation"]["rows_in"], stages["validation"]["rows_out"]),
+            (30, 27),
+        )
+        self.assertEqual(stages["save"]["rows_out"], 27)
+        # Every attempt is counted, including the ones that were retried.
+        self.assertEqual(
+            stages["search"]["requests"],
+            self.server.request_counts["app.bsky.feed.searchPosts"],
+        )
+        self.assertEqual(stages["search"]["rows_out"], 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Testing the offline pipeline benchmark, see benchmarks/pipeline_bench.py."""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import file
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks")
+)
+
+# pylint: disable=C0413
+from pipeline_bench import bench_csv, generate_rows, run
+
+
+class TestPipelineBench(unittest.TestCase):
+    """Testing the benchmark runs offline and reports every step."""
+
+    def test_generate_rows_has_duplicates(self) -> None:
+        """Test that one generated row in ten repeats an earlier one."""
+        rows = generate_rows(1000)
+
+        self.assertEqual(len(rows), 1000)
+        self.assertEqual(len(file.remove_duplicates(rows)), 901)
+
+    def test_save_runs_on_a_new_file(self) -> None:
+        """Test that the timed and the traced save both write a new file."""
+        save_to_csv = file.save_to_csv
+        existed = []
+
+        def save(rows: list[dict], path: str) -> None:
+            existed.append(os.path.exists(path))
+            save_to_csv(rows, path)
+
+        with tempfile.TemporaryDirectory() as directory, patch(
+            "file.save_to_csv", side_effect=save
+        ), contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            bench_csv(100, directory)
+
+        self.assertEqual(existed, [False, False])
+
+    def test_report(self) -> None:
+        """Test that every step is measured for every size."""
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            report = run([200, 300])
+
+        self.assertEqual(
+            [(result["benchmark"], result["size"]) for result in report["results"]],
+            [
+                (name, size)
+                for size in (200, 300)
+                for name in (
+                    "extract_post_data",
+                    "remove_duplicates",
+                    "save_to_csv",
+                    "extract_post_data_from_csv",
+                    "search_posts",
+                )
+            ],
+        )
+        for result in report["results"]:
+            self.assertGreater(result["seconds"], 0)
+            self.assertGreaterEqual(result["peak_mib"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""Testing suite for the profiling module."""
+
+import os
+import pstats
+import tempfile
+import time
+import unittest
+
+import profiling
+
+
+def busy_work() -> list[str]:
+    """Allocate and spin for long enough to be sampled a few times."""
+    rows = []
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        rows.append("x" * 100)
+    return rows
+
+
+class TestProfiler(unittest.TestCase):
+    """Testing the Profiler class."""
+
+    def test_profile_files(self) -> None:
+        """Test that the pstats, allocation and collapsed-stack files are written."""
+        with tempfile.TemporaryDirectory() as directory:
+            profile_path = os.path.join(directory, "profile")
+            profiling.start(profile_path)
+            rows = busy_work()
+            profiling.snapshot("busy_work")
+            del rows
+            profiling.stop()
+
+            stats = pstats.Stats(os.path.join(profile_path, "cpu.pstats"))
+            with open(
+                os.path.join(profile_path, "allocations.txt"), encoding="utf-8"
+            ) as report:
+                allocations = report.read()
+            with open(
+                os.path.join(profile_path, "stacks.collapsed"), encoding="utf-8"
+            ) as collapsed:
+                stacks = collapsed.read().splitlines()
+
+        self.assertIn(
+            "busy_work", {function for _, _, function in stats.stats}  # type: ignore
+        )
+        self.assertIn("== busy_work:", allocations)
+        self.assertIn("== end:", allocations)
+        self.assertIn("-- growth since the previous snapshot --", allocations)
+        self.assertTrue(any("profiling_test.py:busy_work" in stack for stack in stacks))
+        for stack in stacks:
+            frames, count = stack.rsplit(" ", 1)
+            self.assertTrue(frames)
+            self.assertGreater(int(count), 0)
+
+    def test_snapshot_without_profiler(self) -> None:
+        """Test that stage snapshots do nothing when not profiling."""
+        profiling.snapshot("search_posts")
+        profiling.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Testing suite for the records module."""
+
+import unittest
+from unittest.mock import patch
+
+from fake_server import FakeCorpus
+from records import Post, as_row, project_page
+
+
+class TestProjectPage(unittest.TestCase):
+    """Testing the project_page function."""
+
+    def test_projects_raw_posts(self) -> None:
+        """Test that raw posts become records and incomplete posts are skipped."""
+        raw = FakeCorpus(3).posts
+        del raw[1]["indexedAt"]
+
+        with patch("builtins.print") as mock_print:
+            posts = project_page([*raw, Post("at://a/b/c", "a", "text", "now")])
+
+        self.assertEqual(
+            [post.uri for post in posts], [raw[0]["uri"], raw[2]["uri"], "at://a/b/c"]
+        )
+        self.assertEqual(posts[0].author, raw[0]["author"]["handle"])
+        self.assertEqual(posts[0].content, raw[0]["record"]["text"])
+        mock_print.assert_called_once_with("Missing data in post: 'indexedAt'")
+
+    def test_handles_are_interned(self) -> None:
+        """Test that records of the same author share one handle string."""
+        # Every handle is built at run time, as decoding a page does.
+        domain = "bsky.social"
+        raw = [
+            {
+                "uri": f"at://did/app.bsky.feed.post/{index}",
+                "author": {"handle": "blue." + domain},
+                "record": {"text": ""},
+                "indexedAt": "",
+            }
+            for index in range(2)
+        ]
+
+        first, second = project_page(raw)
+
+        self.assertIs(first.author, second.author)
+
+
+class TestAsRow(unittest.TestCase):
+    """Testing the as_row function."""
+
+    def test_as_row(self) -> None:
+        """Test that records become saved rows and rows pass through."""
+        post = Post("at://did/app.bsky.feed.post/3abc", "blue.bsky.social", "hi", "t")
+        row = {"post_link": "https://bsky.app/profile/x/post/1"}
+
+        self.assertEqual(
+            as_row(post),
+            {
+                "author": "blue.bsky.social",
+                "content": "hi",
+                "created_at": "t",
+                "post_link": "https://bsky.app/profile/blue.bsky.social/post/3abc",
+            },
+        )
+        self.assertIs(as_row(row), row)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Testing suite for rebuilding outputs from raw-page archives."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fake_server_case import FakeServerTestCase
+
+import archive
+import writers
+from fake_server import ACCESS_TOKEN, FakeCorpus, FakeXrpcServer
+from file import extract_post_data_from_csv
+from mission_blue import search_posts
+from records import project_page
+from reextract import iter_chunks, reextract
+
+
+class TestReextract(FakeServerTestCase):
+    """Testing the reextract function."""
+
+    def setUp(self) -> None:
+        self.start_server(FakeXrpcServer(FakeCorpus(120)))
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _crawl(self, name: str, posts_limit: int) -> str:
+        path = os.path.join(self.directory.name, name)
+        params = {"q": "blue", "limit": 25, "cursor": "", "posts_limit": posts_limit}
+        archive.start(path)
+        try:
+            search_posts(params, ACCESS_TOKEN)
+        finally:
+            archive.stop()
+        return path
+
+    def test_rebuilds_output_offline(self) -> None:
+        """Test that overlapping archives rebuild the crawl without requests."""
+        paths = [self._crawl("first.jsonl.gz", 60), self._crawl("all.jsonl.gz", 120)]
+        requests_sent = sum(self.server.request_counts.values())
+        output_path = os.path.join(self.directory.name, "blue.csv")
+
+        written = reextract(paths, output_path, "csv", workers=2)
+
+        self.assertEqual(sum(self.server.request_counts.values()), requests_sent)
+        self.assertEqual(written, 120)
+        self.assertEqual(
+            [row["post_link"] for row in extract_post_data_from_csv(output_path)],
+            [post.post_link for post in project_page(self.server.corpus.posts)],
+        )
+
+    def test_writes_each_chunk_as_it_is_decoded(self) -> None:
+        """Test that archives are written in batches of at most a chunk of pages."""
+        path = self._crawl("all.jsonl.gz", 120)
+        output_path = os.path.join(self.directory.name, "blue.csv")
+
+        with patch(
+            "reextract.iter_chunks", side_effect=lambda path: iter_chunks(path, 2)
+        ), patch.object(
+            writers.CsvWriter,
+            "write_batch",
+            autospec=True,
+            side_effect=writers.CsvWriter.write_batch,
+        ) as write_batch:
+            written = reextract([path], output_path, "csv", workers=2)
+
+        self.assertEqual(written, 120)
+        # 5 pages of up to 25 posts, in chunks of 2 pages.
+        self.assertEqual(
+            [len(call.args[1]) for call in write_batch.call_args_list], [50, 50, 20]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
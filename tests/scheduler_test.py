@@ -0,0 +1,159 @@
+"""Testing suite for the scheduler module."""
+
+import unittest
+from unittest.mock import Mock
+
+import requests
+
+from scheduler import RequestScheduler, TokenBucket
+
+
+class FakeClock:
+    """A clock that only moves when sleep is called."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_response(
+    status: int = 200, headers: requests.structures.CaseInsensitiveDict | None = None
+) -> Mock:
+    """Return a response stand-in with a status code and headers."""
+    response = Mock()
+    response.status_code = status
+    response.headers = headers or requests.structures.CaseInsensitiveDict()
+    return response
+
+
+def rate_headers(
+    remaining: int, reset: float, limit: int = 100
+) -> requests.structures.CaseInsensitiveDict:
+    """Return rate-limit headers for a limit of `limit` requests per 100 seconds."""
+    return requests.structures.CaseInsensitiveDict(
+        {
+            "RateLimit-Limit": str(limit),
+            "RateLimit-Remaining": str(remaining),
+            "RateLimit-Reset": str(reset),
+            "RateLimit-Policy": f"{limit};w=100",
+        }
+    )
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Testing the TokenBucket class."""
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(self.clock, self.clock)
+
+    def test_unsized_bucket_never_waits(self) -> None:
+        """Test that requests are not paced before the server announces a limit."""
+        self.assertEqual([self.bucket.reserve() for _ in range(1000)], [0.0] * 1000)
+
+    def test_sized_from_headers(self) -> None:
+        """Test that the remaining budget is spent, then refilled at limit / window."""
+        self.bucket.update(rate_headers(remaining=12, reset=self.clock.now + 50))
+
+        # 12 remaining minus the reserve of 2 requests in flight.
+        self.assertEqual([self.bucket.reserve() for _ in range(10)], [0.0] * 10)
+        wait = self.bucket.reserve()
+        self.assertAlmostEqual(wait, 100 / 98)
+        self.clock.sleep(wait)
+        self.assertEqual(self.bucket.reserve(), 0.0)
+
+    def test_stale_headers_do_not_grow_budget(self) -> None:
+        """Test that an out-of-order response can not raise the remaining budget."""
+        reset = self.clock.now + 50
+        self.bucket.update(rate_headers(remaining=5, reset=reset))
+        self.bucket.update(rate_headers(remaining=50, reset=reset))
+        self.assertEqual(self.bucket.tokens, 3)
+
+        self.bucket.update(rate_headers(remaining=50, reset=reset + 100))
+        self.assertEqual(self.bucket.tokens, 48)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    """Testing the RequestScheduler class."""
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.scheduler = RequestScheduler(
+            max_retries=3,
+            clock=self.clock,
+            wall_clock=self.clock,
+            sleep=self.clock.sleep,
+        )
+
+    def test_retries_server_errors_with_backoff(self) -> None:
+        """Test that 5xx responses are retried with growing, jittered delays."""
+        request = Mock(
+            side_effect=[make_response(503), make_response(500), make_response(200)]
+        )
+
+        response = self.scheduler.send("app.bsky.feed.searchPosts", request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.scheduler.retries, 2)
+        first, second = self.clock.sleeps
+        self.assertTrue(0.25 <= first <= 0.5)
+        self.assertTrue(0.5 <= second <= 1.0)
+
+    def test_gives_up_after_max_retries(self) -> None:
+        """Test that the last response is returned once retries run out."""
+        request = Mock(return_value=make_response(502))
+
+        response = self.scheduler.send("app.bsky.feed.searchPosts", request)
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(request.call_count, 4)
+
+    def test_retries_connection_errors(self) -> None:
+        """Test that dropped connections are retried, and re-raised at the end."""
+        request = Mock(
+            side_effect=[requests.exceptions.ConnectionError(), make_response(200)]
+        )
+        self.assertEqual(
+            self.scheduler.send("app.bsky.feed.getPosts", request).status_code, 200
+        )
+
+        request = Mock(side_effect=requests.exceptions.Timeout())
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.scheduler.send("app.bsky.feed.getPosts", request)
+
+    def test_throttled_request_waits_for_reset(self) -> None:
+        """Test that a 429 pauses every request until the window resets."""
+        reset = self.clock.now + 40
+        request = Mock(
+            side_effect=[
+                make_response(429, rate_headers(remaining=0, reset=reset)),
+                make_response(200, rate_headers(remaining=99, reset=reset + 100)),
+            ]
+        )
+
+        self.scheduler.send("app.bsky.feed.searchPosts", request)
+
+        self.assertGreaterEqual(self.clock.now, reset)
+        bucket = self.scheduler.bucket("app.bsky.feed.searchPosts")
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_login_limit_is_separate(self) -> None:
+        """Test that the small createSession limit does not pace other requests."""
+        login = self.scheduler.bucket("com.atproto.server.createSession")
+
+        self.assertIsNot(login, self.scheduler.bucket("app.bsky.feed.searchPosts"))
+        self.assertIs(
+            self.scheduler.bucket("app.bsky.feed.getPosts"),
+            self.scheduler.bucket("app.bsky.feed.searchPosts"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
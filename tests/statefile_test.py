@@ -0,0 +1,47 @@
+"""Testing suite for the statefile module."""
+
+import os
+import stat
+import tempfile
+import unittest
+
+from statefile import read_json, same_search, write_json
+
+
+class TestStatefile(unittest.TestCase):
+    """Testing atomic state files and saved search parameters."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state", "blue.json")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_round_trip(self) -> None:
+        """Test that a state replaces the last one and leaves no temporary file."""
+        self.assertIsNone(read_json(self.path))
+
+        write_json(self.path, {"cursor": "25"})
+        write_json(self.path, {"cursor": "50"})
+
+        self.assertEqual(read_json(self.path), {"cursor": "50"})
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["blue.json"])
+
+    def test_permissions(self) -> None:
+        """Test that a new file gets the given permissions."""
+        write_json(self.path, {}, permissions=0o600)
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_same_search(self) -> None:
+        """Test that only the given parameters may differ."""
+        saved = {"q": "blue", "cursor": "25"}
+
+        self.assertTrue(same_search(saved, {"q": "blue", "cursor": ""}, ["cursor"]))
+        self.assertFalse(same_search(saved, {"q": "red", "cursor": ""}, ["cursor"]))
+        self.assertFalse(same_search(saved, {"q": "blue"}, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
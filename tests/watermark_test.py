@@ -0,0 +1,195 @@
+"""Testing suite for the watermark module and incremental searches."""
+
+import os
+import tempfile
+import unittest
+from collections.abc import Callable
+from unittest.mock import patch
+
+from fake_server_case import FakeServerTestCase
+
+from fake_server import ACCESS_TOKEN, FakeCorpus, FakeXrpcServer
+from file import extract_post_data_from_csv
+from mission_blue import search_posts, stream_search
+from records import Post, project_page
+from watermark import Watermark, is_before, newest
+
+
+def keep_all(posts: list[Post], token: str, **_: object) -> list[Post]:
+    """Stand-in for extract_post_data that keeps every post."""
+    return posts
+
+
+class Interrupted(Exception):
+    """Raised by interrupt_on to simulate a killed crawl."""
+
+
+def interrupt_on(call: int) -> Callable[..., list[Post]]:
+    """Return a keep_all stand-in that is interrupted on the given call."""
+    calls = []
+
+    def extract(posts: list[Post], token: str, **_: object) -> list[Post]:
+        calls.append(posts)
+        if len(calls) == call:
+            raise Interrupted()
+        return posts
+
+    return extract
+
+
+class TestWatermark(unittest.TestCase):
+    """Testing the Watermark class."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.watermark = Watermark(os.path.join(self.directory.name, "blue.csv"))
+        self.params = {"q": "blue", "sort": "latest", "since": "", "cursor": ""}
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_newest(self) -> None:
+        """Test that the newest of the posts and the mark is picked by time."""
+        posts = project_page(FakeCorpus(3).posts)
+
+        self.assertEqual(newest(posts), posts[0].created_at)
+        self.assertEqual(newest(posts[1:], posts[0].created_at), posts[0].created_at)
+        self.assertEqual(newest([], None), None)
+
+    def test_is_before(self) -> None:
+        """Test that Bluesky timestamps compare with marks in any offset."""
+        self.assertTrue(
+            is_before("2024-12-31T23:59:59.999Z", "2025-01-01T00:00:00.000Z")
+        )
+        self.assertFalse(
+            is_before("2025-01-01T00:00:00.000Z", "2025-01-01T01:00:00+01:00")
+        )
+        self.assertTrue(is_before("2024-12-31T23:00:00", "2025-01-01T00:00:00.000Z"))
+
+    def test_load_only_for_the_same_search(self) -> None:
+        """Test that only the paging parameters and since may differ between runs."""
+        self.watermark.save(self.params, "2025-01-01T00:00:00.000Z")
+
+        self.assertEqual(
+            self.watermark.load(dict(self.params, since="2024-01-01", posts_limit=5)),
+            "2025-01-01T00:00:00.000Z",
+        )
+        with patch("builtins.print"):
+            self.assertIsNone(self.watermark.load(dict(self.params, lang="en")))
+
+    def test_advance(self) -> None:
+        """Test that the mark only moves once the crawl is complete or limited."""
+        with patch("builtins.print"):
+            self.watermark.advance(
+                dict(self.params, cursor="50"), None, "2025-01-02T00:00:00Z", 50
+            )
+            self.assertIsNone(self.watermark.load(self.params))
+
+            self.watermark.advance(
+                dict(self.params, cursor="50", posts_limit=50),
+                None,
+                "2025-01-02T00:00:00Z",
+                50,
+            )
+        self.assertEqual(self.watermark.load(self.params), "2025-01-02T00:00:00Z")
+
+
+class TestIncrementalSearch(FakeServerTestCase):
+    """Testing that a re-run only fetches the posts after the high-water mark."""
+
+    def setUp(self) -> None:
+        self.start_server(FakeXrpcServer(FakeCorpus(100)))
+        self.all_posts = self.server.corpus.posts
+        # The 30 newest posts are only published before the second run.
+        self.server.corpus.posts = self.all_posts[30:]
+        self.directory = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.directory.name, "blue.csv")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _params(self) -> dict:
+        return {
+            "q": "blue",
+            "sort": "latest",
+            "since": "",
+            "limit": 25,
+            "cursor": "",
+            "posts_limit": 1000,
+        }
+
+    def _searches(self) -> int:
+        return self.server.request_counts["app.bsky.feed.searchPosts"]
+
+    def test_stream_search(self) -> None:
+        """Test that the second run sets since and fetches only the new posts."""
+        with patch("mission_blue.file.extract_post_data", keep_all):
+            first = stream_search(
+                self._params(), ACCESS_TOKEN, self.output_path, incremental=True
+            )
+            searches = self._searches()
+            self.server.corpus.posts = self.all_posts
+            params = self._params()
+            second = stream_search(
+                params, ACCESS_TOKEN, self.output_path, incremental=True
+            )
+
+        self.assertEqual((first, second), (70, 30))
+        self.assertEqual(params["since"], self.all_posts[30]["indexedAt"])
+        # Posts 0 to 30, the last one already saved, fit in two pages.
+        self.assertEqual(self._searches() - searches, 2)
+        self.assertEqual(
+            Watermark(self.output_path).load(params), self.all_posts[0]["indexedAt"]
+        )
+        self.assertEqual(
+            len(extract_post_data_from_csv(self.output_path)), len(self.all_posts)
+        )
+
+    def test_resumed_stream_search(self) -> None:
+        """Test that the mark counts the posts saved before an interruption."""
+        with patch("mission_blue.file.extract_post_data", keep_all):
+            stream_search(
+                self._params(), ACCESS_TOKEN, self.output_path, incremental=True
+            )
+            self.server.corpus.posts = self.all_posts
+            with patch(
+                "mission_blue.file.extract_post_data", interrupt_on(2)
+            ), self.assertRaises(Interrupted):
+                stream_search(
+                    self._params(), ACCESS_TOKEN, self.output_path, incremental=True
+                )
+            resumed = stream_search(
+                self._params(),
+                ACCESS_TOKEN,
+                self.output_path,
+                resume=True,
+                incremental=True,
+            )
+            searches = self._searches()
+            third = stream_search(
+                self._params(), ACCESS_TOKEN, self.output_path, incremental=True
+            )
+
+        # The first page of new posts was saved before the interruption.
+        self.assertEqual((resumed, third), (5, 0))
+        self.assertEqual(
+            Watermark(self.output_path).load(self._params()),
+            self.all_posts[0]["indexedAt"],
+        )
+        # Only the newest post, which is already saved, is fetched again.
+        self.assertEqual(self._searches() - searches, 1)
+
+    def test_search_posts_stops_at_mark(self) -> None:
+        """Test that paging stops at the first page that reaches the mark."""
+        self.server.corpus.posts = self.all_posts
+
+        posts = search_posts(
+            self._params(), ACCESS_TOKEN, mark=self.all_posts[30]["indexedAt"]
+        )
+
+        self.assertEqual(posts, project_page(self.all_posts[:31]))
+        self.assertEqual(self._searches(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Testing suite for the writers module."""
+
+import json
+import os
+import tempfile
+import unittest
+from typing import Any
+from unittest.mock import patch
+
+from file import extract_post_data_from_csv
+from key_index import KeyIndex
+from writers import WRITERS, output_path, write_batches
+
+try:
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def make_posts(start: int, stop: int) -> list[dict]:
+    """Return post data rows with post links link<start> to link<stop - 1>."""
+    return [
+        {
+            "author": f"user{i}",
+            "content": f"post, {i} ✨",
+            "created_at": "2023-01-01",
+            "post_link": f"link{i}",
+        }
+        for i in range(start, stop)
+    ]
+
+
+def read_rows(path: str, output_format: str) -> list[dict]:
+    """Read every post stored at path, in storage order."""
+    if output_format == "csv":
+        return extract_post_data_from_csv(path)
+    if output_format == "jsonl":
+        with open(path, encoding="utf-8") as jsonl_file:
+            return [json.loads(line) for line in jsonl_file]
+    rows: list[dict] = []
+    for name in sorted(os.listdir(path)):
+        part = os.path.join(path, name)
+        table: Any
+        if output_format == "parquet":
+            table = pyarrow.parquet.read_table(part)
+        else:
+            with pyarrow.memory_map(part) as source:
+                table = pyarrow.ipc.open_file(source).read_all()
+        rows.extend(table.to_pylist())
+    return rows
+
+
+class TestWriters(unittest.TestCase):
+    """Testing every output format with the same append semantics."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _formats(self) -> list[str]:
+        return [
+            output_format
+            for output_format in WRITERS
+            if HAS_PYARROW or output_format in ("csv", "jsonl")
+        ]
+
+    def test_appends_new_posts_only(self) -> None:
+        """Test that repeated runs add only unseen posts, in arrival order."""
+        for output_format in self._formats():
+            with self.subTest(output_format):
+                path = output_path(self.directory.name, "query", output_format)
+
+                first = write_batches(
+                    [make_posts(0, 3), make_posts(2, 5)], path, output_format
+                )
+                with patch.object(KeyIndex, "rebuild") as mock_rebuild:
+                    second = write_batches([make_posts(4, 8)], path, output_format)
+                    mock_rebuild.assert_not_called()
+
+                self.assertEqual((first, second), (5, 3))
+                self.assertEqual(read_rows(path, output_format), make_posts(0, 8))
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_parquet_row_group_per_batch(self) -> None:
+        """Test that each incoming batch becomes its own row group."""
+        path = output_path(self.directory.name, "query", "parquet")
+
+        write_batches([make_posts(0, 3), [], make_posts(3, 5)], path, "parquet")
+
+        (part,) = os.listdir(path)
+        metadata = pyarrow.parquet.ParquetFile(os.path.join(path, part)).metadata
+        self.assertEqual(metadata.num_row_groups, 2)
+        self.assertEqual(metadata.num_rows, 5)
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_lost_index_is_rebuilt_from_parts(self) -> None:
+        """Test that a dataset without its index is still de-duplicated."""
+        path = output_path(self.directory.name, "query", "arrow")
+        write_batches([make_posts(0, 4)], path, "arrow")
+        os.remove(path + ".idx")
+
+        written = write_batches([make_posts(2, 6)], path, "arrow")
+
+        self.assertEqual(written, 2)
+        self.assertEqual(read_rows(path, "arrow"), make_posts(0, 6))
+
+
+if __name__ == "__main__":
+    unittest.main()
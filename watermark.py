@@ -0,0 +1,99 @@
+"""Mission Blue Module that holds the high-water marks of incremental searches.
+
+A high-water mark is a small JSON file next to the output it describes. It records
+the query parameters and the created_at of the newest post fetched for them. A
+later run of the same query sorted by latest only needs the posts after the mark:
+its since is set to the mark, and paging stops at the first page that reaches
+posts that are older, see mission_blue.iter_search_pages.
+
+The mark only moves forward once a crawl has paged back to it, or has stopped at
+its posts limit, so a failed request never leaves a gap behind the mark.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime, timezone
+
+import statefile
+from records import Post, parse_datetime
+
+WATERMARK_SUFFIX = ".watermark.json"
+# Parameters that may change between runs of the same query.
+_INCREMENTAL_CHANGES = ("cursor", "posts_limit", "limit", "since")
+
+
+def is_before(created_at: str, mark: str) -> bool:
+    """Return whether a post created at created_at is older than the mark."""
+    return parse_datetime(created_at) < parse_datetime(mark)
+
+
+def newest(posts: Iterable[Post], mark: str | None = None) -> str | None:
+    """Return the created_at of the newest of the posts and the mark."""
+    for post in posts:
+        if mark is None or is_before(mark, post.created_at):
+            mark = post.created_at
+    return mark
+
+
+class Watermark:
+    """The high-water mark of the searches that write to a given output."""
+
+    def __init__(self, output_path: str) -> None:
+        """Point at the mark of output_path. Nothing is read or written yet."""
+        self.path = output_path + WATERMARK_SUFFIX
+
+    def load(self, params: dict) -> str | None:
+        """Return the mark saved for a search with these parameters, or None."""
+        state = statefile.read_json(self.path)
+        if state is None:
+            return None
+        if not self.matches(state, params):
+            print(
+                f"Ignoring {self.path}, it belongs to a search with other parameters."
+            )
+            return None
+        return str(state["created_at"])
+
+    def save(self, params: dict, created_at: str) -> None:
+        """Record the created_at of the newest post fetched for a search."""
+        state = {
+            "params": params,
+            "created_at": created_at,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        statefile.write_json(self.path, state)
+
+    def advance(
+        self,
+        params: dict,
+        mark: str | None,
+        newest_fetched: str | None,
+        fetched: int,
+    ) -> None:
+        """Move the mark to the newest fetched post, if the crawl got back to the mark.
+
+        Args:
+            params (dict): The query parameters after the crawl. An empty "cursor"
+                means paging reached the mark or the last page.
+            mark (str, optional): The mark the crawl started from.
+            newest_fetched (str, optional): created_at of the newest of the fetched
+                posts and the mark, see newest.
+            fetched (int): Number of posts fetched, compared with posts_limit.
+
+        """
+        posts_limit = params.get("posts_limit")
+        limited = bool(posts_limit and fetched >= posts_limit)
+        if params["cursor"] and not limited:
+            print("Search interrupted, the high-water mark was not moved.")
+            return
+        if mark and params["cursor"]:
+            print(
+                f"Stopped at {posts_limit} posts before reaching the posts saved by "
+                "the last run, older posts up to them were not fetched."
+            )
+        if newest_fetched is not None:
+            self.save(params, newest_fetched)
+
+    @staticmethod
+    def matches(state: dict, params: dict) -> bool:
+        """Return whether a saved state belongs to a search with these parameters."""
+        return statefile.same_search(state["params"], params, _INCREMENTAL_CHANGES)
@@ -0,0 +1,291 @@
+"""Mission Blue Module that holds the output writers for scraped posts.
+
+Every writer appends batches of post data as they arrive and skips posts that are
+already stored, using the sidecar key index from key_index. CSV and JSONL outputs
+are single files that are appended to. Parquet and Arrow IPC files can not be
+appended to, so those outputs are dataset directories: each run adds one part file,
+written one row group (or record batch) per incoming batch. Tools such as
+pandas.read_parquet, pyarrow.dataset and DuckDB read such directories directly.
+
+Parquet and Arrow IPC need the optional pyarrow package.
+"""
+
+import csv
+import json
+import os
+import uuid
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from types import TracebackType
+from typing import Any, TypeVar
+
+from key_index import KeyIndex
+from records import Post, as_row
+
+POST_FIELDS = ["author", "content", "created_at", "post_link"]
+# The writer class entered by a with statement. typing.Self needs Python 3.11.
+_Writer = TypeVar("_Writer", bound="PostWriter")
+
+
+def _require_pyarrow() -> Any:
+    try:
+        # pylint: disable=C0415
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as err:
+        raise ImportError(
+            "The parquet and arrow formats need pyarrow: pip install pyarrow"
+        ) from err
+    return pyarrow
+
+
+class PostWriter:
+    """Base class for writers that append new posts to an output."""
+
+    extension = ""
+    # Whether each batch is durable as soon as write_batch returns.
+    flushes_batches = True
+
+    def __init__(self, path: str) -> None:
+        """Open the output at path, creating it if needed.
+
+        Args:
+            path (str): Path of the output file or dataset directory. Missing
+                parent directories are created.
+
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.written = 0
+        self.index = KeyIndex(path, self.iter_links, self.data_size)
+
+    def iter_links(self) -> Iterator[str]:
+        """Yield the post_link of every post already stored in the output."""
+        raise NotImplementedError
+
+    def data_size(self) -> int:
+        """Return the size of the stored output, used to detect a stale index."""
+        return os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+
+    def _write(self, posts: list[dict]) -> None:
+        raise NotImplementedError
+
+    def write_batch(self, posts: list[Post] | list[dict]) -> int:
+        """Write the posts that are not stored yet. Returns how many were written.
+
+        Post records are turned into rows here, as they are written.
+        """
+        new_posts = [
+            row for row in map(as_row, posts) if self.index.add(row["post_link"])
+        ]
+        if new_posts:
+            self._write(new_posts)
+            self.written += len(new_posts)
+        return len(new_posts)
+
+    def close(self) -> None:
+        """Finish the output and record its state in the key index."""
+        self.index.commit()
+        self.index.close()
+
+    def __enter__(self: _Writer) -> _Writer:  # noqa: PYI019
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class CsvWriter(PostWriter):
+    """Appends posts to a CSV file, flushing after every batch."""
+
+    extension = "csv"
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        fieldnames = POST_FIELDS
+        has_header = os.path.isfile(path) and os.path.getsize(path) > 0
+        if has_header:
+            with open(path, encoding="utf-8", newline="") as existing:
+                fieldnames = next(csv.reader(existing), POST_FIELDS)
+        self._file = open(path, "a", encoding="utf-8", newline="")  # noqa: SIM115
+        self._writer = csv.DictWriter(
+            self._file, fieldnames=fieldnames, lineterminator="\n"
+        )
+        if not has_header:
+            self._writer.writeheader()
+            self._file.flush()
+            self.index.commit()
+
+    def iter_links(self) -> Iterator[str]:
+        if os.path.isfile(self.path):
+            with open(self.path, encoding="utf-8", newline="") as csv_file:
+                for row in csv.DictReader(csv_file):
+                    yield row["post_link"]
+
+    def _write(self, posts: list[dict]) -> None:
+        self._writer.writerows(posts)
+        self._file.flush()
+        self.index.commit()
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+class JsonlWriter(PostWriter):
+    """Appends posts to a JSON Lines file, one object per line."""
+
+    extension = "jsonl"
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self._file = open(path, "a", encoding="utf-8")  # noqa: SIM115
+
+    def iter_links(self) -> Iterator[str]:
+        if os.path.isfile(self.path):
+            with open(self.path, encoding="utf-8") as jsonl_file:
+                for line in jsonl_file:
+                    if line.strip():
+                        yield json.loads(line)["post_link"]
+
+    def _write(self, posts: list[dict]) -> None:
+        self._file.writelines(
+            json.dumps(
+                {field: post.get(field) for field in POST_FIELDS}, ensure_ascii=False
+            )
+            + "\n"
+            for post in posts
+        )
+        self._file.flush()
+        self.index.commit()
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+class _DatasetWriter(PostWriter):
+    """Writes one new part file per run into a dataset directory."""
+
+    # The part file only becomes visible when the writer is closed.
+    flushes_batches = False
+
+    def __init__(self, path: str) -> None:
+        self.pyarrow = _require_pyarrow()
+        self.schema = self.pyarrow.schema(
+            [(field, self.pyarrow.string()) for field in POST_FIELDS]
+        )
+        os.makedirs(path, exist_ok=True)
+        super().__init__(path)
+        # Part names sort in the order they were written.
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        name = f"part-{timestamp}-{uuid.uuid4().hex[:8]}"
+        self.part_path = os.path.join(path, f"{name}.{self.extension}")
+        # Parts are written under a hidden name and renamed once complete, so
+        # readers and the key index never see a partial file.
+        self._temp_path = os.path.join(path, f".{name}.{self.extension}.tmp")
+        self._writer: Any = None
+
+    def parts(self) -> list[str]:
+        """Return the completed part files, oldest first."""
+        if not os.path.isdir(self.path):
+            return []
+        return [
+            os.path.join(self.path, name)
+            for name in sorted(os.listdir(self.path))
+            if name.startswith("part-") and name.endswith(f".{self.extension}")
+        ]
+
+    def data_size(self) -> int:
+        return sum(os.path.getsize(part) for part in self.parts())
+
+    def _table(self, posts: list[dict]) -> Any:
+        return self.pyarrow.Table.from_pylist(
+            [{field: post.get(field) for field in POST_FIELDS} for post in posts],
+            schema=self.schema,
+        )
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._temp_path, self.part_path)
+        super().close()
+
+
+class ParquetWriter(_DatasetWriter):
+    """Writes posts to a Parquet dataset, one row group per batch."""
+
+    extension = "parquet"
+
+    def iter_links(self) -> Iterator[str]:
+        for part in self.parts():
+            parquet_file = self.pyarrow.parquet.ParquetFile(part)
+            for batch in parquet_file.iter_batches(columns=["post_link"]):
+                yield from batch.column(0).to_pylist()
+
+    def _write(self, posts: list[dict]) -> None:
+        if self._writer is None:
+            self._writer = self.pyarrow.parquet.ParquetWriter(
+                self._temp_path, self.schema
+            )
+        self._writer.write_table(self._table(posts))
+
+
+class ArrowWriter(_DatasetWriter):
+    """Writes posts to an Arrow IPC dataset, one record batch per batch."""
+
+    extension = "arrow"
+
+    def iter_links(self) -> Iterator[str]:
+        for part in self.parts():
+            with self.pyarrow.memory_map(part) as source:
+                reader = self.pyarrow.ipc.open_file(source)
+                for index in range(reader.num_record_batches):
+                    batch = reader.get_batch(index)
+                    yield from batch.column("post_link").to_pylist()
+
+    def _write(self, posts: list[dict]) -> None:
+        if self._writer is None:
+            self._writer = self.pyarrow.ipc.new_file(self._temp_path, self.schema)
+        for batch in self._table(posts).to_batches():
+            self._writer.write_batch(batch)
+
+
+WRITERS: dict[str, type[PostWriter]] = {
+    writer.extension: writer
+    for writer in (CsvWriter, JsonlWriter, ParquetWriter, ArrowWriter)
+}
+
+
+def output_path(directory: str, name: str, output_format: str) -> str:
+    """Return the path of the output for name in the given format."""
+    return os.path.join(directory, f"{name}.{WRITERS[output_format].extension}")
+
+
+def write_batches(
+    batches: Iterable[list[Post] | list[dict]], path: str, output_format: str = "csv"
+) -> int:
+    """Append batches of post data to an output as they are produced.
+
+    Args:
+        batches (Iterable[list]): Batches of post records or post data.
+        path (str): Path of the output file or dataset directory.
+        output_format (str, optional): One of WRITERS. Defaults to "csv".
+
+    Returns:
+        int: Number of posts written.
+
+    """
+    with WRITERS[output_format](path) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+    print(f"{writer.written} new posts saved to {path}")
+    return writer.written